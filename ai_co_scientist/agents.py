@@ -1,12 +1,13 @@
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from agno.tools.exa import ExaTools
 from typing import List, Dict, Any
+from co_researchers.routing import routed_agent
 
 class SupervisorAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4"),
+        self.agent = routed_agent(
+            stage="ai_co_scientist.supervisor",
+            tier="high",
+            latency_target=120,
             description="You are a supervisor agent that orchestrates the research process, assigns tasks to other agents, and allocates resources based on the research plan.",
             tools=[ExaTools()],
             markdown=True
@@ -14,8 +15,10 @@ class SupervisorAgent:
 
 class GenerationAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4"),
+        self.agent = routed_agent(
+            stage="ai_co_scientist.generation",
+            tier="high",
+            latency_target=120,
             description="You are a generation agent that creates initial research hypotheses by exploring literature, simulating debates, and identifying testable assumptions.",
             tools=[ExaTools()],
             markdown=True
@@ -23,8 +26,10 @@ class GenerationAgent:
 
 class ReflectionAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4"),
+        self.agent = routed_agent(
+            stage="ai_co_scientist.reflection",
+            tier="high",
+            latency_target=120,
             description="You are a reflection agent that reviews hypotheses, assesses correctness, quality, novelty, and potential to explain existing observations.",
             tools=[ExaTools()],
             markdown=True
@@ -32,16 +37,20 @@ class ReflectionAgent:
 
 class RankingAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4"),
+        self.agent = routed_agent(
+            stage="ai_co_scientist.ranking",
+            tier="standard",
+            latency_target=60,
             description="You are a ranking agent that creates pairwise comparisons of hypotheses using simulated debates to create an Elo rating.",
             markdown=True
         )
 
 class EvolutionAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4"),
+        self.agent = routed_agent(
+            stage="ai_co_scientist.evolution",
+            tier="high",
+            latency_target=120,
             description="You are an evolution agent that refines best hypotheses by grounding them in literature, improving coherence/feasibility, combining ideas and exploring out-of-the-box thinking.",
             tools=[ExaTools()],
             markdown=True
@@ -49,16 +58,20 @@ class EvolutionAgent:
 
 class ProximityAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4"),
+        self.agent = routed_agent(
+            stage="ai_co_scientist.proximity",
+            tier="fast",
+            latency_target=30,
             description="You are a proximity agent that groups similar hypotheses to optimize exploration diversity.",
             markdown=True
         )
 
 class MetaReviewAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4"),
+        self.agent = routed_agent(
+            stage="ai_co_scientist.meta_review",
+            tier="high",
+            latency_target=120,
             description="You are a meta-review agent that synthesizes insights from all reviews, identifies patterns, optimizes other agents' performance, and creates reports.",
             markdown=True
         ) 
\ No newline at end of file
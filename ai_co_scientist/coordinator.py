@@ -1,8 +1,37 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import uuid
+from co_researchers.budget import SHORTEN_PROMPT, BudgetExceeded, BudgetStage, RunBudget, budget_scope
+from co_researchers.context import report_stage
 from .agents import *
+from .hypotheses import (EVOLUTION_FORMAT, GENERATION_FORMAT, MATCH_FORMAT, REVIEW_FORMAT, Hypothesis,
+                         hypotheses_markdown, parse_hypotheses, parse_matches, parse_reviews, review_batches)
+from .dedup import DedupResult, HypothesisDeduplicator
+from .store import HypothesisStore, goal_key, leaderboard_markdown
+
+SKIPPED = "(Skipped to meet the deadline or token budget.)"
+# What a generation call usually returns; sizes the review stage until the real count is known
+EXPECTED_HYPOTHESES = 6
 
 class AICoScientist:
-    def __init__(self):
+    def __init__(self, review_batch_size: int = 3, store: Optional[HypothesisStore] = None,
+                 match_batch_size: int = 4, evolve_top: int = 5, dedup_threshold: Optional[float] = 0.7):
+        """
+        Args:
+            review_batch_size: Most hypotheses reviewed together in one reflection call
+            store: Keeps hypotheses and Elo ratings per goal across sessions; without one, every
+                session starts from zero and a single ranking call orders its hypotheses
+            match_batch_size: Most calibration matches judged together in one ranking call
+            evolve_top: Best-rated hypotheses from the store handed to the evolver
+            dedup_threshold: Estimated shingle Jaccard similarity at which a new hypothesis is a
+                near-duplicate and skips review; None disables deduplication
+        """
+        self.review_batch_size = review_batch_size
+        self.store = store
+        self.match_batch_size = match_batch_size
+        self.evolve_top = evolve_top
+        self.dedup_threshold = dedup_threshold
+        self._dedup: Dict[str, HypothesisDeduplicator] = {}
         self.supervisor = SupervisorAgent()
         self.generator = GenerationAgent()
         self.reflector = ReflectionAgent()
@@ -11,51 +40,209 @@ class AICoScientist:
         self.proximity = ProximityAgent()
         self.meta_reviewer = MetaReviewAgent()
         
-    async def research(self, goal: str) -> Dict[str, Any]:
+    async def reflect(self, goal: str, hypotheses: List[Hypothesis]) -> List[Hypothesis]:
+        """Review the hypotheses concurrently and attach each review to its record"""
+        async def review(batch: List[Hypothesis]):
+            response = await self.reflector.agent.arun(
+                f"Research goal: {goal}\n\nReview these hypotheses:\n"
+                f"{hypotheses_markdown(batch, include_review=False)}\n{REVIEW_FORMAT}"
+            )
+            for hypothesis, result in zip(batch, parse_reviews(response.content, batch)):
+                hypothesis.review = result
+
+        await asyncio.gather(*(review(batch) for batch in review_batches(hypotheses, self.review_batch_size)))
+        return hypotheses
+
+    def deduplicate(self, goal: str, hypotheses: List[Hypothesis]) -> DedupResult:
+        """Merge or drop near-duplicates before they cost review and ranking calls
+
+        With a store, each goal's index is kept for the life of this object and catches up
+        with hypotheses other processes stored; without one, it only spans the current session.
+        """
+        if self.dedup_threshold is None:
+            return DedupResult(kept=list(hypotheses))
+        key = goal_key(goal)
+        if key not in self._dedup:
+            self._dedup[key] = HypothesisDeduplicator(self.dedup_threshold)
+        dedup = self._dedup[key]
+        if self.store:
+            known = dedup.ids()
+            for entry in self.store.population(goal):
+                if entry.id not in known:
+                    dedup.add(entry.hypothesis)
+        return dedup.filter(hypotheses)
+
+    async def tournament(self, goal: str, session: str) -> Dict[str, Any]:
+        """Play the calibration matches the store owes its provisional hypotheses and update their ratings"""
+        pairs = self.store.calibration_pairs(goal)
+        entries = {h.id: h.hypothesis for h in self.store.population(goal)}
+        batches = [pairs[i:i + self.match_batch_size] for i in range(0, len(pairs), self.match_batch_size)]
+
+        async def judge(batch: List[Tuple[str, str]]):
+            matches = "\n\n".join(
+                f"## Match {n}\n\n**A:**\n{entries[a].to_markdown()}\n\n**B:**\n{entries[b].to_markdown()}"
+                for n, (a, b) in enumerate(batch, 1)
+            )
+            response = await self.ranker.agent.arun(
+                f"Research goal: {goal}\n\nFor each match, decide which hypothesis is stronger "
+                f"(correctness, novelty, testability):\n\n{matches}\n{MATCH_FORMAT}"
+            )
+            return parse_matches(response.content, len(batch))
+
+        verdicts = await asyncio.gather(*(judge(batch) for batch in batches))
+        played = 0
+        for batch, results in zip(batches, verdicts):
+            for (a, b), result in zip(batch, results):
+                if result is None:
+                    continue
+                winner, reason = result
+                self.store.record_match(goal, a, b, a if winner == "A" else b, reason, session)
+                played += 1
+        population = self.store.population(goal)
+        return {
+            "leaderboard": leaderboard_markdown(population),
+            "ranking": [entry.to_dict() for entry in population],
+            "matches": played,
+            "unjudged": len(pairs) - played,
+            "ranking_calls": len(batches),
+            "population": len(population),
+        }
+
+    def _review_calls(self, hypotheses: int) -> int:
+        return -(-hypotheses // self.review_batch_size)
+
+    def _pipeline(self) -> List[BudgetStage]:
+        return [
+            BudgetStage("plan", self.supervisor.agent.stage),
+            BudgetStage("hypotheses", self.generator.agent.stage),
+            BudgetStage("reviews", self.reflector.agent.stage, calls=self._review_calls(EXPECTED_HYPOTHESES)),
+            BudgetStage("rankings", self.ranker.agent.stage),
+            BudgetStage("evolved", self.evolver.agent.stage),
+            # Only with a store: evolved hypotheses are reviewed before they are calibrated
+            *([BudgetStage("evolved_reviews", self.reflector.agent.stage, calls=self._review_calls(self.evolve_top))]
+              if self.store else []),
+            BudgetStage("grouped", self.proximity.agent.stage, optional=True),
+            BudgetStage("report", self.meta_reviewer.agent.stage),
+        ]
+
+    async def research(self, goal: str, deadline: Optional[float] = None,
+                       token_budget: Optional[int] = None) -> Dict[str, Any]:
         """
         Execute the research process for a given goal
+
+        Args:
+            goal: The research goal
+            deadline: Seconds within which to return; proximity grouping is shortened or skipped
+                when telemetry says it would not fit, and a partial result is returned if a
+                required stage runs out of time
+            token_budget: Most tokens to spend, handled the same way
         """
+        budget = RunBudget(deadline, token_budget)
+        budget.begin(self._pipeline())
+        results: Dict[str, Any] = {}
+        with budget_scope(budget):
+            try:
+                await self._stages(goal, budget, results)
+            except BudgetExceeded:
+                budget.skip_remaining()
+        if budget.bounded:
+            results["skipped_stages"] = list(budget.skipped)
+            results["budget"] = budget.to_dict()
+        return results
+
+    async def _stages(self, goal: str, budget: RunBudget, results: Dict[str, Any]):
+        """The research pipeline, filling `results` stage by stage so a partial result survives a deadline"""
         # 1. Supervisor creates research plan
-        plan = await self.supervisor.agent.arun(
+        plan = await budget.run("plan", self.supervisor.agent.arun(
             f"Create a structured research plan for the following goal: {goal}"
-        )
+        ))
+        results["plan"] = plan.content
+        report_stage("plan", plan.content)
         
-        # 2. Generator explores and creates hypotheses
-        hypotheses = await self.generator.agent.arun(
-            f"Generate initial hypotheses for: {goal}\n\nResearch Plan:\n{plan.content}"
-        )
+        # 2. Generator explores and creates hypotheses as structured records
+        session = uuid.uuid4().hex[:12]
+        if not self.store:
+            self._dedup.pop(goal_key(goal), None)
+        known = self.store.population(goal) if self.store else []
+        explored = ""
+        if known:
+            explored = ("\n\nHypotheses from earlier sessions, best rated first; propose new ones rather than "
+                        "restating these:\n" + "\n".join(f"- {h.hypothesis.title}" for h in known[:15]))
+        generated = await budget.run("hypotheses", self.generator.agent.arun(
+            f"Generate initial hypotheses for: {goal}\n\nResearch Plan:\n{plan.content}{explored}\n{GENERATION_FORMAT}"
+        ))
+        dedup = self.deduplicate(goal, parse_hypotheses(generated.content))
+        records = dedup.kept
+        budget.expect("reviews", len(review_batches(records, self.review_batch_size)))
+        if self.store:
+            self.store.add(goal, records, session)
+        report_stage("dedup", dedup.to_dict())
+        hypotheses = hypotheses_markdown(records, include_review=False)
+        results["hypotheses"] = hypotheses
+        results["hypothesis_records"] = [record.model_dump() for record in records]
+        results["dedup"] = dedup.to_dict()
+        report_stage("hypotheses", hypotheses)
         
-        # 3. Reflector reviews hypotheses
-        reviews = await self.reflector.agent.arun(
-            f"Review these hypotheses:\n{hypotheses.content}"
-        )
+        # 3. Reflector reviews hypotheses: one concurrent call per small batch
+        await budget.run("reviews", self.reflect(goal, records))
+        if self.store:
+            for record in records:
+                self.store.update(record)
+        reviews = hypotheses_markdown(records)
+        results["hypothesis_records"] = [record.model_dump() for record in records]
+        results["reviews"] = reviews
+        report_stage("reviews", reviews)
         
-        # 4. Ranker creates tournament rankings
-        rankings = await self.ranker.agent.arun(
-            f"Create pairwise rankings for these reviewed hypotheses:\n{reviews.content}"
-        )
+        # 4. Ranker creates tournament rankings: with a store, Elo calibration matches for new hypotheses only
+        if self.store:
+            tournament = await budget.run("rankings", self.tournament(goal, session))
+            rankings = tournament.pop("leaderboard")
+            results["ranking"] = tournament.pop("ranking")
+            results["tournament"] = {"session": session, "new": len(records), **tournament}
+        else:
+            rankings = (await budget.run("rankings", self.ranker.agent.arun(
+                f"Create pairwise rankings for these reviewed hypotheses:\n{reviews}"
+            ))).content
+        results["rankings"] = rankings
+        report_stage("rankings", rankings)
         
-        # 5. Evolver refines top hypotheses
-        evolved = await self.evolver.agent.arun(
-            f"Refine the top ranked hypotheses:\n{rankings.content}"
-        )
+        # 5. Evolver refines top hypotheses; evolved ones are reviewed like new ones, stored with their lineage
+        #    and calibrated next session
+        if self.store:
+            top = [entry.hypothesis for entry in self.store.population(goal)[:self.evolve_top]]
+            evolved = await budget.run("evolved", self.evolver.agent.arun(
+                f"Refine the top ranked hypotheses:\n{hypotheses_markdown(top)}\n{EVOLUTION_FORMAT}"
+            ))
+            evolved_dedup = self.deduplicate(goal, parse_hypotheses(evolved.content))
+            budget.expect("evolved_reviews", len(review_batches(evolved_dedup.kept, self.review_batch_size)))
+            evolved_records = self.store.add(goal, evolved_dedup.kept, session)
+            results["dedup"]["evolved"] = evolved_dedup.to_dict()
+            await budget.run("evolved_reviews", self.reflect(goal, evolved_records))
+            for record in evolved_records:
+                self.store.update(record)
+            results["evolved_records"] = [record.model_dump() for record in evolved_records]
+        else:
+            evolved = await budget.run("evolved", self.evolver.agent.arun(
+                f"Refine the top ranked hypotheses:\n{rankings}"
+            ))
+        results["evolved"] = evolved.content
+        report_stage("evolved", evolved.content)
         
-        # 6. Proximity agent groups similar hypotheses
-        grouped = await self.proximity.agent.arun(
-            f"Group similar hypotheses:\n{evolved.content}"
-        )
+        # 6. Proximity agent groups similar hypotheses (optional under a deadline or token budget)
+        mode = budget.decide("grouped")
+        grouped = None
+        if mode != "skip":
+            grouped = await budget.run("grouped", self.proximity.agent.arun(
+                f"Group similar hypotheses:\n{evolved.content}" + (SHORTEN_PROMPT if mode == "short" else "")
+            ))
+        grouped_content = grouped.content if grouped is not None else SKIPPED
+        results["grouped"] = grouped_content
+        report_stage("grouped", grouped_content)
         
         # 7. Meta-reviewer generates final report
-        report = await self.meta_reviewer.agent.arun(
-            f"Generate a comprehensive report synthesizing all findings:\n{grouped.content}"
-        )
-        
-        return {
-            "plan": plan.content,
-            "hypotheses": hypotheses.content, 
-            "reviews": reviews.content,
-            "rankings": rankings.content,
-            "evolved": evolved.content,
-            "grouped": grouped.content,
-            "report": report.content
-        } 
\ No newline at end of file
+        report = await budget.run("report", self.meta_reviewer.agent.arun(
+            f"Generate a comprehensive report synthesizing all findings:\n"
+            f"{grouped.content if grouped is not None else evolved.content}"
+        ))
+        results["report"] = report.content
+        report_stage("report", report.content)
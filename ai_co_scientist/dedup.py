@@ -0,0 +1,180 @@
+"""Near-duplicate detection for hypotheses with MinHash signatures and LSH.
+
+A hypothesis's title and statement are normalised and cut into character
+5-gram shingles. Each shingle is packed into an integer and hashed, all in
+NumPy. A `num_perm` MinHash signature (uint32) estimates the Jaccard
+similarity of two shingle sets as the fraction of equal entries.
+Signatures are split into bands, and each band is bucketed in a dict. Only
+hypotheses that share a bucket with a new one are compared to it, so
+checking an arrival does not depend on how many are indexed. The
+band/row split is chosen from the similarity threshold.
+
+Duplicates are found before any LLM review. One whose original is also new
+this session is merged into it: its predictions and assumptions are added.
+One whose original was already reviewed is dropped.
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .hypotheses import Hypothesis
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows <= num_perm whose S-curve midpoint sits below `threshold`"""
+    splits = [(b, num_perm // b) for b in range(1, num_perm + 1)]
+    # Aim low: a missed duplicate costs LLM calls, a false candidate only one signature comparison
+    return min(splits, key=lambda s: (abs((1 / s[0]) ** (1 / s[1]) - (threshold - 0.1)), -s[0] * s[1]))
+
+
+def hypothesis_text(hypothesis: Hypothesis) -> str:
+    return " ".join(_WORD.findall(f"{hypothesis.title} {hypothesis.statement}".lower()))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, shingle: int = 5, seed: int = 1):
+        if not 1 <= shingle <= 8:
+            raise ValueError("shingle must be between 1 and 8 bytes")
+        self.num_perm = num_perm
+        self.shingle = shingle
+        rng = np.random.default_rng(seed)
+        # a < 2**31 keeps a * h (h < 2**32) inside uint64
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)[:, None]
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct 32-bit hashes of the text's byte k-grams"""
+        data = np.frombuffer(text.encode().ljust(self.shingle), dtype=np.uint8).astype(np.uint64)
+        count = len(data) - self.shingle + 1
+        grams = np.zeros(count, dtype=np.uint64)
+        for offset in range(self.shingle):
+            grams |= data[offset:offset + count] << np.uint64(8 * offset)
+        return np.unique(((grams * _MIX) & _MERSENNE) >> np.uint64(29))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text) & np.uint64(0xFFFFFFFF)
+        values = (self._a * hashes[None, :] + self._b) % _PRIME
+        return np.minimum(values.min(axis=1), np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+class LSHIndex:
+    """MinHash signatures in one growing uint32 matrix, bucketed by band"""
+
+    def __init__(self, num_perm: int, bands: int, rows: int):
+        if bands * rows > num_perm:
+            raise ValueError("bands * rows must not exceed num_perm")
+        self.bands = bands
+        self.rows = rows
+        self.signatures = np.zeros((64, num_perm), dtype=np.uint32)
+        self.size = 0
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def _keys(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, signature: np.ndarray) -> int:
+        if self.size == len(self.signatures):
+            self.signatures = np.concatenate([self.signatures, np.zeros_like(self.signatures)])
+        row = self.size
+        self.signatures[row] = signature
+        self.size += 1
+        for band, key in self._keys(signature):
+            self._buckets[band].setdefault(key, []).append(row)
+        return row
+
+    def query(self, signature: np.ndarray, threshold: float) -> List[Tuple[int, float]]:
+        """Indexed rows with estimated Jaccard similarity at or above `threshold`, most similar first"""
+        candidates = {row for band, key in self._keys(signature) for row in self._buckets[band].get(key, ())}
+        if not candidates:
+            return []
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self.signatures[rows] == signature).mean(axis=1)
+        keep = similarity >= threshold
+        order = np.argsort(-similarity[keep], kind="stable")
+        return [(int(row), float(sim)) for row, sim in zip(rows[keep][order], similarity[keep][order])]
+
+
+@dataclass
+class DedupResult:
+    kept: List[Hypothesis]
+    merged: List[Tuple[Hypothesis, Hypothesis, float]] = field(default_factory=list)
+    dropped: List[Tuple[Hypothesis, Hypothesis, float]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        def entries(pairs):
+            return [{"title": dup.title, "duplicate_of": original.id, "similarity": round(similarity, 3)}
+                    for dup, original, similarity in pairs]
+        return {
+            "kept": len(self.kept),
+            "merged": entries(self.merged),
+            "dropped": entries(self.dropped),
+            "seconds": round(self.seconds, 4),
+        }
+
+
+class HypothesisDeduplicator:
+    def __init__(self, threshold: float = 0.7, num_perm: int = 128, shingle: int = 5, seed: int = 1):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity of shingle sets at which two hypotheses are duplicates
+            num_perm: MinHash signature length
+            shingle: Shingle length in bytes
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle, seed)
+        self.index = LSHIndex(num_perm, *_bands(threshold, num_perm))
+        self.items: List[Hypothesis] = []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def ids(self) -> set:
+        return {item.id for item in self.items}
+
+    def add(self, hypothesis: Hypothesis):
+        """Index a hypothesis without checking it (e.g. one loaded from the store)"""
+        self.index.add(self.hasher.signature(hypothesis_text(hypothesis)))
+        self.items.append(hypothesis)
+
+    def match(self, hypothesis: Hypothesis) -> Optional[Tuple[Hypothesis, float]]:
+        """The most similar indexed hypothesis at or above the threshold, if any"""
+        matches = self.index.query(self.hasher.signature(hypothesis_text(hypothesis)), self.threshold)
+        return (self.items[matches[0][0]], matches[0][1]) if matches else None
+
+    def filter(self, hypotheses: List[Hypothesis]) -> DedupResult:
+        """Index the distinct hypotheses and merge or drop the rest
+
+        A duplicate of another hypothesis in `hypotheses` is merged into it; a duplicate of one
+        indexed earlier is dropped.
+        """
+        start = time.perf_counter()
+        result = DedupResult(kept=[])
+        batch = set()
+        for hypothesis in hypotheses:
+            signature = self.hasher.signature(hypothesis_text(hypothesis))
+            matches = self.index.query(signature, self.threshold)
+            if not matches:
+                self.index.add(signature)
+                self.items.append(hypothesis)
+                batch.add(id(hypothesis))
+                result.kept.append(hypothesis)
+                continue
+            original, similarity = self.items[matches[0][0]], matches[0][1]
+            if id(original) in batch:
+                original.predictions += [p for p in hypothesis.predictions if p not in original.predictions]
+                original.assumptions += [a for a in hypothesis.assumptions if a not in original.assumptions]
+                result.merged.append((hypothesis, original, similarity))
+            else:
+                result.dropped.append((hypothesis, original, similarity))
+        result.seconds = time.perf_counter() - start
+        return result
@@ -0,0 +1,221 @@
+"""Typed hypothesis records exchanged between the co-scientist agents.
+
+The generation agent is asked for a JSON list matching `Hypothesis`; each
+record is validated, and a response that is not valid JSON is split into
+records from its markdown headings or numbered items instead. Reviews are
+parsed the same way and attached to the hypothesis they cover.
+"""
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+GENERATION_FORMAT = """
+Return the hypotheses as a JSON array in a ```json fenced block. Each element must have:
+  "title": short name of the hypothesis
+  "statement": the hypothesis in one or two sentences
+  "rationale": the evidence or reasoning behind it
+  "predictions": list of testable predictions
+  "assumptions": list of key assumptions
+"""
+
+EVOLUTION_FORMAT = GENERATION_FORMAT + """  "parents": ids of the hypotheses it was refined or combined from
+"""
+
+MATCH_FORMAT = """
+Return one JSON object per match, as a JSON array in a ```json fenced block, in the order given. Each must have:
+  "match": the match number
+  "winner": "A" or "B"
+  "reason": one sentence on why it is the stronger hypothesis
+"""
+
+REVIEW_FORMAT = """
+Return one JSON object per hypothesis, as a JSON array in a ```json fenced block, in the order given. Each must have:
+  "id": the hypothesis id
+  "correctness", "quality", "novelty", "testability": scores from 1 to 10
+  "verdict": one of "accept", "revise", "reject"
+  "critique": the review in a few sentences
+  "suggestions": list of concrete improvements
+"""
+
+
+class Review(BaseModel):
+    correctness: Optional[float] = Field(None, ge=0, le=10)
+    quality: Optional[float] = Field(None, ge=0, le=10)
+    novelty: Optional[float] = Field(None, ge=0, le=10)
+    testability: Optional[float] = Field(None, ge=0, le=10)
+    verdict: str = "revise"
+    critique: str = ""
+    suggestions: List[str] = []
+
+    @field_validator("verdict", mode="before")
+    @classmethod
+    def _verdict(cls, value: Any) -> str:
+        value = str(value or "revise").strip().lower()
+        return value if value in ("accept", "revise", "reject") else "revise"
+
+    @property
+    def score(self) -> Optional[float]:
+        scores = [s for s in (self.correctness, self.quality, self.novelty, self.testability) if s is not None]
+        return sum(scores) / len(scores) if scores else None
+
+
+class Hypothesis(BaseModel):
+    id: str = ""
+    title: str
+    statement: str
+    rationale: str = ""
+    predictions: List[str] = []
+    assumptions: List[str] = []
+    parents: List[str] = []
+    review: Optional[Review] = None
+
+    @field_validator("title", "statement")
+    @classmethod
+    def _not_empty(cls, value: str) -> str:
+        if not value.strip():
+            raise ValueError("must not be empty")
+        return value.strip()
+
+    def to_markdown(self, include_review: bool = True) -> str:
+        lines = [f"### {self.id}: {self.title}", "", self.statement]
+        if self.parents:
+            lines += ["", f"*Evolved from {', '.join(self.parents)}*"]
+        if self.rationale:
+            lines += ["", f"**Rationale:** {self.rationale}"]
+        if self.predictions:
+            lines += ["", "**Testable predictions:**"] + [f"- {p}" for p in self.predictions]
+        if self.assumptions:
+            lines += ["", "**Assumptions:**"] + [f"- {a}" for a in self.assumptions]
+        if include_review and self.review is not None:
+            review = self.review
+            scores = ", ".join(
+                f"{name} {getattr(review, name):g}"
+                for name in ("correctness", "quality", "novelty", "testability")
+                if getattr(review, name) is not None
+            )
+            lines += ["", f"**Review ({review.verdict}{'; ' + scores if scores else ''}):** {review.critique}"]
+            lines += [f"- {s}" for s in review.suggestions]
+        return "\n".join(lines)
+
+
+_JSON_BLOCK = re.compile(r"```(?:json)?\s*\n(.*?)\n\s*```", re.DOTALL)
+_HEADING = re.compile(r"^#{1,6}\s+(.*\S)\s*$")
+_ITEM = re.compile(r"^(?:\d+[.)]|[-*+])\s+(.*\S)\s*$")
+
+
+def _json_payload(text: str) -> Any:
+    candidates = _JSON_BLOCK.findall(text) + [text]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate.strip())
+        except ValueError:
+            continue
+    return None
+
+
+def _records(payload: Any) -> List[Any]:
+    if isinstance(payload, dict):
+        for key in ("hypotheses", "reviews", "items"):
+            if isinstance(payload.get(key), list):
+                return payload[key]
+        return [payload]
+    return payload if isinstance(payload, list) else []
+
+
+def _markdown_blocks(text: str) -> List[List[str]]:
+    """Blocks of lines under the most frequent heading level, else under top-level list items"""
+    levels = [len(line) - len(line.lstrip("#")) for line in text.splitlines() if _HEADING.match(line)]
+    level = max(set(levels), key=levels.count) if levels else None
+    blocks: List[List[str]] = []
+    for line in text.splitlines():
+        heading = _HEADING.match(line)
+        if level is not None:
+            if heading and len(line) - len(line.lstrip("#")) == level:
+                blocks.append([heading.group(1)])
+                continue
+        elif _ITEM.match(line) and not line.startswith((" ", "\t")):
+            blocks.append([_ITEM.match(line).group(1)])
+            continue
+        if blocks and line.strip():
+            blocks[-1].append(line.strip())
+    return blocks
+
+
+def _number(hypotheses: List[Hypothesis]) -> List[Hypothesis]:
+    for index, hypothesis in enumerate(hypotheses, 1):
+        hypothesis.id = f"H{index}"
+    return hypotheses
+
+
+def parse_hypotheses(text: str) -> List[Hypothesis]:
+    """Validated hypotheses from a generation response; invalid JSON records are dropped"""
+    hypotheses = []
+    for record in _records(_json_payload(text)):
+        try:
+            hypotheses.append(Hypothesis.model_validate(record))
+        except ValidationError:
+            continue
+    if hypotheses:
+        return _number(hypotheses)
+
+    for block in _markdown_blocks(text):
+        title = re.sub(r"^(?:hypothesis\s*)?\d+[.:)]?\s*", "", block[0], flags=re.IGNORECASE).strip("*_: ")
+        body = " ".join(re.sub(r"^(?:\d+[.)]|[-*+])\s+", "", line) for line in block[1:]).strip() or title
+        if title:
+            hypotheses.append(Hypothesis(title=title, statement=body))
+    if not hypotheses and text.strip():
+        hypotheses.append(Hypothesis(title="Hypothesis", statement=text.strip()))
+    return _number(hypotheses)
+
+
+def parse_reviews(text: str, hypotheses: List[Hypothesis]) -> List[Review]:
+    """One review per hypothesis, matched by id or position; unparsed reviews keep the raw text"""
+    records = [r for r in _records(_json_payload(text)) if isinstance(r, dict)]
+    by_id = {str(r.get("id")): r for r in records if r.get("id") is not None}
+    reviews = []
+    for index, hypothesis in enumerate(hypotheses):
+        if by_id:
+            record = by_id.get(hypothesis.id)
+        else:
+            record = records[index] if index < len(records) else None
+        try:
+            reviews.append(Review.model_validate(record) if record is not None else None)
+        except ValidationError:
+            reviews.append(None)
+    if all(review is None for review in reviews):
+        # Free-form review: shared by the hypotheses it was written for
+        return [Review(critique=text.strip()) for _ in hypotheses]
+    return [review or Review(critique="No structured review returned") for review in reviews]
+
+
+def parse_matches(text: str, count: int) -> List[Optional[Tuple[str, str]]]:
+    """(winner "A"/"B", reason) per match, matched by number or position; None where no verdict was parsed"""
+    records = [r for r in _records(_json_payload(text)) if isinstance(r, dict)]
+    by_number = {str(r.get("match")): r for r in records if r.get("match") is not None}
+    results: List[Optional[Tuple[str, str]]] = []
+    for index in range(count):
+        record = by_number.get(str(index + 1)) if by_number else (records[index] if index < len(records) else None)
+        winner = str((record or {}).get("winner", "")).strip().upper()
+        results.append((winner, str(record.get("reason", ""))) if winner in ("A", "B") else None)
+    return results
+
+
+def review_batches(hypotheses: List[Hypothesis], max_batch: int = 3, max_chars: int = 1500) -> List[List[Hypothesis]]:
+    """Groups of short hypotheses reviewed in one call; long ones get a call to themselves"""
+    batches: List[List[Hypothesis]] = []
+    size = 0
+    for hypothesis in hypotheses:
+        length = len(hypothesis.to_markdown(include_review=False))
+        if batches and len(batches[-1]) < max_batch and size + length <= max_chars:
+            batches[-1].append(hypothesis)
+            size += length
+        else:
+            batches.append([hypothesis])
+            size = length
+    return batches
+
+
+def hypotheses_markdown(hypotheses: List[Hypothesis], include_review: bool = True) -> str:
+    return "\n\n".join(h.to_markdown(include_review) for h in hypotheses)
@@ -0,0 +1,270 @@
+"""Persistent hypotheses and Elo ratings, kept per research goal across sessions.
+
+Each stored hypothesis keeps its record (text and review), Elo rating, match
+count, wins and lineage (the ids it was evolved from). A hypothesis is
+provisional until it has played `calibration_matches` matches. Only
+provisional hypotheses are scheduled, each against well-rated established
+incumbents, so a session's ranking cost grows with the number of new
+hypotheses rather than with the whole population. Ratings are updated
+incrementally as each match is recorded.
+
+Goals are matched after case and whitespace normalisation. The SQLite file
+uses WAL mode, so several worker processes can share it.
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from .hypotheses import Hypothesis
+
+DEFAULT_STORE_DB = "co_researchers_hypotheses.db"
+STORED_ID = re.compile(r"H([0-9]+)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hypotheses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    goal TEXT NOT NULL,
+    record TEXT NOT NULL,
+    rating REAL NOT NULL,
+    matches INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    parents TEXT NOT NULL DEFAULT '[]',
+    session TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hypotheses_goal ON hypotheses (goal, rating);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    goal TEXT NOT NULL,
+    a INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    winner INTEGER NOT NULL,
+    reason TEXT NOT NULL DEFAULT '',
+    session TEXT,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def goal_key(goal: str) -> str:
+    return " ".join(goal.lower().split())
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    return 1.0 / (1.0 + math.pow(10.0, (opponent - rating) / 400.0))
+
+
+def is_stored_id(hypothesis_id: str) -> bool:
+    """Whether `hypothesis_id` has the form of a stored hypothesis's id (`H<row>`)"""
+    return STORED_ID.fullmatch(hypothesis_id) is not None
+
+
+def _row_id(hypothesis_id: str) -> int:
+    match = STORED_ID.fullmatch(hypothesis_id)
+    if match is None:
+        raise KeyError(hypothesis_id)
+    return int(match.group(1))
+
+
+@dataclass
+class StoredHypothesis:
+    hypothesis: Hypothesis
+    rating: float
+    matches: int = 0
+    wins: int = 0
+    parents: List[str] = field(default_factory=list)
+    session: Optional[str] = None
+
+    @property
+    def id(self) -> str:
+        return self.hypothesis.id
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.hypothesis.title,
+            "rating": round(self.rating, 1),
+            "matches": self.matches,
+            "wins": self.wins,
+            "parents": self.parents,
+            "session": self.session,
+        }
+
+
+class HypothesisStore:
+    def __init__(self, path: str = DEFAULT_STORE_DB, initial_rating: float = 1200.0, k_factor: float = 32.0,
+                 provisional_k_factor: float = 64.0, calibration_matches: int = 3):
+        """
+        Args:
+            path: SQLite file shared by every process using the store
+            initial_rating: Elo rating of a new hypothesis without parents
+            k_factor: Elo K-factor once a hypothesis is established
+            provisional_k_factor: Larger K-factor while it plays its calibration matches
+            calibration_matches: Matches after which a hypothesis is established
+        """
+        self.path = path
+        self.initial_rating = initial_rating
+        self.k_factor = k_factor
+        self.provisional_k_factor = provisional_k_factor
+        self.calibration_matches = calibration_matches
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _entry(self, row: sqlite3.Row) -> StoredHypothesis:
+        hypothesis = Hypothesis.model_validate_json(row["record"])
+        hypothesis.id = f"H{row['id']}"
+        return StoredHypothesis(hypothesis, row["rating"], row["matches"], row["wins"],
+                                json.loads(row["parents"]), row["session"])
+
+    def add(self, goal: str, hypotheses: Sequence[Hypothesis], session: Optional[str] = None) -> List[Hypothesis]:
+        """Store new hypotheses, renaming each to its permanent id (`H<row>`)
+
+        A hypothesis with `parents` starts at their mean rating, the rest at `initial_rating`.
+        """
+        key = goal_key(goal)
+        now = time.time()
+        with self._lock:
+            for hypothesis in hypotheses:
+                parents = [p for p in hypothesis.parents if is_stored_id(p)]
+                ratings = [row["rating"] for row in self._conn.execute(
+                    f"SELECT rating FROM hypotheses WHERE goal = ? AND id IN ({','.join('?' * len(parents))})",
+                    (key, *[_row_id(p) for p in parents]),
+                )] if parents else []
+                hypothesis.parents = parents
+                cursor = self._conn.execute(
+                    "INSERT INTO hypotheses (goal, record, rating, parents, session, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, hypothesis.model_dump_json(), sum(ratings) / len(ratings) if ratings else self.initial_rating,
+                     json.dumps(parents), session, now, now),
+                )
+                hypothesis.id = f"H{cursor.lastrowid}"
+        return list(hypotheses)
+
+    def update(self, hypothesis: Hypothesis):
+        """Save a stored hypothesis's record again, e.g. once it has been reviewed"""
+        with self._lock:
+            cursor = self._conn.execute("UPDATE hypotheses SET record = ?, updated_at = ? WHERE id = ?",
+                                        (hypothesis.model_dump_json(), time.time(), _row_id(hypothesis.id)))
+        if not cursor.rowcount:
+            raise KeyError(hypothesis.id)
+
+    def population(self, goal: str) -> List[StoredHypothesis]:
+        """Every hypothesis for `goal`, best rated first"""
+        rows = self._conn.execute("SELECT * FROM hypotheses WHERE goal = ? ORDER BY rating DESC, id",
+                                  (goal_key(goal),)).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def get(self, hypothesis_id: str) -> StoredHypothesis:
+        row = self._conn.execute("SELECT * FROM hypotheses WHERE id = ?", (_row_id(hypothesis_id),)).fetchone()
+        if row is None:
+            raise KeyError(hypothesis_id)
+        return self._entry(row)
+
+    def provisional(self, goal: str) -> List[StoredHypothesis]:
+        """Hypotheses still owed calibration matches, oldest first"""
+        rows = self._conn.execute("SELECT * FROM hypotheses WHERE goal = ? AND matches < ? ORDER BY id",
+                                  (goal_key(goal), self.calibration_matches)).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def calibration_pairs(self, goal: str, pool_size: int = 8) -> List[Tuple[str, str]]:
+        """Matches that bring every provisional hypothesis up to `calibration_matches`
+
+        Opponents rotate through the `pool_size` best-rated established hypotheses. Without
+        enough of them (e.g. a goal's first session), provisional hypotheses play each other.
+        """
+        population = self.population(goal)
+        newcomers = [h for h in population if h.matches < self.calibration_matches]
+        newcomers.sort(key=lambda h: _row_id(h.id))
+        pool = [h for h in population if h.matches >= self.calibration_matches][:pool_size]
+        pairs: List[Tuple[str, str]] = []
+        seen = set()
+        owed = {h.id: self.calibration_matches - h.matches for h in newcomers}
+        for index, newcomer in enumerate(newcomers):
+            for offset in range(min(owed[newcomer.id], len(pool))):
+                pairs.append((newcomer.id, pool[(index + offset) % len(pool)].id))
+                owed[newcomer.id] -= 1
+        # Whatever the incumbents could not cover is played among the newcomers, round-robin by distance
+        for distance in range(1, len(newcomers)):
+            for index, newcomer in enumerate(newcomers):
+                opponent = newcomers[(index + distance) % len(newcomers)]
+                key = frozenset((newcomer.id, opponent.id))
+                if owed[newcomer.id] > 0 and owed[opponent.id] > 0 and key not in seen:
+                    seen.add(key)
+                    pairs.append((newcomer.id, opponent.id))
+                    owed[newcomer.id] -= 1
+                    owed[opponent.id] -= 1
+            if not any(count > 0 for count in owed.values()):
+                break
+        return pairs
+
+    def _k(self, matches: int) -> float:
+        return self.provisional_k_factor if matches < self.calibration_matches else self.k_factor
+
+    def record_match(self, goal: str, a: str, b: str, winner: str, reason: str = "",
+                     session: Optional[str] = None) -> Tuple[float, float]:
+        """Apply one match result to both ratings; returns the new ratings of `a` and `b`"""
+        if winner not in (a, b):
+            raise ValueError(f"winner {winner} did not play {a} vs {b}")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = {row["id"]: row for row in self._conn.execute(
+                    "SELECT id, rating, matches FROM hypotheses WHERE id IN (?, ?)", (_row_id(a), _row_id(b)))}
+                ra, rb = rows[_row_id(a)], rows[_row_id(b)]
+                score = 1.0 if winner == a else 0.0
+                expected = expected_score(ra["rating"], rb["rating"])
+                new_a = ra["rating"] + self._k(ra["matches"]) * (score - expected)
+                new_b = rb["rating"] + self._k(rb["matches"]) * (expected - score)
+                now = time.time()
+                for row_id, rating, won in ((_row_id(a), new_a, score), (_row_id(b), new_b, 1.0 - score)):
+                    self._conn.execute(
+                        "UPDATE hypotheses SET rating = ?, matches = matches + 1, wins = wins + ?, updated_at = ? "
+                        "WHERE id = ?", (rating, int(won), now, row_id))
+                self._conn.execute(
+                    "INSERT INTO matches (goal, a, b, winner, reason, session, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (goal_key(goal), _row_id(a), _row_id(b), _row_id(winner), reason, session, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return new_a, new_b
+
+    def match_count(self, goal: str, session: Optional[str] = None) -> int:
+        query = "SELECT COUNT(*) FROM matches WHERE goal = ?" + (" AND session = ?" if session else "")
+        return self._conn.execute(query, (goal_key(goal), session) if session else (goal_key(goal),)).fetchone()[0]
+
+
+def leaderboard_markdown(entries: Sequence[StoredHypothesis], limit: int = 20) -> str:
+    lines = ["| Rank | Id | Hypothesis | Elo | Matches | Wins | Evolved from |", "|---|---|---|---|---|---|---|"]
+    for rank, entry in enumerate(entries[:limit], 1):
+        title = entry.hypothesis.title.replace("|", "/")
+        lines.append(f"| {rank} | {entry.id} | {title} | {entry.rating:.0f} | {entry.matches} | {entry.wins} | "
+                     f"{', '.join(entry.parents) or '-'} |")
+    return "\n".join(lines)
+
+
+_default_store: Optional[HypothesisStore] = None
+
+
+def default_store() -> Optional[HypothesisStore]:
+    """This process's store at `$CO_RESEARCHERS_HYPOTHESIS_STORE`, or None when the variable is unset"""
+    global _default_store
+    path = os.environ.get("CO_RESEARCHERS_HYPOTHESIS_STORE")
+    if not path:
+        return None
+    if _default_store is None or _default_store.path != path:
+        _default_store = HypothesisStore(path)
+    return _default_store
@@ -0,0 +1,274 @@
+"""Record and replay the OpenAI and Exa traffic of a coordinator run.
+
+`RecordingProxy` sits between the clients and a real (or mock) upstream. It
+forwards every request and stores the request's key, the response body or
+SSE chunks, and their timing in a `Cassette`. `ReplayServer` serves a
+cassette back, either with the recorded timing (scaled by `latency`) or with
+none. This takes network variance out of a run, so what remains is the time
+spent in our own code: prompt assembly, parsing, persistence and rendering.
+
+Requests are matched by a key hashed from the method, path and body, with
+timestamps and generated ids masked so a rerun maps onto its recording. If
+no unused recording has the key, the next unused one on the same path is
+served instead, and the miss is counted in `ReplayServer.misses`. Cassettes
+are JSON and gzipped when the file name ends in `.gz`.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import re
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from co_researchers.httpserver import Response, StreamResponse
+
+from .mock_servers import MockConfig, ServedRequest, _MockServer
+
+OPENAI_UPSTREAM = "https://api.openai.com"
+EXA_UPSTREAM = "https://api.exa.ai"
+
+# Parts of a request body that change between otherwise identical runs
+_VOLATILE = [
+    re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:[+-]\d{2}:?\d{2}|Z)?"),
+    re.compile(r"\b(?:call|chatcmpl|run|session)[_-][A-Za-z0-9]{6,}\b"),
+    re.compile(r"\b[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}\b"),
+    re.compile(r"/tmp/[\w./-]+"),
+]
+_HOP_HEADERS = {"host", "content-length", "connection", "accept-encoding", "transfer-encoding", "keep-alive"}
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    text = body.decode("utf-8", errors="replace")
+    for pattern in _VOLATILE:
+        text = pattern.sub("*", text)
+    return hashlib.sha1(f"{method} {path}\n{text}".encode()).hexdigest()[:20]
+
+
+@dataclass
+class Interaction:
+    service: str
+    method: str
+    path: str
+    key: str
+    status: int
+    content_type: str
+    ttfb: float
+    duration: float
+    scenario: str = ""
+    body: Optional[str] = None
+    # Streaming responses: (seconds after the first byte, text) per chunk
+    chunks: Optional[List[Tuple[float, str]]] = None
+    tokens: Tuple[int, int] = (0, 0)
+
+
+@dataclass
+class Cassette:
+    interactions: List[Interaction] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.rewind()
+
+    def __len__(self) -> int:
+        return len(self.interactions)
+
+    def rewind(self):
+        """Make every recording available again (e.g. before another replay repeat)"""
+        self._by_key: Dict[Tuple[str, str], Deque[int]] = defaultdict(deque)
+        self._by_path: Dict[Tuple[str, str], Deque[int]] = defaultdict(deque)
+        self._used = set()
+        for index, interaction in enumerate(self.interactions):
+            self._by_key[(interaction.service, interaction.key)].append(index)
+            self._by_path[(interaction.service, interaction.path)].append(index)
+
+    def add(self, interaction: Interaction):
+        self.interactions.append(interaction)
+
+    def scenario(self, name: str) -> "Cassette":
+        """The recordings made while `name` ran, so replaying one scenario never consumes another's"""
+        return Cassette([i for i in self.interactions if i.scenario == name], self.metadata)
+
+    @staticmethod
+    def _next(queue: Deque[int], used: set) -> Optional[int]:
+        while queue and queue[0] in used:
+            queue.popleft()
+        return queue.popleft() if queue else None
+
+    def match(self, service: str, method: str, path: str, body: bytes) -> Tuple[Optional[Interaction], bool]:
+        """The recording for a request and whether it matched exactly (False: same path, next in order)"""
+        index = self._next(self._by_key[(service, request_key(method, path, body))], self._used)
+        exact = index is not None
+        if index is None:
+            index = self._next(self._by_path[(service, path)], self._used)
+        if index is None:
+            return None, False
+        self._used.add(index)
+        return self.interactions[index], exact
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        data = json.dumps({"metadata": self.metadata, "interactions": [asdict(i) for i in self.interactions]},
+                          separators=(",", ":")).encode()
+        path.write_bytes(gzip.compress(data) if path.suffix == ".gz" else data)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Cassette":
+        path = Path(path)
+        data = path.read_bytes()
+        data = json.loads(gzip.decompress(data) if path.suffix == ".gz" else data)
+        interactions = []
+        for entry in data["interactions"]:
+            entry["tokens"] = tuple(entry.get("tokens") or (0, 0))
+            if entry.get("chunks") is not None:
+                entry["chunks"] = [tuple(chunk) for chunk in entry["chunks"]]
+            interactions.append(Interaction(**entry))
+        return cls(interactions, data.get("metadata", {}))
+
+
+def _usage_tokens(payload: Any) -> Tuple[int, int]:
+    usage = payload.get("usage") if isinstance(payload, dict) else None
+    if not isinstance(usage, dict):
+        return 0, 0
+    return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+
+
+def _stream_tokens(chunks: List[Tuple[float, str]]) -> Tuple[int, int]:
+    for _, text in reversed(chunks):
+        for line in text.splitlines():
+            if line.startswith("data: {") and '"usage"' in line:
+                tokens = _usage_tokens(json.loads(line[6:]))
+                if any(tokens):
+                    return tokens
+    return 0, 0
+
+
+class RecordingProxy(_MockServer):
+    """Forwards one service's requests to `upstream` and records each exchange into `cassette`"""
+
+    def __init__(self, cassette: Cassette, service: str, upstream: str, timeout: float = 600.0, **kwargs):
+        super().__init__(MockConfig(), **kwargs)
+        self.cassette = cassette
+        self.service = service
+        self.upstream = upstream.rstrip("/")
+        self.timeout = timeout
+        self.scenario = ""
+        self._client = None
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1" if self.service == "openai" else self.url
+
+    async def start(self) -> "RecordingProxy":
+        import httpx
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        return await super().start()
+
+    async def stop(self):
+        await super().stop()
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def dispatch(self, request, start: float):
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+        upstream = self._client.build_request(request.method, self.upstream + request.path, headers=headers,
+                                              params=request.query, content=request.body)
+        response = await self._client.send(upstream, stream=True)
+        ttfb = time.perf_counter() - start
+        content_type = response.headers.get("content-type", "application/json")
+        key = request_key(request.method, request.path, request.body)
+
+        def record(body=None, chunks=None, tokens=(0, 0)) -> ServedRequest:
+            end = time.perf_counter()
+            self.cassette.add(Interaction(self.service, request.method, request.path, key, response.status_code,
+                                          content_type, ttfb, end - start, self.scenario, body, chunks, tokens))
+            return ServedRequest(request.path, start, end, response.status_code, *tokens)
+
+        if content_type.startswith("text/event-stream"):
+            async def relay():
+                chunks: List[Tuple[float, str]] = []
+                try:
+                    async for text in response.aiter_text():
+                        chunks.append((round(time.perf_counter() - start - ttfb, 4), text))
+                        yield text
+                finally:
+                    await response.aclose()
+                    self.log.append(record(chunks=chunks, tokens=_stream_tokens(chunks)))
+            return StreamResponse(relay(), response.status_code, content_type=content_type), None
+
+        body = (await response.aread()).decode("utf-8", errors="replace")
+        await response.aclose()
+        try:
+            tokens = _usage_tokens(json.loads(body))
+        except ValueError:
+            tokens = (0, 0)
+        return Response(response.status_code, body, content_type=content_type), record(body, tokens=tokens)
+
+
+class ReplayServer(_MockServer):
+    """Serves one service's recordings from a cassette
+
+    Args:
+        latency: "original" for the recorded timing, "zero" for none, or a number scaling the recorded timing
+    """
+
+    def __init__(self, cassette: Cassette, service: str, latency: Union[str, float] = "zero", **kwargs):
+        super().__init__(MockConfig(), **kwargs)
+        self.cassette = cassette
+        self.service = service
+        self.scale = {"original": 1.0, "zero": 0.0}[latency] if isinstance(latency, str) else float(latency)
+        self.misses = 0
+        self.unmatched = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1" if self.service == "openai" else self.url
+
+    def reset(self):
+        super().reset()
+        self.cassette.rewind()
+        self.misses = 0
+        self.unmatched = 0
+
+    def use(self, cassette: Cassette):
+        self.cassette = cassette
+        self.reset()
+
+    async def _sleep(self, seconds: float):
+        if self.scale and seconds > 0:
+            await asyncio.sleep(seconds * self.scale)
+
+    async def dispatch(self, request, start: float):
+        if request.method == "GET" and request.path.endswith("/models"):
+            return Response.json({"object": "list", "data": []}), None
+        interaction, exact = self.cassette.match(self.service, request.method, request.path, request.body)
+        if interaction is None:
+            self.unmatched += 1
+            return Response.json({"error": {"message": f"no recording left for {request.path}"}}, status=404), None
+        if not exact:
+            self.misses += 1
+        await self._sleep(interaction.ttfb)
+
+        if interaction.chunks is not None:
+            async def replay():
+                status = interaction.status
+                previous = 0.0
+                try:
+                    for offset, text in interaction.chunks:
+                        await self._sleep(offset - previous)
+                        previous = offset
+                        yield text
+                except (asyncio.CancelledError, GeneratorExit):
+                    status = 499
+                    raise
+                finally:
+                    self.log.append(ServedRequest(request.path, start, time.perf_counter(), status,
+                                                  *interaction.tokens))
+            return StreamResponse(replay(), interaction.status, content_type=interaction.content_type), None
+
+        await self._sleep(interaction.duration - interaction.ttfb)
+        record = ServedRequest(request.path, start, time.perf_counter(), interaction.status, *interaction.tokens)
+        return Response(interaction.status, interaction.body or "", content_type=interaction.content_type), record
@@ -0,0 +1,83 @@
+"""Cold-start budget for the `co-researchers` CLI.
+
+Usage:
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --budget-ms 60 --repeats 10
+
+Each command is run in a fresh interpreter. The check fails if a command
+takes more than the budget beyond a bare `python -c pass`, or if any heavy
+dependency was imported before the command body needs it.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+HEAVY_MODULES = ["agno", "openai", "exa_py", "rich", "dotenv", "pydantic", "numpy", "asyncio"]
+
+# Commands that must start without the agent stack
+COMMANDS = {
+    "help": ["--help"],
+    "mlx-help": ["mlx", "--help"],
+    "status": ["--db", "{tmp}/jobs.db", "status"],
+    "submit": ["--db", "{tmp}/jobs.db", "submit", "deep_research", "topic=cold start", "depth=brief"],
+}
+
+_PROBE = """
+import json, sys
+from co_researchers import cli
+try:
+    cli.main(sys.argv[1:])
+except SystemExit:
+    pass
+sys.__stderr__.write("\\n" + json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)) + "\\n")
+"""
+
+
+def _time(argv: List[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - start
+
+
+def _loaded(args: List[str]) -> List[str]:
+    probe = _PROBE.format(heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", probe, *args], capture_output=True, text=True)
+    return json.loads(result.stderr.strip().splitlines()[-1])
+
+
+def measure(repeats: int = 5, tmp: str = ".") -> Dict[str, Dict[str, object]]:
+    baseline = statistics.median(_time([sys.executable, "-c", "pass"]) for _ in range(repeats))
+    report: Dict[str, Dict[str, object]] = {}
+    for name, template in COMMANDS.items():
+        args = [arg.format(tmp=tmp) for arg in template]
+        wall = statistics.median(_time([sys.executable, "-m", "co_researchers.cli", *args]) for _ in range(repeats))
+        report[name] = {"ms": wall * 1000, "over_python_ms": (wall - baseline) * 1000, "heavy": _loaded(args)}
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Check the CLI cold-start budget")
+    parser.add_argument("--budget-ms", type=float, default=80.0, help="Allowed time beyond interpreter startup")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = measure(args.repeats, tmp)
+    failed = False
+    for name, entry in report.items():
+        over = entry["over_python_ms"] > args.budget_ms or entry["heavy"]
+        failed = failed or bool(over)
+        heavy = ", ".join(entry["heavy"]) or "-"
+        print(f"{'FAIL' if over else 'ok  '} {name:<10} {entry['ms']:7.1f} ms "
+              f"(+{entry['over_python_ms']:.1f} ms over python)  heavy imports: {heavy}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
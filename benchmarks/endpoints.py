@@ -0,0 +1,48 @@
+"""Point the OpenAI and Exa clients at alternative endpoints.
+
+The OpenAI client honours `OPENAI_BASE_URL`; `exa_py` has no environment
+override and agno's `ExaTools` builds its client without a base URL, so the
+Exa client's default is swapped for the duration of the context.
+"""
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+@contextmanager
+def use_endpoints(openai_base_url: Optional[str] = None, exa_base_url: Optional[str] = None,
+                  placeholder_keys: bool = True) -> Iterator[None]:
+    overrides: Dict[str, str] = {"AGNO_TELEMETRY": "false"}
+    if openai_base_url:
+        overrides["OPENAI_BASE_URL"] = openai_base_url
+    if placeholder_keys:
+        overrides.setdefault("OPENAI_API_KEY", os.environ.get("OPENAI_API_KEY") or "sk-mock")
+        overrides.setdefault("EXA_API_KEY", os.environ.get("EXA_API_KEY") or "exa-mock")
+
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+
+    restore_exa = None
+    if exa_base_url:
+        from exa_py import Exa
+
+        original_init = Exa.__init__
+
+        def __init__(self, api_key=None, base_url=None, user_agent=None):
+            original_init(self, api_key, exa_base_url, user_agent)
+
+        Exa.__init__ = __init__
+
+        def restore_exa():
+            Exa.__init__ = original_init
+
+    try:
+        yield
+    finally:
+        if restore_exa:
+            restore_exa()
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
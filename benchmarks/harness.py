@@ -0,0 +1,455 @@
+"""End-to-end orchestration benchmarks against the local mock servers.
+
+Usage:
+    python -m benchmarks.harness --label baseline
+    python -m benchmarks.harness --scenarios deep_research --baseline benchmarks/results/baseline.json
+    python -m benchmarks.harness --record benchmarks/cassettes/live.json.gz --repeats 1
+    python -m benchmarks.harness --replay benchmarks/cassettes/live.json.gz --replay-latency zero --profile prof/
+
+Each scenario builds a real coordinator, points it at `MockOpenAIServer` and
+`MockExaServer`, runs it end-to-end and reports wall time, calls per second
+and per-stage overhead (stage wall time not covered by a request in flight on
+a mock server). Results are written as JSON so later runs can be compared
+against a saved baseline.
+
+With `--record` the traffic goes through a `RecordingProxy` (to the live APIs,
+or to the mocks with `--record-from-mocks`) and is saved as a cassette;
+`--replay` serves a cassette instead of the mocks. `--profile` runs each
+scenario under cProfile, dumps the stats and adds the slowest functions of our
+own packages to the report; `--trace` writes the stages and requests as a
+Chrome trace (chrome://tracing, Perfetto).
+"""
+import argparse
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import statistics
+import tempfile
+import time
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from co_researchers.context import run_scope
+from co_researchers.hedging import HedgePolicy
+from co_researchers.telemetry import Telemetry, set_telemetry
+
+from .cassette import EXA_UPSTREAM, OPENAI_UPSTREAM, Cassette, RecordingProxy, ReplayServer
+from .endpoints import use_endpoints
+from .mock_servers import LatencyModel, MockConfig, MockExaServer, MockOpenAIServer, ServedRequest
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+TOPIC = "What are the latest developments and challenges in quantum computing?"
+GOAL = "Find novel drug repurposing candidates for acute myeloid leukemia (AML)."
+MODEL_PATH = "Wan-AI/Wan2.1-T2V-1.3B"
+
+# Packages whose functions are reported as profile hotspots
+OWN_PACKAGES = ("co_researchers", "deep_research", "ai_co_scientist", "mlx_t2v_researcher")
+
+StageTiming = Tuple[str, float, float]
+
+
+async def _deep_research(timings: List[StageTiming]):
+    from deep_research.coordinator import DeepResearcher
+    researcher = instrument(DeepResearcher(), timings)
+    return await researcher.research(TOPIC, depth="comprehensive")
+
+
+async def _ai_co_scientist(timings: List[StageTiming]):
+    from ai_co_scientist.coordinator import AICoScientist
+    scientist = instrument(AICoScientist(), timings)
+    return await scientist.research(GOAL)
+
+
+async def _mlx_converter(timings: List[StageTiming]):
+    from mlx_t2v_researcher.coordinator import MLXConverter
+    converter = instrument(MLXConverter(), timings)
+    return await converter.plan_conversion(MODEL_PATH)
+
+
+async def _mlx_codegen(timings: List[StageTiming]):
+    from mlx_t2v_researcher.agents import MLXCodeGenerator
+    generator = instrument(MLXCodeGenerator(MODEL_PATH), timings)
+    analysis = await generator.analyze_and_plan()
+    code = await generator.generate_initial_code(analysis)
+    return await generator.refine_code(code)
+
+
+SCENARIOS: Dict[str, Callable[[List[StageTiming]], Awaitable[Any]]] = {
+    "deep_research": _deep_research,
+    "ai_co_scientist": _ai_co_scientist,
+    "mlx_converter": _mlx_converter,
+    "mlx_codegen": _mlx_codegen,
+}
+
+
+def instrument(coordinator: Any, timings: List[StageTiming]) -> Any:
+    """Wrap every agent reachable from a coordinator so its `arun` calls are timed"""
+    candidates: List[Tuple[str, Any]] = []
+    for name, value in vars(coordinator).items():
+        if isinstance(value, dict):
+            candidates.extend(value.items())
+        else:
+            candidates.append((name, getattr(value, "agent", value)))
+
+    for stage, agent in candidates:
+        arun = getattr(agent, "arun", None)
+        if arun is None or not callable(arun):
+            continue
+        agent.arun = _timed(stage, arun, timings)
+        astream = getattr(agent, "astream", None)
+        if astream is not None:
+            agent.astream = _timed_stream(stage, astream, timings)
+    return coordinator
+
+
+def _timed(stage: str, arun: Callable[..., Awaitable[Any]], timings: List[StageTiming]):
+    async def timed_arun(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await arun(*args, **kwargs)
+        finally:
+            timings.append((stage, start, time.perf_counter()))
+    return timed_arun
+
+
+def _timed_stream(stage: str, astream: Callable[..., Any], timings: List[StageTiming]):
+    async def timed_astream(*args, **kwargs):
+        start = time.perf_counter()
+        stream = astream(*args, **kwargs)
+        try:
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
+            timings.append((stage, start, time.perf_counter()))
+    return timed_astream
+
+
+def _busy_time(requests: List[ServedRequest], start: float, end: float) -> float:
+    """Length of the union of request intervals clipped to [start, end]"""
+    intervals = sorted((max(r.start, start), min(r.end, end)) for r in requests if r.end > start and r.start < end)
+    total, cursor = 0.0, start
+    for lo, hi in intervals:
+        lo = max(lo, cursor)
+        if hi > lo:
+            total += hi - lo
+            cursor = hi
+    return total
+
+
+def summarize_run(start: float, wall: float, timings: List[StageTiming], llm: List[ServedRequest],
+                  search: List[ServedRequest]) -> Dict[str, Any]:
+    served = llm + search
+    stages: Dict[str, Dict[str, float]] = {}
+    for stage, stage_start, stage_end in timings:
+        entry = stages.setdefault(stage, {"calls": 0, "wall": 0.0, "server": 0.0, "overhead": 0.0})
+        server = _busy_time(served, stage_start, stage_end)
+        entry["calls"] += 1
+        entry["wall"] += stage_end - stage_start
+        entry["server"] += server
+        entry["overhead"] += (stage_end - stage_start) - server
+
+    calls = len(served)
+    return {
+        "wall_time": wall,
+        "llm_calls": len(llm),
+        "search_calls": len(search),
+        "throttled": sum(1 for r in served if r.status == 429),
+        "completion_tokens": sum(r.completion_tokens for r in llm),
+        "calls_per_second": calls / wall if wall else 0.0,
+        "overhead": wall - _busy_time(served, start, start + wall),
+        "stages": stages,
+    }
+
+
+def aggregate(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median of each headline metric across repeats"""
+    keys = ["wall_time", "llm_calls", "search_calls", "throttled", "calls_per_second", "overhead"]
+    summary = {key: statistics.median(run[key] for run in runs) for key in keys}
+    hedges = [run["hedging"] for run in runs if "hedging" in run]
+    if hedges:
+        summary["hedges"] = sum(h["hedges"] for h in hedges)
+        summary["hedge_rate"] = summary["hedges"] / max(1, sum(h["calls"] for h in hedges))
+        summary["latency_saved"] = sum(h["latency_saved"] for h in hedges)
+    stage_names = {stage for run in runs for stage in run["stages"]}
+    summary["stages"] = {
+        stage: {
+            metric: statistics.median(run["stages"].get(stage, {}).get(metric, 0.0) for run in runs)
+            for metric in ("calls", "wall", "server", "overhead")
+        }
+        for stage in sorted(stage_names)
+    }
+    return summary
+
+
+@contextmanager
+def _workdir() -> Iterator[Path]:
+    """Run inside a scratch directory so generators writing `mlx_output/` don't touch the tree"""
+    previous = Path.cwd()
+    with tempfile.TemporaryDirectory(prefix="co-researchers-bench-") as tmp:
+        os.chdir(tmp)
+        try:
+            yield Path(tmp)
+        finally:
+            os.chdir(previous)
+
+
+def hotspots(profiler: cProfile.Profile, limit: Optional[int] = 15) -> List[Dict[str, Any]]:
+    """Functions of our own packages with the most time spent in their own bodies"""
+    entries = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in pstats.Stats(profiler).stats.items():
+        parts = Path(filename).parts
+        package = next((p for p in OWN_PACKAGES if p in parts), None)
+        if package is None:
+            continue
+        module = ".".join(parts[parts.index(package):])[:-3]
+        entries.append({"function": f"{module}:{line}({function})", "calls": calls,
+                        "tottime": tottime, "cumtime": cumtime})
+    entries.sort(key=lambda e: e["tottime"], reverse=True)
+    return entries[:limit]
+
+
+def trace_events(scenario: str, repeat: int, start: float, timings: List[StageTiming],
+                 llm: List[ServedRequest], search: List[ServedRequest]) -> List[Dict[str, Any]]:
+    """Chrome trace-event records for one run: a row per stage and per service"""
+    process = f"{scenario} #{repeat + 1}"
+    spans = [(stage, f"stage {stage}", s, e) for stage, s, e in timings]
+    spans += [(r.path, "openai", r.start, r.end) for r in llm]
+    spans += [(r.path, "exa", r.start, r.end) for r in search]
+    return [{"name": name, "ph": "X", "pid": process, "tid": row,
+             "ts": round((s - start) * 1e6), "dur": round((e - s) * 1e6)} for name, row, s, e in spans]
+
+
+@asynccontextmanager
+async def _servers(config: MockConfig, search_config: MockConfig, record: Optional[Cassette] = None,
+                   record_from_mocks: bool = False, replay: Optional[Cassette] = None,
+                   replay_latency: Union[str, float] = "zero") -> AsyncIterator[Tuple[Any, Any]]:
+    """The (LLM, search) servers the clients talk to: mocks, a recording proxy or a replay"""
+    async with AsyncExitStack() as stack:
+        if replay is not None:
+            llm = await stack.enter_async_context(ReplayServer(replay, "openai", replay_latency))
+            exa = await stack.enter_async_context(ReplayServer(replay, "exa", replay_latency))
+        elif record is not None:
+            upstreams = (OPENAI_UPSTREAM, EXA_UPSTREAM)
+            if record_from_mocks:
+                mocks = (await stack.enter_async_context(MockOpenAIServer(config)),
+                         await stack.enter_async_context(MockExaServer(search_config)))
+                upstreams = tuple(mock.url for mock in mocks)
+            llm = await stack.enter_async_context(RecordingProxy(record, "openai", upstreams[0]))
+            exa = await stack.enter_async_context(RecordingProxy(record, "exa", upstreams[1]))
+        else:
+            llm = await stack.enter_async_context(MockOpenAIServer(config))
+            exa = await stack.enter_async_context(MockExaServer(search_config))
+        yield llm, exa
+
+
+async def run_benchmarks(scenarios: List[str], config: MockConfig, repeats: int = 1,
+                         search_config: Optional[MockConfig] = None,
+                         hedging: Optional[HedgePolicy] = None, record: Optional[Cassette] = None,
+                         record_from_mocks: bool = False, replay: Optional[Cassette] = None,
+                         replay_latency: Union[str, float] = "zero", profile_dir: Optional[Path] = None,
+                         trace: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Run each scenario `repeats` times
+
+    Args:
+        record: Cassette to record the run's traffic into
+        record_from_mocks: Record the mock servers' responses instead of the live APIs'
+        replay: Cassette to serve instead of the mock servers
+        replay_latency: "original", "zero" or a factor applied to the recorded timing
+        profile_dir: Directory for one cProfile dump per scenario; also adds `hotspots` to the results
+        trace: List that Chrome trace events are appended to
+    """
+    results: Dict[str, Any] = {}
+    search_config = search_config or config
+    async with _servers(config, search_config, record, record_from_mocks, replay, replay_latency) as (llm, exa):
+        with use_endpoints(llm.base_url, exa.base_url), _workdir():
+            for name in scenarios:
+                if replay is not None:
+                    llm.use(replay.scenario(name))
+                    exa.use(replay.scenario(name))
+                if record is not None:
+                    llm.scenario = exa.scenario = name
+                # Telemetry is kept across repeats so adaptive policies warm up
+                telemetry = Telemetry()
+                set_telemetry(telemetry)
+                profiler = cProfile.Profile() if profile_dir else None
+                runs = []
+                for repeat in range(repeats):
+                    llm.reset()
+                    exa.reset()
+                    timings: List[StageTiming] = []
+                    start = time.perf_counter()
+                    with run_scope(hedging=hedging) as run_context:
+                        if profiler:
+                            profiler.enable()
+                        try:
+                            await SCENARIOS[name](timings)
+                        finally:
+                            if profiler:
+                                profiler.disable()
+                    wall = time.perf_counter() - start
+                    run = summarize_run(start, wall, timings, list(llm.log), list(exa.log))
+                    run["hedging"] = run_context.hedge_stats.report()
+                    if replay is not None:
+                        run["replay"] = {"inexact": llm.misses + exa.misses,
+                                         "unmatched": llm.unmatched + exa.unmatched}
+                    if trace is not None:
+                        trace.extend(trace_events(name, repeat, start, timings, list(llm.log), list(exa.log)))
+                    runs.append(run)
+                results[name] = {"runs": runs, "summary": aggregate(runs), "routes": telemetry.summary()}
+                if profiler:
+                    profile_dir.mkdir(parents=True, exist_ok=True)
+                    profiler.dump_stats(str(profile_dir / f"{name}.prof"))
+                    functions = hotspots(profiler, limit=None)
+                    results[name]["hotspots"] = functions[:15]
+                    # CPU time in our own code per run, comparable against a baseline profile
+                    results[name]["summary"]["profiled_cpu"] = sum(f["tottime"] for f in functions) / repeats
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Relative change of each scenario's median metrics against a baseline report"""
+    deltas: Dict[str, Dict[str, float]] = {}
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        deltas[name] = {}
+        for metric in ("wall_time", "calls_per_second", "overhead", "profiled_cpu"):
+            if metric not in base["summary"] or metric not in result["summary"]:
+                continue
+            before, after = base["summary"][metric], result["summary"][metric]
+            deltas[name][metric] = (after - before) / before if before else 0.0
+    return deltas
+
+
+def save_report(report: Dict[str, Any], output_dir: Path = RESULTS_DIR) -> Path:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"{report['label']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def print_report(report: Dict[str, Any], deltas: Optional[Dict[str, Dict[str, float]]] = None):
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    for name, result in report["scenarios"].items():
+        summary = result["summary"]
+        table = Table(title=f"{name}  wall={summary['wall_time']:.2f}s  "
+                            f"calls/s={summary['calls_per_second']:.2f}  "
+                            f"overhead={summary['overhead']:.3f}s  throttled={summary['throttled']:g}")
+        for column in ("stage", "calls", "wall (s)", "server (s)", "overhead (s)"):
+            table.add_column(column, justify="left" if column == "stage" else "right")
+        for stage, stats in summary["stages"].items():
+            table.add_row(stage, f"{stats['calls']:.0f}", f"{stats['wall']:.3f}",
+                          f"{stats['server']:.3f}", f"{stats['overhead']:.3f}")
+        console.print(table)
+        if summary.get("hedges"):
+            console.print(f"[dim]hedges={summary['hedges']} rate={summary['hedge_rate']:.1%} "
+                          f"est. latency saved={summary['latency_saved']:.2f}s[/dim]")
+        if result.get("hotspots"):
+            hot = Table(title=f"{name}  own-code CPU={summary['profiled_cpu']:.3f}s per run")
+            for column in ("function", "calls", "tottime (s)", "cumtime (s)"):
+                hot.add_column(column, justify="left" if column == "function" else "right")
+            for entry in result["hotspots"][:10]:
+                hot.add_row(entry["function"], str(entry["calls"]), f"{entry['tottime']:.4f}",
+                            f"{entry['cumtime']:.4f}")
+            console.print(hot)
+        if deltas and name in deltas:
+            changes = ", ".join(f"{metric} {change:+.1%}" for metric, change in deltas[name].items())
+            console.print(f"[dim]vs baseline: {changes}[/dim]")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark coordinators against local mock APIs")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--latency", default="lognormal:0.5:0.3",
+                        help="LLM time-to-first-byte as distribution:mean[:spread]")
+    parser.add_argument("--search-latency", default="lognormal:0.2:0.2")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--response-tokens", type=int, default=250)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second before 429s")
+    parser.add_argument("--throttle-probability", type=float, default=0.0)
+    parser.add_argument("--tool-call-rate", type=float, default=0.5)
+    parser.add_argument("--hedge-max", type=int, default=0, help="Hedged requests allowed per run (0 disables)")
+    parser.add_argument("--hedge-quantile", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output-dir", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--baseline", type=Path, help="Report to compare against")
+    parser.add_argument("--record", type=Path, help="Record the traffic into this cassette (.json or .json.gz)")
+    parser.add_argument("--record-from-mocks", action="store_true",
+                        help="Record the mock servers instead of the live OpenAI and Exa APIs")
+    parser.add_argument("--replay", type=Path, help="Serve this cassette instead of the mock servers")
+    parser.add_argument("--replay-latency", default="zero",
+                        help="original, zero, or a factor applied to the recorded timing")
+    parser.add_argument("--profile", type=Path, help="Directory for per-scenario cProfile dumps")
+    parser.add_argument("--trace", type=Path, help="Write a Chrome trace-event JSON file")
+    args = parser.parse_args(argv)
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+
+    config = MockConfig(
+        latency=LatencyModel.parse(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        rate_limit_rps=args.rate_limit,
+        throttle_probability=args.throttle_probability,
+        tool_call_rate=args.tool_call_rate,
+        seed=args.seed,
+    )
+    search_config = MockConfig(latency=LatencyModel.parse(args.search_latency), seed=args.seed)
+    hedging = HedgePolicy(quantile=args.hedge_quantile, max_hedges=args.hedge_max) if args.hedge_max else None
+    record = Cassette(metadata={"scenarios": args.scenarios, "repeats": args.repeats,
+                                "recorded": datetime.now().isoformat(),
+                                "upstream": "mocks" if args.record_from_mocks else "live"}) if args.record else None
+    replay = Cassette.load(args.replay) if args.replay else None
+    latency = args.replay_latency if args.replay_latency in ("original", "zero") else float(args.replay_latency)
+    trace: Optional[List[Dict[str, Any]]] = [] if args.trace else None
+    scenarios = asyncio.run(run_benchmarks(args.scenarios, config, args.repeats, search_config, hedging,
+                                           record=record, record_from_mocks=args.record_from_mocks, replay=replay,
+                                           replay_latency=latency, profile_dir=args.profile, trace=trace))
+    if record is not None:
+        args.record.parent.mkdir(parents=True, exist_ok=True)
+        record.save(args.record)
+        print(f"Recorded {len(record)} interactions to {args.record}")
+    if trace is not None:
+        with open(args.trace, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+    report = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "llm": asdict(config),
+            "search": asdict(search_config),
+            "repeats": args.repeats,
+            "hedging": asdict(hedging) if hedging else None,
+            "replay": {"cassette": str(args.replay), "latency": args.replay_latency} if args.replay else None,
+        },
+        "scenarios": scenarios,
+    }
+    path = save_report(report, args.output_dir)
+
+    deltas = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            deltas = compare(report, json.load(f))
+        report["baseline"] = {"path": str(args.baseline), "deltas": deltas}
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    print_report(report, deltas)
+    print(f"\nSaved results to {path}")
+
+
+if __name__ == "__main__":
+    main()
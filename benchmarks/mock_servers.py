@@ -0,0 +1,367 @@
+"""Local stand-ins for the OpenAI chat API and Exa search.
+
+The servers speak enough of both wire protocols for the real `openai` and
+`exa_py` clients (and therefore agno agents) to run against them unmodified.
+Latency, token throughput, rate limiting and the canned responses are all
+configurable so orchestration changes can be measured without paying for
+real API calls.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from co_researchers.httpserver import HTTPServer, Request, Response, StreamResponse, sse_event
+
+
+@dataclass
+class LatencyModel:
+    """Distribution of time-to-first-byte, in seconds"""
+    distribution: str = "lognormal"
+    mean: float = 0.5
+    spread: float = 0.3
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parse `distribution:mean[:spread]`, e.g. `lognormal:0.8:0.4`"""
+        parts = spec.split(":")
+        model = cls(distribution=parts[0])
+        if len(parts) > 1:
+            model.mean = float(parts[1])
+        if len(parts) > 2:
+            model.spread = float(parts[2])
+        return model
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "constant":
+            return self.mean
+        if self.distribution == "uniform":
+            return max(0.0, rng.uniform(self.mean - self.spread, self.mean + self.spread))
+        if self.distribution == "normal":
+            return max(0.0, rng.gauss(self.mean, self.spread))
+        if self.distribution == "lognormal":
+            # Parameterised so that the median is `mean` and `spread` is the sigma
+            # of the underlying normal, which gives the long right tail real APIs show.
+            return self.mean * rng.lognormvariate(0.0, self.spread)
+        raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+
+@dataclass
+class MockConfig:
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    tokens_per_second: float = 80.0
+    response_tokens: int = 250
+    rate_limit_rps: Optional[float] = None
+    throttle_probability: float = 0.0
+    tool_call_rate: float = 0.5
+    seed: Optional[int] = None
+
+
+Template = Union[str, Callable[[str], str]]
+
+
+class CannedResponses:
+    """Maps prompts to response text with first-match-wins regex rules"""
+
+    def __init__(self, rules: Optional[List[Tuple[str, Template]]] = None, response_tokens: int = 250):
+        self.rules = [(re.compile(pattern, re.IGNORECASE), template) for pattern, template in rules or []]
+        self.response_tokens = response_tokens
+
+    def add(self, pattern: str, template: Template):
+        self.rules.append((re.compile(pattern, re.IGNORECASE), template))
+
+    def respond(self, prompt: str) -> str:
+        for pattern, template in self.rules:
+            if pattern.search(prompt):
+                return template(prompt) if callable(template) else template
+        if re.search(r"\bJSON array\b", prompt):
+            return self._json_response(prompt)
+        if re.search(r"\b(code|implementation)\b", prompt, re.IGNORECASE):
+            return self._code_response()
+        return self._markdown_response(prompt)
+
+    def _json_response(self, prompt: str) -> str:
+        # Objects with every field name the prompt quotes, one per "### <id>:" heading or 5 by default
+        fields = re.findall(r'^\s*"(\w+)"', prompt, re.MULTILINE)
+        fields += [f for group in re.findall(r'^\s*("\w+"(?:, "\w+")+):', prompt, re.MULTILINE)
+                   for f in re.findall(r'"(\w+)"', group)]
+        ids = re.findall(r"^#{1,6}\s+(\w+):", prompt, re.MULTILINE) or [None] * 5
+        words = re.findall(r"[A-Za-z]{4,}", prompt)[:40] or ["research"]
+        per_item = max(1, self.response_tokens // (len(ids) * max(1, len(fields))))
+        items = []
+        for index, item_id in enumerate(ids):
+            text = " ".join(words[(index + i) % len(words)] for i in range(per_item))
+            item = {}
+            for name in fields:
+                if name == "id":
+                    item[name] = item_id or f"H{index + 1}"
+                elif name == "verdict":
+                    item[name] = "revise"
+                elif name in ("correctness", "quality", "novelty", "testability", "score"):
+                    item[name] = 5 + (index * 3 + len(name)) % 5
+                elif name.endswith("s") and name not in ("hypothesis", "analysis"):
+                    item[name] = [text]
+                else:
+                    item[name] = text
+            items.append(item)
+        return "```json\n" + json.dumps(items, indent=2) + "\n```\n"
+
+    def _markdown_response(self, prompt: str) -> str:
+        words = re.findall(r"[A-Za-z]{4,}", prompt)[:40] or ["research"]
+        sections = []
+        budget = self.response_tokens
+        index = 1
+        while budget > 0:
+            topic = " ".join(words[(index * 3) % len(words):][:3]) or "research"
+            body = " ".join(words[(index + i) % len(words)] for i in range(min(budget, 40)))
+            sections.append(f"## {index}. {topic.title()}\n\n- {body}\n")
+            budget -= 45
+            index += 1
+        return "\n".join(sections)
+
+    def _code_response(self) -> str:
+        layers = max(1, self.response_tokens // 60)
+        body = "\n".join(
+            f"        self.layer_{i} = nn.Linear(dims, dims)" for i in range(layers)
+        )
+        calls = "\n".join(f"        x = nn.gelu(self.layer_{i}(x))" for i in range(layers))
+        return (
+            "Here is the implementation:\n\n```python\n"
+            "import mlx.core as mx\nimport mlx.nn as nn\n\n\n"
+            "class Block(nn.Module):\n"
+            "    def __init__(self, dims: int = 64):\n"
+            "        super().__init__()\n"
+            f"{body}\n\n"
+            "    def __call__(self, x):\n"
+            f"{calls}\n"
+            "        return x\n```\n"
+        )
+
+
+@dataclass
+class ServedRequest:
+    path: str
+    start: float
+    end: float
+    status: int
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class _MockServer:
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.rng = random.Random(self.config.seed)
+        self.log: List[ServedRequest] = []
+        self._http = HTTPServer(self._handle, host, port)
+        # Capacity is at least one request, so rates below 1 rps still admit requests
+        self._bucket = max(1.0, self.config.rate_limit_rps or 0.0)
+        self._bucket_updated = time.monotonic()
+
+    @property
+    def url(self) -> str:
+        return self._http.url
+
+    async def start(self) -> "_MockServer":
+        await self._http.start()
+        return self
+
+    async def stop(self):
+        await self._http.stop()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def reset(self):
+        self.log.clear()
+
+    def _throttled(self) -> bool:
+        if self.config.throttle_probability and self.rng.random() < self.config.throttle_probability:
+            return True
+        rps = self.config.rate_limit_rps
+        if not rps:
+            return False
+        now = time.monotonic()
+        self._bucket = min(max(1.0, rps), self._bucket + (now - self._bucket_updated) * rps)
+        self._bucket_updated = now
+        if self._bucket < 1.0:
+            return True
+        self._bucket -= 1.0
+        return False
+
+    async def _handle(self, request: Request):
+        start = time.perf_counter()
+        if self._throttled():
+            self.log.append(ServedRequest(request.path, start, time.perf_counter(), 429))
+            return Response.json(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"retry-after-ms": "200", "retry-after": "1"},
+            )
+        response, record = await self.dispatch(request, start)
+        if record is not None:
+            self.log.append(record)
+        return response
+
+    async def dispatch(self, request: Request, start: float):
+        raise NotImplementedError
+
+
+class MockOpenAIServer(_MockServer):
+    """Serves `/v1/chat/completions` (plain and streaming) and `/v1/models`"""
+
+    def __init__(self, config: Optional[MockConfig] = None, responses: Optional[CannedResponses] = None, **kwargs):
+        super().__init__(config, **kwargs)
+        self.responses = responses or CannedResponses(response_tokens=self.config.response_tokens)
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    async def dispatch(self, request: Request, start: float):
+        if request.path.endswith("/models"):
+            return Response.json({"object": "list", "data": []}), None
+        if not request.path.endswith("/chat/completions"):
+            return Response.json({"error": {"message": "not found"}}, status=404), None
+
+        payload = request.json()
+        messages = payload.get("messages", [])
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+        prompt_tokens = len(prompt.split())
+        tool_call = self._tool_call(payload, messages)
+        text = "" if tool_call else self.responses.respond(prompt)
+        tokens = text.split(" ") if text else []
+        model = payload.get("model", "mock")
+
+        await asyncio.sleep(self.config.latency.sample(self.rng))
+        if payload.get("stream"):
+            return self._stream(model, tokens, tool_call, prompt_tokens, request.path, start), None
+
+        await asyncio.sleep(len(tokens) / self.config.tokens_per_second)
+        message: Dict[str, Any] = {"role": "assistant", "content": text or None}
+        if tool_call:
+            message["tool_calls"] = [tool_call]
+        record = ServedRequest(request.path, start, time.perf_counter(), 200, prompt_tokens, len(tokens))
+        return Response.json({
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_call else "stop",
+            }],
+            "usage": _usage(prompt_tokens, len(tokens)),
+        }), record
+
+    def _tool_call(self, payload: Dict[str, Any], messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        tools = payload.get("tools") or []
+        if not tools or not messages or messages[-1].get("role") == "tool":
+            return None
+        if self.rng.random() >= self.config.tool_call_rate:
+            return None
+        names = [t.get("function", {}).get("name") for t in tools]
+        name = next((n for n in names if n and "search" in n), names[0])
+        query = str(messages[-1].get("content") or "")[:80]
+        return {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps({"query": query})},
+        }
+
+    def _stream(self, model: str, tokens: List[str], tool_call: Optional[Dict[str, Any]],
+                prompt_tokens: int, path: str, start: float) -> StreamResponse:
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        interval = 1.0 / self.config.tokens_per_second
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage=None) -> str:
+            data: Dict[str, Any] = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+            }
+            if usage is not None:
+                data["usage"] = usage
+            return sse_event(data)
+
+        async def events():
+            status = 200
+            try:
+                yield chunk({"role": "assistant", "content": ""})
+                if tool_call:
+                    yield chunk({"tool_calls": [{"index": 0, **tool_call}]})
+                for i, token in enumerate(tokens):
+                    await asyncio.sleep(interval)
+                    yield chunk({"content": token if i == 0 else " " + token})
+                yield chunk({}, "tool_calls" if tool_call else "stop")
+                yield chunk({}, usage=_usage(prompt_tokens, len(tokens)))
+                yield sse_event("[DONE]")
+            except (asyncio.CancelledError, GeneratorExit):
+                status = 499
+                raise
+            finally:
+                self.log.append(ServedRequest(path, start, time.perf_counter(), status, prompt_tokens, len(tokens)))
+
+        return StreamResponse(events())
+
+
+class MockExaServer(_MockServer):
+    """Serves the Exa `/search`, `/contents`, `/findSimilar` and `/answer` endpoints"""
+
+    def __init__(self, config: Optional[MockConfig] = None, results_per_query: int = 5, **kwargs):
+        super().__init__(config, **kwargs)
+        self.results_per_query = results_per_query
+
+    @property
+    def base_url(self) -> str:
+        return self.url
+
+    async def dispatch(self, request: Request, start: float):
+        payload = request.json() or {}
+        await asyncio.sleep(self.config.latency.sample(self.rng))
+        query = str(payload.get("query") or payload.get("url") or "")
+        if request.path == "/answer":
+            body: Dict[str, Any] = {"answer": f"Mock answer for: {query}", "citations": self._results(query, 2)}
+        elif request.path in ("/search", "/findSimilar"):
+            body = {"results": self._results(query, int(payload.get("numResults") or self.results_per_query))}
+        elif request.path == "/contents":
+            body = {"results": [self._result(str(i), str(i)) for i in payload.get("ids", payload.get("urls", []))]}
+        else:
+            return Response.json({"error": "not found"}, status=404), None
+        return Response.json(body), ServedRequest(request.path, start, time.perf_counter(), 200)
+
+    def _results(self, query: str, count: int) -> List[Dict[str, Any]]:
+        return [self._result(query, str(i)) for i in range(count)]
+
+    def _result(self, query: str, key: str) -> Dict[str, Any]:
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:40] or "result"
+        return {
+            "id": f"https://example.org/{slug}/{key}",
+            "url": f"https://example.org/{slug}/{key}",
+            "title": f"{query[:60]} ({key})",
+            "score": round(self.rng.random(), 3),
+            "publishedDate": "2025-01-01",
+            "author": "Mock Author",
+            "text": f"Synthetic document {key} about {query}. " * 5,
+            "highlights": [f"Key finding {key} about {query[:40]}"],
+            "highlightScores": [0.5],
+        }
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
@@ -0,0 +1 @@
+"""Shared runtime for the co-researchers packages."""
@@ -0,0 +1,201 @@
+"""Deadline and token budgets for anytime execution of a coordinator pipeline.
+
+A coordinator declares its stages up front, and some of them are optional.
+Before each optional stage, `RunBudget.decide` estimates the stage's cost and
+the cost of the required stages after it. Estimates come from telemetry: a
+latency quantile and the mean token count per call of the stage's route. The
+process-wide telemetry is seeded with the samples persisted by earlier runs,
+so the defaults below only apply to routes that have never run. A stage
+whose number of calls depends on an earlier stage's output is updated with
+`expect` once that output is known. If
+both costs fit in what is left, the stage runs. If only about half of the
+stage's cost fits, it runs shortened. Otherwise it is skipped.
+
+Every stage is awaited with a timeout bounded by the deadline. An optional
+stage also stops where the required stages after it would lose their time.
+A required stage that runs out of time raises `BudgetExceeded`, and the
+coordinator returns what it has so far. Either way, the stages that did not
+run are listed in `skipped`.
+
+Tokens are charged by `RoutedAgent` as calls complete, through the budget
+bound to the current context with `budget_scope`.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .telemetry import Telemetry, get_telemetry
+
+# Cost assumed for a route without telemetry yet
+DEFAULT_CALL_SECONDS = 30.0
+DEFAULT_CALL_TOKENS = 2000
+
+SHORTEN_PROMPT = "\n\nTime is limited: answer briefly, in at most about 200 words, covering only the most important points."
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+@dataclass
+class BudgetStage:
+    name: str
+    route: str
+    optional: bool = False
+    calls: int = 1  # concurrent calls: they share wall time but each spends tokens
+
+
+class RunBudget:
+    def __init__(self, deadline: Optional[float] = None, tokens: Optional[int] = None,
+                 telemetry: Optional[Telemetry] = None, quantile: float = 0.75, margin: float = 0.1):
+        """
+        Args:
+            deadline: Wall-clock seconds from now by which the result must be returned
+            tokens: Most tokens the run may spend across all its model calls
+            telemetry: Where stage costs are estimated from (default: the process-wide telemetry)
+            quantile: Latency quantile used as a stage's expected duration
+            margin: Fraction added to estimates before comparing them with what is left
+        """
+        self.deadline = deadline
+        self.tokens = tokens
+        self._telemetry = telemetry
+        self.quantile = quantile
+        self.margin = margin
+        self.started = time.monotonic()
+        self.tokens_used = 0
+        self.stages: List[BudgetStage] = []
+        self.completed: List[str] = []
+        self.shortened: List[str] = []
+        self.skipped: List[str] = []
+        self.exceeded: Optional[str] = None
+
+    @property
+    def bounded(self) -> bool:
+        return self.deadline is not None or self.tokens is not None
+
+    @property
+    def telemetry(self) -> Telemetry:
+        return self._telemetry or get_telemetry()
+
+    def begin(self, stages: Sequence[BudgetStage]):
+        self.stages = list(stages)
+
+    def expect(self, name: str, calls: int):
+        """Set how many calls a stage will make, once an earlier stage's output tells"""
+        self._stage(name).calls = max(1, calls)
+
+    def remaining_time(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - (time.monotonic() - self.started)
+
+    def remaining_tokens(self) -> Optional[int]:
+        return None if self.tokens is None else self.tokens - self.tokens_used
+
+    def charge(self, tokens: int):
+        self.tokens_used += tokens
+
+    def estimate(self, stage: BudgetStage) -> Tuple[float, int]:
+        """Expected (seconds, tokens) of a stage from its route's telemetry"""
+        telemetry = self.telemetry
+        seconds = telemetry.latency_percentile(stage.route, self.quantile)
+        counts = telemetry.token_counts(stage.route)
+        per_call = sum(counts) / len(counts) if counts else DEFAULT_CALL_TOKENS
+        return (DEFAULT_CALL_SECONDS if seconds is None else seconds), int(per_call * stage.calls)
+
+    def _stage(self, name: str) -> BudgetStage:
+        return next(stage for stage in self.stages if stage.name == name)
+
+    def _reserved(self, name: str) -> Tuple[float, int]:
+        """Estimated cost of the required stages after `name`"""
+        names = [stage.name for stage in self.stages]
+        later = [s for s in self.stages[names.index(name) + 1:] if not s.optional]
+        estimates = [self.estimate(s) for s in later]
+        return sum(e[0] for e in estimates), sum(e[1] for e in estimates)
+
+    def _fits(self, name: str, fraction: float) -> bool:
+        seconds, tokens = self.estimate(self._stage(name))
+        reserved_seconds, reserved_tokens = self._reserved(name)
+        scale = 1 + self.margin
+        time_left, tokens_left = self.remaining_time(), self.remaining_tokens()
+        return ((time_left is None or time_left >= (reserved_seconds + fraction * seconds) * scale)
+                and (tokens_left is None or tokens_left >= (reserved_tokens + fraction * tokens) * scale))
+
+    def decide(self, name: str) -> str:
+        """"run", "short" or "skip" for an optional stage, given what the rest of the pipeline needs"""
+        if not self.bounded or self._fits(name, 1.0):
+            return "run"
+        if self._fits(name, 0.5):
+            self.shortened.append(name)
+            return "short"
+        self.skipped.append(name)
+        return "skip"
+
+    async def run(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        """Await one stage within the budget
+
+        An optional stage that overruns is cancelled and returns None; a required one raises
+        `BudgetExceeded`, as does any stage started with the budget already spent.
+        """
+        stage = self._stage(name)
+        timeout = self.remaining_time()
+        if stage.optional and timeout is not None:
+            timeout -= self._reserved(name)[0] * (1 + self.margin)
+        tokens_left = self.remaining_tokens()
+        if (timeout is not None and timeout <= 0) or (tokens_left is not None and tokens_left <= 0):
+            if isinstance(awaitable, asyncio.Future):
+                awaitable.cancel()
+            elif hasattr(awaitable, "close"):
+                awaitable.close()
+            return self._overrun(stage, "budget spent before the stage started")
+        try:
+            result = await asyncio.wait_for(awaitable, timeout) if timeout is not None else await awaitable
+        except asyncio.TimeoutError:
+            return self._overrun(stage, "deadline reached during the stage")
+        self.completed.append(name)
+        return result
+
+    def _overrun(self, stage: BudgetStage, reason: str) -> None:
+        if stage.optional:
+            self.skipped.append(stage.name)
+            return None
+        self.exceeded = f"{stage.name}: {reason}"
+        raise BudgetExceeded(stage.name, reason)
+
+    def skip_remaining(self):
+        """Mark every stage that has not completed or been skipped as skipped"""
+        for stage in self.stages:
+            if stage.name not in self.completed and stage.name not in self.skipped:
+                self.skipped.append(stage.name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "deadline": self.deadline,
+            "elapsed": round(time.monotonic() - self.started, 3),
+            "token_budget": self.tokens,
+            "tokens_used": self.tokens_used,
+            "completed": list(self.completed),
+            "shortened": list(self.shortened),
+            "skipped": list(self.skipped),
+            "exceeded": self.exceeded,
+        }
+
+
+_current: ContextVar[Optional[RunBudget]] = ContextVar("co_researchers_budget", default=None)
+
+
+def current_budget() -> Optional[RunBudget]:
+    return _current.get()
+
+
+@contextmanager
+def budget_scope(budget: RunBudget) -> Iterator[RunBudget]:
+    token = _current.set(budget)
+    try:
+        yield budget
+    finally:
+        _current.reset(token)
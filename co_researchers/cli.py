@@ -0,0 +1,368 @@
+"""`co-researchers` command line entry point.
+
+Only argparse and the standard library are imported up front. Each command
+imports the coordinator or utility it runs, so `--help`, job status and the
+converter utilities never load agno, OpenAI, Exa or rich; a spawned worker
+process only loads them when it picks up a job.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+from .jobqueue import DEFAULT_DB
+from .worker import add_job_commands
+
+
+def _load_env():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def _run_async(coroutine) -> Any:
+    import asyncio
+
+    from .telemetry import save_telemetry
+
+    try:
+        return asyncio.run(coroutine)
+    finally:
+        # Later runs estimate their deadlines from these calls
+        save_telemetry()
+
+
+def _emit(results: Dict[str, Any], key: str, output: Optional[str]):
+    """Write all results as JSON to `output`, and print the `key` section (else the latest one) as markdown"""
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+    from rich.console import Console
+    from rich.markdown import Markdown
+
+    # A run cut short by its deadline may not have reached `key`
+    section = results.get(key) or next((v for v in reversed(list(results.values())) if isinstance(v, str) and v), "")
+    Console().print(Markdown(str(section)))
+
+
+def _report_budget(results: Dict[str, Any]):
+    if "budget" in results:
+        budget = results["budget"]
+        print(f"budget: {budget['elapsed']:.1f}s, {budget['tokens_used']} tokens; "
+              f"skipped: {', '.join(results['skipped_stages']) or 'none'}", file=sys.stderr)
+
+
+def _deep_research(args):
+    _load_env()
+    from deep_research.coordinator import DeepResearcher
+    from deep_research.topic_cache import TopicCache, default_cache
+
+    cache = TopicCache(args.cache, reuse_threshold=args.reuse_threshold) if args.cache else default_cache()
+    results = _run_async(DeepResearcher(cache=cache).research(args.topic, depth=args.depth, deadline=args.deadline,
+                                                              token_budget=args.token_budget))
+    if "cache" in results:
+        print(f"topic cache: {results['cache']['status']} (similarity {results['cache']['similarity']:.3f})",
+              file=sys.stderr)
+    _report_budget(results)
+    _emit(results, "synthesis", args.output)
+
+
+def _co_scientist(args):
+    _load_env()
+    from ai_co_scientist.coordinator import AICoScientist
+    from ai_co_scientist.store import HypothesisStore, default_store
+
+    store = HypothesisStore(args.store) if args.store else default_store()
+    scientist = AICoScientist(review_batch_size=args.review_batch_size, store=store)
+    results = _run_async(scientist.research(args.goal, deadline=args.deadline, token_budget=args.token_budget))
+    if "tournament" in results:
+        tournament = results["tournament"]
+        print(f"hypothesis store: {tournament['new']} new, {tournament['matches']} matches played, "
+              f"{tournament['population']} ranked", file=sys.stderr)
+    _report_budget(results)
+    _emit(results, "report", args.output)
+
+
+def _mlx_plan(args):
+    from mlx_t2v_researcher.coordinator import MLXConverter
+
+    results = _run_async(MLXConverter(stream=not args.no_stream).plan_conversion(args.model_path))
+    _emit(results, "conversion_plan", args.output)
+
+
+def _mlx_codegen(args):
+    import asyncio
+    from pathlib import Path
+
+    _load_env()
+    from mlx_t2v_researcher.agents import MLXCodeGenerator
+    from mlx_t2v_researcher.components import ComponentCache, default_component_cache
+
+    cache = ComponentCache(args.component_cache) if args.component_cache else default_component_cache()
+    if cache is None and len(args.model_repo_path) > 1:
+        # Repos converted together share their common components even without a cache file
+        cache = ComponentCache(":memory:")
+
+    async def run(path: str, output_path: str):
+        generator = MLXCodeGenerator(path, output_path=output_path, smoke_test=not args.no_smoke_test,
+                                     candidates=args.candidates, component_cache=cache)
+        analysis = await generator.analyze_and_plan()
+        results = await generator.generate_initial_code(analysis)
+        return await generator.refine_until_converged(results, max_refinements=args.refinements)
+
+    async def run_all():
+        if len(args.model_repo_path) == 1:
+            return await run(args.model_repo_path[0], args.output_path)
+        outputs = [f"{args.output_path}/{Path(path).name}" for path in args.model_repo_path]
+        return dict(zip(args.model_repo_path, await asyncio.gather(*map(run, args.model_repo_path, outputs))))
+
+    results = _run_async(run_all())
+    if cache is not None:
+        stats = cache.stats.to_dict()
+        print(f"component cache: {stats['hits']} hits, {stats['shared']} shared, {stats['misses']} generated",
+              file=sys.stderr)
+    if len(args.model_repo_path) == 1:
+        _emit(results, "code", args.output)
+    else:
+        _emit({**results, "code": "\n\n".join(f"# {path}\n\n{r['code']}" for path, r in results.items())},
+              "code", args.output)
+
+
+def _components(args):
+    from mlx_t2v_researcher.components import ComponentCache
+
+    cache = ComponentCache(args.cache)
+    for fingerprint in args.evict or []:
+        print(f"evicted {cache.evict(fingerprint, args.stage)} entries for {fingerprint}", file=sys.stderr)
+    if not args.evict:
+        for entry in cache.entries():
+            print(f"{entry['fingerprint'][:16]}  {entry['stage']:<8}  {entry['component']:<30}  "
+                  f"{entry['hits']:>4} hits  {entry['model_repo']}")
+
+
+def _extract_code(args):
+    from mlx_t2v_researcher.codeblocks import PYTHON_LANGUAGES, extract_code
+
+    with open(args.path) as f:
+        sys.stdout.write(extract_code(f.read(), None if args.all_languages else PYTHON_LANGUAGES))
+
+
+def _convergence(args):
+    from mlx_t2v_researcher.convergence import ConvergenceMonitor
+
+    monitor = ConvergenceMonitor(threshold=args.threshold)
+    for path in args.paths:
+        with open(path) as f:
+            diff = monitor.observe(f.read())
+        if diff is not None:
+            print(f"{path}: {diff.change:.1%} changed, symbols: {', '.join(sorted(diff.changed_symbols)) or '-'}")
+    print(json.dumps({k: v for k, v in monitor.report().items() if k != "diffs"}))
+
+
+def _smoke(args):
+    from mlx_t2v_researcher.smoke import SmokeRunner
+
+    codes = []
+    for path in args.paths:
+        with open(path) as f:
+            codes.append(f.read())
+    runner = SmokeRunner(timeout=args.timeout, memory_mb=args.memory_mb, max_parallel=args.parallel)
+    results = _run_async(runner.run_many(codes))
+    for path, result in zip(args.paths, results):
+        print(f"{path}: {result.status} ({result.duration:.1f}s)")
+        print("  " + result.feedback().replace("\n", "\n  "))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({path: result.to_dict() for path, result in zip(args.paths, results)}, f, indent=2)
+    sys.exit(0 if all(result.passed for result in results) else 1)
+
+
+def _rules(args):
+    from mlx_t2v_researcher.remap import PRESETS, RuleSet
+
+    if args.rules:
+        return RuleSet.load(args.rules)
+    if args.preset:
+        return PRESETS[args.preset]
+    return None
+
+
+def _convert(args):
+    from mlx_t2v_researcher.remap import RuleSet, compile_plan
+    from mlx_t2v_researcher.weights import Checkpoint, ParityChecker
+
+    source = Checkpoint(args.source)
+    plan = compile_plan(_rules(args) or RuleSet([]), source, cache_dir=args.plan_cache)
+    for key in plan.unmatched:
+        print(f"no rule matches {key}", file=sys.stderr)
+    summary = plan.convert(source, args.output_dir, max_workers=args.workers,
+                           max_shard_bytes=int(args.shard_gb * 1024 ** 3), dedup=not args.no_dedup)
+    if args.verify:
+        report = plan.verify(source, Checkpoint(args.output_dir), ParityChecker(max_workers=args.workers))
+        summary["parity"] = {k: v for k, v in report.to_dict().items() if k != "offenders"}
+        summary["passed"] = report.passed
+    print(json.dumps(summary))
+    sys.exit(0 if summary.get("passed", True) else 1)
+
+
+def _parity(args):
+    from mlx_t2v_researcher.remap import compile_plan
+    from mlx_t2v_researcher.weights import Checkpoint, ParityChecker, check_parity
+
+    checker_options = dict(rtol=args.rtol, min_cosine=args.min_cosine, atol=args.atol, max_workers=args.workers)
+    rules = _rules(args)
+    if rules is not None:
+        source = Checkpoint(args.source)
+        plan = compile_plan(rules, source)
+        report = plan.verify(source, Checkpoint(args.converted), ParityChecker(**checker_options))
+    else:
+        key_map = {}
+        if args.key_map:
+            with open(args.key_map) as f:
+                key_map = json.load(f)
+        report = check_parity(args.source, args.converted, key_map=key_map, **checker_options)
+    summary = report.to_dict()
+    for tensor in report.offenders:
+        print(f"{tensor.source} -> {tensor.target}: {tensor.problem}")
+    for key in report.missing_in_target:
+        print(f"missing in converted checkpoint: {key}")
+    print(json.dumps({k: v for k, v in summary.items() if k != "offenders"}))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(0 if report.passed else 1)
+
+
+def _serve(args):
+    _load_env()
+    from .service import main as serve
+
+    serve(["--host", args.host, "--port", str(args.port), "--max-concurrent", str(args.max_concurrent)])
+
+
+def _add_rule_arguments(parser: argparse.ArgumentParser):
+    rules = parser.add_mutually_exclusive_group()
+    rules.add_argument("--preset", choices=["wan2.1-dit", "wan2.1-vae", "wan2.1-t5"], help="Built-in remapping rules")
+    rules.add_argument("--rules", help="JSON file of remapping rules")
+
+
+def _add_budget_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--deadline", type=float,
+                        help="Seconds within which to return, skipping optional stages and cutting the run short")
+    parser.add_argument("--token-budget", type=int, help="Most tokens to spend across all model calls")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="co-researchers", description="Multi-agent research assistants")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite job queue file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    deep = subparsers.add_parser("deep-research", help="Run the deep research coordinator")
+    deep.add_argument("topic")
+    deep.add_argument("--depth", choices=["brief", "comprehensive", "exhaustive"], default="comprehensive")
+    deep.add_argument("--output", help="Write all stage results to this JSON file")
+    _add_budget_arguments(deep)
+    deep.add_argument("--cache", help="Semantic topic cache file (default: $CO_RESEARCHERS_TOPIC_CACHE, if set)")
+    deep.add_argument("--reuse-threshold", type=float, default=0.9,
+                      help="Topic similarity at which a cached result is reused as is")
+    deep.set_defaults(handler=_deep_research)
+
+    scientist = subparsers.add_parser("co-scientist", help="Run the AI co-scientist coordinator")
+    scientist.add_argument("goal")
+    scientist.add_argument("--review-batch-size", type=int, default=3)
+    scientist.add_argument("--store",
+                           help="Hypothesis store file kept across sessions (default: $CO_RESEARCHERS_HYPOTHESIS_STORE, "
+                                "if set)")
+    scientist.add_argument("--output", help="Write all stage results to this JSON file")
+    _add_budget_arguments(scientist)
+    scientist.set_defaults(handler=_co_scientist)
+
+    mlx = subparsers.add_parser("mlx", help="MLX conversion planning, code generation and utilities")
+    mlx_commands = mlx.add_subparsers(dest="mlx_command", required=True)
+
+    plan = mlx_commands.add_parser("plan", help="Plan the conversion of a model to MLX")
+    plan.add_argument("model_path")
+    plan.add_argument("--no-stream", action="store_true", help="Do not stream responses to the console")
+    plan.add_argument("--output", help="Write all stage results to this JSON file")
+    plan.set_defaults(handler=_mlx_plan)
+
+    codegen = mlx_commands.add_parser("codegen", help="Generate and refine MLX code for a local model repo")
+    codegen.add_argument("model_repo_path", nargs="+",
+                         help="Model repos; several are converted concurrently, sharing common components")
+    codegen.add_argument("--refinements", type=int, default=3, help="Most refinement rounds")
+    codegen.add_argument("--output-path", default="mlx_output")
+    codegen.add_argument("--no-smoke-test", action="store_true", help="Do not run generated code against the MLX shim")
+    codegen.add_argument("--candidates", type=int, default=1,
+                         help="Code versions generated concurrently per step, keeping the best-scoring one")
+    codegen.add_argument("--component-cache",
+                         help="Per-component analysis/plan/code cache file shared across repos and runs "
+                              "(default: $CO_RESEARCHERS_COMPONENT_CACHE)")
+    codegen.add_argument("--output", help="Write the final results to this JSON file")
+    codegen.set_defaults(handler=_mlx_codegen)
+
+    components = mlx_commands.add_parser("components", help="List or evict entries of a component cache")
+    components.add_argument("cache", help="Component cache file")
+    components.add_argument("--evict", action="append", metavar="FINGERPRINT",
+                            help="Drop the entries of fingerprints starting with this (repeatable)")
+    components.add_argument("--stage", choices=["analysis", "plan", "code"], help="Only evict this stage")
+    components.set_defaults(handler=_components)
+
+    extract = mlx_commands.add_parser("extract-code", help="Print the code blocks of a markdown response")
+    extract.add_argument("path")
+    extract.add_argument("--all-languages", action="store_true")
+    extract.set_defaults(handler=_extract_code)
+
+    convergence = mlx_commands.add_parser("convergence", help="Compare successive generated code versions")
+    convergence.add_argument("paths", nargs="+")
+    convergence.add_argument("--threshold", type=float, default=0.1)
+    convergence.set_defaults(handler=_convergence)
+
+    smoke = mlx_commands.add_parser("smoke", help="Run generated code against the NumPy MLX shim in subprocesses")
+    smoke.add_argument("paths", nargs="+", help="Python files or markdown responses with code blocks")
+    smoke.add_argument("--timeout", type=float, default=30.0, help="Seconds per candidate")
+    smoke.add_argument("--memory-mb", type=int, default=2048, help="Memory limit per candidate")
+    smoke.add_argument("--parallel", type=int, help="Most candidates run at once (default: CPU count)")
+    smoke.add_argument("--output", help="Write the results to this JSON file")
+    smoke.set_defaults(handler=_smoke)
+
+    parity = mlx_commands.add_parser("parity", help="Compare converted weights with the source checkpoint")
+    parity.add_argument("source", help="Source checkpoint file or directory (safetensors, .pth, .npz)")
+    parity.add_argument("converted", help="Converted checkpoint file or directory of shards")
+    parity.add_argument("--key-map", help="JSON file mapping source keys to converted keys")
+    _add_rule_arguments(parity)
+    parity.add_argument("--rtol", type=float, default=1e-2, help="Largest relative L2 error per tensor")
+    parity.add_argument("--min-cosine", type=float, default=0.9999)
+    parity.add_argument("--atol", type=float, help="Largest element-wise absolute difference")
+    parity.add_argument("--workers", type=int, help="Comparison threads (default: CPU count)")
+    parity.add_argument("--output", help="Write the report to this JSON file")
+    parity.set_defaults(handler=_parity)
+
+    convert = mlx_commands.add_parser("convert", help="Convert a checkpoint to MLX naming and layout")
+    convert.add_argument("source", help="Source checkpoint file or directory (safetensors, .pth, .npz)")
+    convert.add_argument("output_dir")
+    _add_rule_arguments(convert)
+    convert.add_argument("--workers", type=int, help="Conversion threads (default: CPU count)")
+    convert.add_argument("--shard-gb", type=float, default=5.0, help="Largest output shard")
+    convert.add_argument("--plan-cache", help="Directory of compiled plans, reused for identical checkpoints")
+    convert.add_argument("--no-dedup", action="store_true",
+                         help="Write tied and byte-identical tensors under every key instead of as aliases")
+    convert.add_argument("--verify", action="store_true", help="Check the written shards against the source")
+    convert.set_defaults(handler=_convert)
+
+    serve = subparsers.add_parser("serve", help="Serve research jobs over HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--max-concurrent", type=int, default=4)
+    serve.set_defaults(handler=_serve)
+
+    add_job_commands(subparsers)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
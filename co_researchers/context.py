@@ -0,0 +1,71 @@
+"""Per-run settings and counters, carried through async calls with a context variable.
+
+Wrap a coordinator call in `run_scope()` to enable run-level behaviour in the
+agent-call layer:
+
+    with run_scope(hedging=HedgePolicy(max_hedges=4)) as run:
+        results = await researcher.research(topic)
+    print(run.hedge_stats.report())
+
+`job`, `priority` and `weight` decide how the run's model calls are queued by
+the call scheduler (see `co_researchers.scheduler`).
+"""
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from .hedging import HedgePolicy, HedgeStats
+from .scheduler import PRIORITIES
+
+
+StageListener = Callable[[str, Any], None]
+
+
+class RunContext:
+    def __init__(self, hedging: Optional[HedgePolicy] = None, on_stage: Optional[StageListener] = None,
+                 priority: str = "normal", job: Optional[str] = None, weight: float = 1.0):
+        """
+        Args:
+            hedging: Enables hedged model calls for the run
+            on_stage: Called with (stage, result) as each coordinator stage completes
+            priority: Scheduling class of the run's model calls: "interactive", "normal" or "batch"
+            job: Fair-share identity of the run's calls (default: a new one per run)
+            weight: The job's share of its class relative to other jobs
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}")
+        self.hedging = hedging
+        self.hedge_stats = HedgeStats()
+        self.on_stage = on_stage
+        self.priority = priority
+        self.job = job or f"run-{uuid.uuid4().hex[:8]}"
+        self.weight = weight
+
+    def can_hedge(self) -> bool:
+        """Whether the run's hedge budget allows another duplicate request"""
+        return self.hedging is not None and self.hedge_stats.hedges < self.hedging.max_hedges
+
+
+_current: ContextVar[Optional[RunContext]] = ContextVar("co_researchers_run", default=None)
+
+
+def current_run() -> Optional[RunContext]:
+    return _current.get()
+
+
+def report_stage(stage: str, result: Any):
+    """Publish a completed stage's result to the current run's listener, if any"""
+    run = _current.get()
+    if run is not None and run.on_stage is not None:
+        run.on_stage(stage, result)
+
+
+@contextmanager
+def run_scope(**settings) -> Iterator[RunContext]:
+    run = RunContext(**settings)
+    token = _current.set(run)
+    try:
+        yield run
+    finally:
+        _current.reset(token)
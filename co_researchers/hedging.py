@@ -0,0 +1,110 @@
+"""Hedged model calls.
+
+If a call has not returned by an adaptive latency percentile for its stage, a
+duplicate is fired (optionally to the next model in the tier). The first
+successful response wins and the other request is cancelled. The hedge
+takes its own call-scheduler slot, so it queues like any other call. Hedges
+are capped per run so the extra cost stays bounded.
+"""
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncContextManager, Awaitable, Callable, Optional, Tuple
+
+from .telemetry import Telemetry, percentile
+
+
+@dataclass
+class HedgePolicy:
+    quantile: float = 0.95
+    min_samples: int = 10
+    max_hedges: int = 5
+    alternate_model: bool = True
+    min_delay: float = 1.0
+
+    def threshold(self, telemetry: Telemetry, stage: str, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history"""
+        latencies = telemetry.latencies(stage, model)
+        if len(latencies) < self.min_samples:
+            latencies = telemetry.latencies(stage)
+        if len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(latencies, self.quantile))
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0  # every model call in the run, hedged or not
+    hedges: int = 0
+    hedge_wins: int = 0
+    latency_saved: float = 0.0
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedges / self.calls if self.calls else 0.0
+
+    def report(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_rate": self.hedge_rate,
+            "hedge_wins": self.hedge_wins,
+            "latency_saved": self.latency_saved,
+        }
+
+
+def _tail_mean(telemetry: Telemetry, stage: str, model: str, threshold: float) -> Optional[float]:
+    tail = [t for t in telemetry.latencies(stage, model) if t >= threshold]
+    return sum(tail) / len(tail) if tail else None
+
+
+async def hedged_call(call: Callable[[str], Awaitable[Any]], model: str, alternate: str,
+                      threshold: float, telemetry: Telemetry, stage: str,
+                      stats: HedgeStats, allow_hedge: Callable[[], bool],
+                      slot: Optional[Callable[[], AsyncContextManager]] = None) -> Tuple[Any, str]:
+    """Run `call(model)`, hedging with `call(alternate)` after `threshold` seconds.
+
+    The caller already holds a slot for the primary call; the hedge waits for
+    its own from `slot()`. Returns the winning response and the model that
+    produced it.
+    """
+
+    async def hedged() -> Any:
+        async with (slot() if slot else contextlib.nullcontext()):
+            return await call(alternate)
+
+    start = time.perf_counter()
+    primary = asyncio.ensure_future(call(model))
+    tasks = {primary: model}
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done or not allow_hedge():
+            return await primary, model
+
+        stats.hedges += 1
+        hedge = asyncio.ensure_future(hedged())
+        tasks[hedge] = alternate
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                if task is hedge:
+                    stats.hedge_wins += 1
+                    # The cancelled primary's latency is unknown; estimate it from the
+                    # stage's historical tail beyond the hedge threshold.
+                    expected = _tail_mean(telemetry, stage, model, threshold)
+                    if expected is not None:
+                        stats.latency_saved += max(0.0, expected - (time.perf_counter() - start))
+                return task.result(), tasks[task]
+        raise error
+    finally:
+        losers = [task for task in tasks if not task.done()]
+        for task in losers:
+            task.cancel()
+        # Wait for the cancellations, so losers release their slots and agents before we return
+        await asyncio.gather(*losers, return_exceptions=True)
@@ -0,0 +1,182 @@
+"""Minimal asyncio HTTP/1.1 server used by the local services and mock backends.
+
+Only what the services need is implemented: keep-alive, Content-Length and
+chunked request bodies, JSON responses and chunked streaming responses
+(used for server-sent events).
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Union
+from urllib.parse import parse_qs, urlsplit
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    202: "Accepted",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method.upper()
+        self.path = parts.path
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body or b"null")
+
+
+class Response:
+    def __init__(self, status: int = 200, body: Union[bytes, str] = b"",
+                 headers: Optional[Dict[str, str]] = None,
+                 content_type: str = "text/plain; charset=utf-8"):
+        self.status = status
+        self.body = body.encode() if isinstance(body, str) else body
+        self.headers = {"Content-Type": content_type, **(headers or {})}
+
+    @classmethod
+    def json(cls, data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> "Response":
+        return cls(status, json.dumps(data), headers, "application/json")
+
+
+class StreamResponse:
+    """Response whose body is produced incrementally with chunked encoding"""
+
+    def __init__(self, chunks: AsyncIterator[Union[bytes, str]], status: int = 200,
+                 headers: Optional[Dict[str, str]] = None,
+                 content_type: str = "text/event-stream"):
+        self.status = status
+        self.chunks = chunks
+        self.headers = {"Content-Type": content_type, "Cache-Control": "no-cache", **(headers or {})}
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    """Format a server-sent event"""
+    payload = data if isinstance(data, str) else json.dumps(data)
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in payload.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+Handler = Callable[[Request], Awaitable[Union[Response, StreamResponse]]]
+
+
+class HTTPServer:
+    def __init__(self, handler: Handler, host: str = "127.0.0.1", port: int = 0):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "HTTPServer":
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "HTTPServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                try:
+                    response = await self.handler(request)
+                except Exception as e:
+                    response = Response.json({"error": {"message": str(e)}}, status=500)
+                await _write_response(writer, response)
+                if request.headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            body += await reader.readexactly(size)
+            await reader.readline()
+        return Request(method, target, headers, bytes(body))
+
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return Request(method, target, headers, body)
+
+
+async def _write_response(writer: asyncio.StreamWriter, response: Union[Response, StreamResponse]):
+    status_line = f"HTTP/1.1 {response.status} {REASONS.get(response.status, 'Unknown')}\r\n"
+    headers = dict(response.headers)
+    if isinstance(response, StreamResponse):
+        headers["Transfer-Encoding"] = "chunked"
+    else:
+        headers["Content-Length"] = str(len(response.body))
+    head = status_line + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+    writer.write(head.encode("latin-1"))
+
+    if isinstance(response, StreamResponse):
+        try:
+            async for chunk in response.chunks:
+                data = chunk.encode() if isinstance(chunk, str) else chunk
+                if data:
+                    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    await writer.drain()
+        finally:
+            # Stop the producer promptly when the client goes away mid-stream
+            aclose = getattr(response.chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        writer.write(b"0\r\n\r\n")
+    else:
+        writer.write(response.body)
+    await writer.drain()
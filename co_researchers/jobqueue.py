@@ -0,0 +1,212 @@
+"""Durable SQLite-backed queue for research jobs.
+
+Workers claim jobs under a lease and renew it with heartbeats. A job whose
+lease expires (its worker crashed or hung) is put back on the queue, up to
+`max_attempts` claims. Every claim gets its own lease token, and heartbeats,
+completion and failure must present it. A run whose lease has lapsed
+therefore cannot renew or finish a later attempt at the same job, even one
+claimed by the same process.
+
+Calls block on SQLite's busy timeout. They are safe to run from worker
+threads (e.g. `asyncio.to_thread`), so callers on an event loop can keep it
+free.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker TEXT,
+    lease TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, id);
+"""
+
+DEFAULT_DB = "co_researchers_jobs.db"
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    params: Dict[str, Any]
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    worker: Optional[str]
+    lease: Optional[str]
+    lease_expires: Optional[float]
+    result: Optional[Any]
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        data = dict(row)
+        data["params"] = json.loads(data["params"])
+        data["result"] = json.loads(data["result"]) if data["result"] else None
+        return cls(**data)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    def __init__(self, path: str = DEFAULT_DB, lease_seconds: float = 60.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "lease" not in columns:
+            # Queues created before lease tokens
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease TEXT")
+
+    def close(self):
+        self._conn.close()
+
+    def submit(self, kind: str, params: Dict[str, Any], priority: int = 0, max_attempts: int = 3) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (kind, params, priority, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(params, sort_keys=True), priority, max_attempts, now, now),
+            )
+        return cursor.lastrowid
+
+    def _requeue_expired(self, now: float) -> int:
+        failed = self._conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'lease expired', worker = NULL, lease = NULL, updated_at = ? "
+            "WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+            (now, now),
+        ).rowcount
+        requeued = self._conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'running' AND lease_expires < ?",
+            (now, now),
+        ).rowcount
+        return failed + requeued
+
+    def requeue_expired(self) -> int:
+        """Return jobs whose lease has lapsed to the queue; returns how many were touched"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = self._requeue_expired(time.time())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def claim(self, worker: str, kinds: Optional[List[str]] = None) -> Optional[Job]:
+        """Lease the highest-priority queued job, or return None if there is none
+
+        The job's `lease` token identifies this claim in `heartbeat`, `complete` and `fail`.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(now)
+                query = "SELECT id FROM jobs WHERE status = 'queued'"
+                args: List[Any] = []
+                if kinds:
+                    query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                    args.extend(kinds)
+                row = self._conn.execute(query + " ORDER BY priority DESC, id LIMIT 1", args).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, lease = ?, attempts = attempts + 1, "
+                    "lease_expires = ?, updated_at = ? WHERE id = ?",
+                    (worker, uuid.uuid4().hex, now + self.lease_seconds, now, row["id"]),
+                )
+                job = self._get(row["id"])
+                self._conn.execute("COMMIT")
+                return job
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self, job_id: int, lease: str) -> bool:
+        """Extend the lease; False means this claim no longer owns the job"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease = ? AND status = 'running'",
+                (now + self.lease_seconds, now, job_id, lease),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, lease: str, result: Any) -> bool:
+        """Mark the job done; raises TypeError/ValueError, leaving the job untouched, if `result` is not JSON"""
+        payload = json.dumps(result)
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ? AND lease = ? AND status = 'running'",
+                (payload, time.time(), job_id, lease),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, lease: str, error: str, retry: bool = True) -> bool:
+        """Record a failure, re-queueing the job while it has attempts left and `retry` is set"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = CASE WHEN ? AND attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                "error = ?, worker = NULL, lease = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND lease = ? AND status = 'running'",
+                (retry, error, time.time(), job_id, lease),
+            )
+        return cursor.rowcount == 1
+
+    def _get(self, job_id: int) -> Optional[Job]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._get(job_id)
+
+    def jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        with self._lock:
+            if status:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
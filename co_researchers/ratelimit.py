@@ -0,0 +1,17 @@
+"""Request pacing shared by concurrent calls."""
+import asyncio
+
+
+class RateLimiter:
+    """Spaces call starts at least `1 / rate` seconds apart, across concurrent tasks"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
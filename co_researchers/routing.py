@@ -0,0 +1,315 @@
+"""Per-stage model routing.
+
+Each agent declares a `StageRoute`: a quality tier and a latency target. The
+`RoutingPolicy` maps tiers to an ordered list of models and, using recorded
+telemetry, demotes a model whose observed latency misses the target or that
+is being throttled. At call time `RoutedAgent` falls back to the next model
+when the current one returns a 429, or when it exceeds the latency target
+and telemetry already shows it usually does. Each attempt first takes a slot
+from the call scheduler.
+"""
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+from .budget import current_budget
+from .context import current_run
+from .hedging import hedged_call
+from .scheduler import get_scheduler
+from .telemetry import CHARS_PER_TOKEN, CallSample, Telemetry, get_telemetry, response_tokens
+
+# Ordered from preferred to fastest fallback
+TIERS: Dict[str, List[str]] = {
+    "high": ["gpt-4", "gpt-4o", "gpt-4o-mini-2024-07-18"],
+    "standard": ["gpt-4o-mini-2024-07-18", "gpt-3.5-turbo"],
+    "fast": ["gpt-3.5-turbo", "gpt-4o-mini-2024-07-18"],
+}
+
+
+@dataclass
+class StageRoute:
+    stage: str
+    tier: str = "standard"
+    latency_target: Optional[float] = None  # seconds
+
+
+def is_throttled(error: BaseException) -> bool:
+    """Whether an exception raised by a model call is a rate-limit response"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError" or "rate limit" in str(error).lower()
+
+
+class RoutingPolicy:
+    def __init__(self, tiers: Optional[Dict[str, List[str]]] = None,
+                 overrides: Optional[Dict[str, str]] = None,
+                 telemetry: Optional[Telemetry] = None,
+                 min_samples: int = 5, latency_quantile: float = 0.9,
+                 max_throttle_rate: float = 0.3):
+        """
+        Args:
+            tiers: Tier name to ordered model list
+            overrides: Stage name to a pinned primary model
+            telemetry: Where call samples are read from and recorded to
+            min_samples: Successful calls needed before latency demotes a model
+            latency_quantile: Quantile compared against the stage's latency target
+            max_throttle_rate: Recent 429 share above which a model is demoted
+        """
+        self.tiers = {**TIERS, **(tiers or {})}
+        self.overrides = dict(overrides or {})
+        self._telemetry = telemetry
+        self.min_samples = min_samples
+        self.latency_quantile = latency_quantile
+        self.max_throttle_rate = max_throttle_rate
+
+    @property
+    def telemetry(self) -> Telemetry:
+        return self._telemetry or get_telemetry()
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], **kwargs) -> "RoutingPolicy":
+        """Load `{"tiers": {...}, "overrides": {...}}` from a JSON file"""
+        with open(path) as f:
+            config = json.load(f)
+        return cls(tiers=config.get("tiers"), overrides=config.get("overrides"), **kwargs)
+
+    def candidates(self, route: StageRoute) -> List[str]:
+        models = list(self.tiers.get(route.tier) or self.tiers["standard"])
+        pinned = self.overrides.get(route.stage)
+        if pinned:
+            models = [pinned] + [m for m in models if m != pinned]
+        return models
+
+    def exceeds_target(self, route: StageRoute, model: str) -> bool:
+        """Whether telemetry shows the model usually missing the stage's latency target"""
+        if route.latency_target is None:
+            return False
+        telemetry = self.telemetry
+        if len(telemetry.latencies(route.stage, model)) < self.min_samples:
+            return False
+        observed = telemetry.latency_percentile(route.stage, self.latency_quantile, model)
+        return observed is not None and observed > route.latency_target
+
+    def _healthy(self, route: StageRoute, model: str) -> bool:
+        if self.telemetry.throttle_rate(route.stage, model) > self.max_throttle_rate:
+            return False
+        return not self.exceeds_target(route, model)
+
+    def choose(self, route: StageRoute) -> List[str]:
+        """Candidates with healthy models first, preserving tier order within each group"""
+        models = self.candidates(route)
+        healthy = [m for m in models if self._healthy(route, m)]
+        return healthy + [m for m in models if m not in healthy]
+
+    def plan(self, route: StageRoute) -> List[Tuple[str, Optional[float]]]:
+        """Models to try in order, with the timeout for each attempt.
+
+        The latency target only cuts an attempt short once telemetry shows the
+        model usually misses it; until then a slow answer is still an answer.
+        The last attempt is always unbounded.
+        """
+        models = self.choose(route)
+        return [(m, route.latency_target if i < len(models) - 1 and self.exceeds_target(route, m) else None)
+                for i, m in enumerate(models)]
+
+
+_policy: Optional[RoutingPolicy] = None
+
+
+def get_policy() -> RoutingPolicy:
+    """The process-wide policy, loaded from `CO_RESEARCHERS_ROUTES` when set"""
+    global _policy
+    if _policy is None:
+        path = os.environ.get("CO_RESEARCHERS_ROUTES")
+        _policy = RoutingPolicy.from_file(path) if path else RoutingPolicy()
+    return _policy
+
+
+def set_policy(policy: RoutingPolicy):
+    global _policy
+    _policy = policy
+
+
+def _slot():
+    """A call-scheduler slot for the current run's job and priority"""
+    run = current_run()
+    if run is None:
+        return get_scheduler().slot()
+    return get_scheduler().slot(run.job, run.priority, run.weight)
+
+
+class RoutedAgent:
+    """Drop-in stand-in for an agno Agent whose model is chosen per call by the routing policy.
+
+    agno agents keep per-run state on the instance, so concurrent calls to the
+    same stage each check out their own agent from a small per-model pool.
+    """
+
+    def __init__(self, route: StageRoute, build: Callable[[str], Any],
+                 policy: Optional[RoutingPolicy] = None):
+        self.route = route
+        self.build = build
+        self.policy = policy
+        self.last_model: Optional[str] = None
+        self._idle: Dict[str, List[Any]] = {}
+
+    @property
+    def stage(self) -> str:
+        return self.route.stage
+
+    def _checkout(self, model: str) -> Any:
+        idle = self._idle.setdefault(model, [])
+        return idle.pop() if idle else self.build(model)
+
+    def _release(self, model: str, agent: Any):
+        self._idle.setdefault(model, []).append(agent)
+
+    async def _call(self, model: str, message: Any, **kwargs) -> Any:
+        agent = self._checkout(model)
+        try:
+            return await agent.arun(message, **kwargs)
+        finally:
+            self._release(model, agent)
+
+    async def _attempt(self, policy: RoutingPolicy, model: str, timeout: Optional[float],
+                       message: Any, **kwargs) -> Tuple[Any, str]:
+        """One routed attempt, hedged when the current run enables it"""
+        run = current_run()
+        if run is not None:
+            run.hedge_stats.calls += 1
+        hedging = run.hedging if run else None
+        threshold = hedging.threshold(policy.telemetry, self.stage, model) if hedging else None
+        if threshold is not None and (timeout is None or threshold < timeout):
+            alternate = model
+            if hedging.alternate_model:
+                models = policy.choose(self.route)
+                alternate = next((m for m in models if m != model), model)
+            call = hedged_call(
+                lambda m: self._call(m, message, **kwargs), model, alternate, threshold,
+                policy.telemetry, self.stage, run.hedge_stats, run.can_hedge, _slot,
+            )
+        else:
+            call = self._served_by(model, message, **kwargs)
+
+        if timeout is None:
+            return await call
+        return await asyncio.wait_for(call, timeout)
+
+    async def _served_by(self, model: str, message: Any, **kwargs) -> Tuple[Any, str]:
+        return await self._call(model, message, **kwargs), model
+
+    async def arun(self, message: Any = None, **kwargs) -> Any:
+        policy = self.policy or get_policy()
+        telemetry = policy.telemetry
+        plan = policy.plan(self.route)
+        for i, (model, timeout) in enumerate(plan):
+            last = i == len(plan) - 1
+            start = time.perf_counter()
+            try:
+                async with _slot():
+                    # Timed from the slot, so queueing is not counted against the model
+                    start = time.perf_counter()
+                    response, served_by = await self._attempt(policy, model, timeout, message, **kwargs)
+            except asyncio.TimeoutError:
+                telemetry.record(CallSample(self.stage, model, time.perf_counter() - start, "timeout"))
+                continue
+            except Exception as e:
+                outcome = "throttled" if is_throttled(e) else "error"
+                telemetry.record(CallSample(self.stage, model, time.perf_counter() - start, outcome))
+                if outcome == "throttled" and not last:
+                    continue
+                raise
+            tokens = response_tokens(response)
+            telemetry.record(CallSample(self.stage, served_by, time.perf_counter() - start, "ok", tokens))
+            budget = current_budget()
+            if budget is not None:
+                budget.charge(tokens)
+            self.last_model = served_by
+            return response
+        raise RuntimeError(f"No model available for stage {self.stage}")
+
+    async def astream(self, message: Any = None, **kwargs) -> AsyncIterator[str]:
+        """Stream text deltas from the first healthy model in the route.
+
+        Falls back to the next model only if the request is throttled before
+        any content arrives; the serving model is left in `last_model`. A
+        stream the consumer stops early (e.g. a `StopGuard` abort) is recorded
+        as "aborted", so it does not count towards the route's latency.
+        """
+        policy = self.policy or get_policy()
+        telemetry = policy.telemetry
+        models = policy.choose(self.route)
+        for i, model in enumerate(models):
+            async with _slot():
+                agent = self._checkout(model)
+                start = time.perf_counter()
+                ttft = None
+                chars = 0
+                outcome = "ok"
+                stream = None
+                try:
+                    stream = await agent.arun(message, stream=True, **kwargs)
+                    async for event in stream:
+                        content = getattr(event, "content", None)
+                        if not isinstance(content, str) or not content:
+                            continue
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                            self.last_model = model
+                        chars += len(content)
+                        yield content
+                    return
+                except (GeneratorExit, asyncio.CancelledError):
+                    outcome = "aborted"
+                    raise
+                except Exception as e:
+                    outcome = "throttled" if is_throttled(e) else "error"
+                    if outcome == "throttled" and ttft is None and i < len(models) - 1:
+                        continue
+                    raise
+                finally:
+                    if stream is not None and hasattr(stream, "aclose"):
+                        await stream.aclose()
+                    self._release(model, agent)
+                    # Stream events carry no usage, so tokens are estimated from the text
+                    tokens = chars // CHARS_PER_TOKEN
+                    telemetry.record(CallSample(self.stage, model, time.perf_counter() - start, outcome,
+                                                tokens, ttft))
+                    budget = current_budget()
+                    if budget is not None:
+                        budget.charge(tokens)
+
+    def variant(self, **model_options) -> "RoutedAgent":
+        """Same route and policy, with `model_options` (e.g. `temperature`) set on every model it builds"""
+        base = self.build
+
+        def build(model_id: str):
+            agent = base(model_id)
+            for name, value in model_options.items():
+                setattr(agent.model, name, value)
+            return agent
+
+        return RoutedAgent(self.route, build, self.policy)
+
+    def record_quality(self, score: float, model: Optional[str] = None):
+        """Attach a quality score to the model that served the latest call"""
+        policy = self.policy or get_policy()
+        model = model or self.last_model
+        if model:
+            policy.telemetry.record_quality(self.stage, model, score)
+
+
+def routed_agent(stage: str, tier: str = "standard", latency_target: Optional[float] = None,
+                 **agent_kwargs) -> RoutedAgent:
+    """Routed agno agent; `agent_kwargs` are passed to `Agent` alongside the chosen model"""
+
+    def build(model_id: str):
+        from agno.agent import Agent
+        from agno.models.openai import OpenAIChat
+        return Agent(model=OpenAIChat(id=model_id), **agent_kwargs)
+
+    return RoutedAgent(StageRoute(stage, tier, latency_target), build)
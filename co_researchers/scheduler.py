@@ -0,0 +1,227 @@
+"""Priority-aware fair scheduling of model calls across concurrent jobs.
+
+Every `RoutedAgent` call takes a slot from the process-wide `CallScheduler`
+before it reaches the API. A call belongs to the job and priority class of the
+run it is made in (`run_scope(job=..., priority=...)`). Calls made outside a
+run share one "default" job of the "normal" class.
+
+Classes are served in strict order: a waiting interactive call goes before
+any normal or batch call. Lower classes can also be held below
+`max_concurrent` with `class_limits`. Model calls take seconds and cannot be
+preempted, so this keeps some slots free for an interactive call that
+arrives while batch work fills the rest. A call that has waited longer than
+`promote_after` is served ahead of the class order, so batch work still
+makes progress under sustained interactive load.
+
+Within a class, jobs share the slots by start-time fair queuing. Each call is
+tagged with max(class virtual time, the job's previous tag) + 1 / weight, and
+the smallest tag goes first. A job that queues fifty calls therefore delays a
+job that queues one by at most one call per unit of weight. `per_job` caps
+how many calls a single job has in flight.
+"""
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from .telemetry import percentile
+
+PRIORITIES = ("interactive", "normal", "batch")
+DEFAULT_JOB = "default"
+
+
+@dataclass(eq=False)
+class _Waiter:
+    job: str
+    priority: str
+    tag: float
+    seq: int
+    enqueued: float
+    future: asyncio.Future = field(repr=False)
+
+
+@dataclass
+class ClassStats:
+    queued: int = 0
+    max_queued: int = 0
+    in_flight: int = 0
+    dispatched: int = 0
+    promoted: int = 0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    def to_dict(self) -> Dict[str, Any]:
+        waits = list(self.waits)
+        return {
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "in_flight": self.in_flight,
+            "dispatched": self.dispatched,
+            "promoted": self.promoted,
+            "wait_p50": percentile(waits, 0.5) if waits else 0.0,
+            "wait_p95": percentile(waits, 0.95) if waits else 0.0,
+            "wait_max": max(waits, default=0.0),
+        }
+
+
+class CallScheduler:
+    def __init__(self, max_concurrent: int = 16, per_job: Optional[int] = None,
+                 class_limits: Optional[Dict[str, int]] = None, promote_after: Optional[float] = 120.0):
+        """
+        Args:
+            max_concurrent: Model calls in flight at once across all jobs
+            per_job: Most calls one job may have in flight (None: no cap)
+            class_limits: Most calls in flight per priority class, e.g. {"batch": 12}
+            promote_after: Seconds after which a waiting call is served ahead of higher classes
+        """
+        self.max_concurrent = max_concurrent
+        self.per_job = per_job
+        self.class_limits = dict(class_limits or {})
+        unknown = set(self.class_limits) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"Unknown priority classes: {sorted(unknown)}")
+        self.promote_after = promote_after
+        self.in_flight = 0
+        self.classes = {priority: ClassStats() for priority in PRIORITIES}
+        self._queues: Dict[str, List[_Waiter]] = {priority: [] for priority in PRIORITIES}
+        self._virtual = {priority: 0.0 for priority in PRIORITIES}
+        self._last_tag: Dict[tuple, float] = {}
+        self._job_in_flight: Dict[str, int] = {}
+        self._job_queued: Dict[str, int] = {}
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> "CallScheduler":
+        """Limits from `CO_RESEARCHERS_MAX_CALLS`, `CO_RESEARCHERS_MAX_CALLS_PER_JOB` and
+        `CO_RESEARCHERS_BATCH_CALLS` (default: a quarter of the slots are kept from batch jobs)"""
+        max_concurrent = int(os.environ.get("CO_RESEARCHERS_MAX_CALLS", 16))
+        per_job = os.environ.get("CO_RESEARCHERS_MAX_CALLS_PER_JOB")
+        batch = int(os.environ.get("CO_RESEARCHERS_BATCH_CALLS", max(1, max_concurrent * 3 // 4)))
+        return cls(max_concurrent, int(per_job) if per_job else None, {"batch": batch})
+
+    def _eligible(self, waiter: _Waiter) -> bool:
+        limit = self.class_limits.get(waiter.priority)
+        return ((limit is None or self.classes[waiter.priority].in_flight < limit)
+                and (self.per_job is None or self._job_in_flight.get(waiter.job, 0) < self.per_job))
+
+    def _next(self) -> Optional[_Waiter]:
+        if self.promote_after is not None:
+            overdue = time.monotonic() - self.promote_after
+            late = [w for queue in self._queues.values() for w in queue
+                    if w.enqueued <= overdue and self._eligible(w)]
+            if late:
+                waiter = min(late, key=lambda w: w.seq)
+                self.classes[waiter.priority].promoted += 1
+                return waiter
+        for priority in PRIORITIES:
+            ready = [w for w in self._queues[priority] if self._eligible(w)]
+            if ready:
+                return min(ready, key=lambda w: (w.tag, w.seq))
+        return None
+
+    def _dispatch(self):
+        while self.in_flight < self.max_concurrent:
+            waiter = self._next()
+            if waiter is None:
+                return
+            self._dequeue(waiter)
+            if waiter.future.cancelled():
+                continue
+            self._virtual[waiter.priority] = max(self._virtual[waiter.priority], waiter.tag)
+            self._start(waiter.job, waiter.priority, time.monotonic() - waiter.enqueued)
+            waiter.future.set_result(None)
+
+    def _dequeue(self, waiter: _Waiter):
+        self._queues[waiter.priority].remove(waiter)
+        self.classes[waiter.priority].queued -= 1
+        self._job_queued[waiter.job] -= 1
+        if not self._job_queued[waiter.job]:
+            del self._job_queued[waiter.job]
+
+    def _start(self, job: str, priority: str, waited: float):
+        self.in_flight += 1
+        self._job_in_flight[job] = self._job_in_flight.get(job, 0) + 1
+        stats = self.classes[priority]
+        stats.in_flight += 1
+        stats.dispatched += 1
+        stats.waits.append(waited)
+
+    def _finish(self, job: str, priority: str):
+        self.in_flight -= 1
+        self.classes[priority].in_flight -= 1
+        self._job_in_flight[job] -= 1
+        if not self._job_in_flight[job]:
+            del self._job_in_flight[job]
+            if job not in self._job_queued:
+                # An idle job restarts from the class's virtual time anyway
+                self._last_tag.pop((priority, job), None)
+        self._dispatch()
+
+    async def acquire(self, job: str = DEFAULT_JOB, priority: str = "normal", weight: float = 1.0):
+        """Wait for a slot; pair every acquire with `release(job, priority)`"""
+        if priority not in self.classes:
+            raise ValueError(f"Unknown priority class {priority!r}; expected one of {PRIORITIES}")
+        tag = max(self._virtual[priority], self._last_tag.get((priority, job), 0.0)) + 1.0 / max(weight, 1e-6)
+        self._last_tag[(priority, job)] = tag
+        waiter = _Waiter(job, priority, tag, next(self._seq), time.monotonic(),
+                         asyncio.get_running_loop().create_future())
+        self._queues[priority].append(waiter)
+        stats = self.classes[priority]
+        stats.queued += 1
+        self._job_queued[job] = self._job_queued.get(job, 0) + 1
+        self._dispatch()
+        if waiter.future.done():
+            return
+        stats.max_queued = max(stats.max_queued, stats.queued)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._queues[priority]:
+                self._dequeue(waiter)
+            elif not waiter.future.cancelled():
+                # Granted as we were cancelled: hand the slot on
+                self._finish(job, priority)
+            raise
+
+    def release(self, job: str = DEFAULT_JOB, priority: str = "normal"):
+        self._finish(job, priority)
+
+    @asynccontextmanager
+    async def slot(self, job: str = DEFAULT_JOB, priority: str = "normal",
+                   weight: float = 1.0) -> AsyncIterator[None]:
+        await self.acquire(job, priority, weight)
+        try:
+            yield
+        finally:
+            self.release(job, priority)
+
+    def stats(self) -> Dict[str, Any]:
+        """Slots in use, queue depths and recent queueing delay per class, and per-job load"""
+        jobs = set(self._job_in_flight) | set(self._job_queued)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "queued": sum(s.queued for s in self.classes.values()),
+            "classes": {priority: stats.to_dict() for priority, stats in self.classes.items()},
+            "jobs": {job: {"in_flight": self._job_in_flight.get(job, 0), "queued": self._job_queued.get(job, 0)}
+                     for job in sorted(jobs)},
+        }
+
+
+_scheduler: Optional[CallScheduler] = None
+
+
+def get_scheduler() -> CallScheduler:
+    """The process-wide scheduler, configured from the environment on first use"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = CallScheduler.from_env()
+    return _scheduler
+
+
+def set_scheduler(scheduler: CallScheduler):
+    global _scheduler
+    _scheduler = scheduler
@@ -0,0 +1,236 @@
+"""Asyncio HTTP service for research jobs.
+
+Usage:
+    python -m co_researchers.service --port 8080
+
+Endpoints:
+    POST /jobs              {"coordinator": "deep_research", "params": {"topic": "...", "depth": "brief"},
+                             "priority": "interactive"}
+    GET  /jobs/{id}         status, completed stages and, when finished, the result
+    GET  /jobs/{id}/events  server-sent events: one `stage` event per completed stage, then `done`
+    GET  /health            includes the call scheduler's slots, queue depths and queueing delays
+
+Identical requests (same coordinator and parameters) that arrive while one is
+in flight are coalesced onto that execution and receive the same job id.
+Model calls of an execution are scheduled in its priority class ("interactive"
+unless the request says otherwise, e.g. "batch" for bulk submissions); a
+request coalesced onto a lower-priority execution raises it for the calls
+still to come.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .context import RunContext, run_scope
+from .httpserver import HTTPServer, Request, Response, StreamResponse, sse_event
+from .scheduler import PRIORITIES, get_scheduler
+from .telemetry import save_telemetry
+from .worker import JOB_KINDS
+
+_END = object()
+
+
+def request_key(coordinator: str, params: Dict[str, Any]) -> str:
+    """Single-flight key; string parameters are compared with whitespace collapsed"""
+    normalized = {k: " ".join(v.split()) if isinstance(v, str) else v for k, v in params.items()}
+    payload = json.dumps({"coordinator": coordinator, "params": normalized}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Execution:
+    def __init__(self, coordinator: str, params: Dict[str, Any], key: str, priority: str = "interactive"):
+        self.id = uuid.uuid4().hex[:16]
+        self.coordinator = coordinator
+        self.params = params
+        self.key = key
+        self.priority = priority
+        self.run: Optional[RunContext] = None
+        self.task: Optional[asyncio.Task] = None  # held here so the loop cannot collect a running execution
+        self.status = "queued"
+        self.stages: List[Dict[str, Any]] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.requests = 1
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._subscribers: List[asyncio.Queue] = []
+
+    def emit(self, stage: str, result: Any):
+        event = {"stage": stage, "result": result, "at": time.time()}
+        self.stages.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def raise_priority(self, priority: str):
+        if PRIORITIES.index(priority) < PRIORITIES.index(self.priority):
+            self.priority = priority
+            if self.run is not None:
+                self.run.priority = priority
+
+    def finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+        for queue in self._subscribers:
+            queue.put_nowait(_END)
+
+    async def events(self) -> AsyncIterator[str]:
+        """Completed stages so far, then live ones until the execution finishes"""
+        # Snapshot and subscribe together so no stage is missed or sent twice
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        replay = list(self.stages)
+        finished = self.finished_at is not None
+        try:
+            for event in replay:
+                yield sse_event(event, "stage")
+            while not finished:
+                event = await queue.get()
+                if event is _END:
+                    break
+                yield sse_event(event, "stage")
+            yield sse_event({"id": self.id, "status": self.status, "error": self.error}, "done")
+        finally:
+            self._subscribers.remove(queue)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "coordinator": self.coordinator,
+            "params": self.params,
+            "status": self.status,
+            "priority": self.priority,
+            "stages": [event["stage"] for event in self.stages],
+            "requests": self.requests,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+        if include_result and self.status == "done":
+            data["result"] = self.result
+        return data
+
+
+class ResearchService:
+    def __init__(self, max_concurrent: int = 4, retain: int = 500):
+        """
+        Args:
+            max_concurrent: Executions run at once; the rest wait in order
+            retain: Finished executions kept for polling
+        """
+        self.max_concurrent = max_concurrent
+        self.retain = retain
+        self.executions: "OrderedDict[str, Execution]" = OrderedDict()
+        self.inflight: Dict[str, Execution] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(self, coordinator: str, params: Dict[str, Any], priority: str = "interactive") -> Execution:
+        if coordinator not in JOB_KINDS:
+            raise KeyError(coordinator)
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}")
+        key = request_key(coordinator, params)
+        execution = self.inflight.get(key)
+        if execution is not None:
+            execution.requests += 1
+            execution.raise_priority(priority)
+            return execution
+        execution = Execution(coordinator, params, key, priority)
+        self.inflight[key] = execution
+        self.executions[execution.id] = execution
+        execution.task = asyncio.ensure_future(self._run(execution))
+        self._evict()
+        return execution
+
+    def _evict(self):
+        finished = [e for e in self.executions.values() if e.finished_at is not None]
+        for execution in finished[:max(0, len(self.executions) - self.retain)]:
+            del self.executions[execution.id]
+
+    async def _run(self, execution: Execution):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        try:
+            async with self._slots:
+                execution.status = "running"
+                with run_scope(on_stage=execution.emit, priority=execution.priority,
+                               job=f"exec-{execution.id}") as run:
+                    execution.run = run
+                    execution.result = await JOB_KINDS[execution.coordinator](execution.params)
+            execution.finish("done")
+        except Exception:
+            execution.error = traceback.format_exc()
+            execution.finish("failed")
+        finally:
+            self.inflight.pop(execution.key, None)
+            save_telemetry()
+
+    async def handle(self, request: Request):
+        parts = [p for p in request.path.split("/") if p]
+        if parts == ["health"]:
+            return Response.json({"status": "ok", "inflight": len(self.inflight),
+                                  "scheduler": get_scheduler().stats()})
+        if parts == ["jobs"] and request.method == "POST":
+            try:
+                body = request.json() or {}
+                if not isinstance(body, dict):
+                    raise TypeError("body is not an object")
+                coordinator = body["coordinator"]
+                params = body.get("params") or {}
+                priority = body.get("priority") or "interactive"
+                if not (isinstance(coordinator, str) and isinstance(params, dict) and isinstance(priority, str)):
+                    raise TypeError("wrong field types")
+            except (ValueError, KeyError, TypeError):
+                return Response.json({"error": "expected {\"coordinator\": ..., \"params\": {...}}"}, status=400)
+            try:
+                execution = self.submit(coordinator, params, priority)
+            except KeyError:
+                return Response.json({"error": f"unknown coordinator {coordinator!r}",
+                                      "coordinators": sorted(JOB_KINDS)}, status=400)
+            except ValueError:
+                return Response.json({"error": f"unknown priority {priority!r}",
+                                      "priorities": list(PRIORITIES)}, status=400)
+            return Response.json({**execution.to_dict(include_result=False),
+                                  "coalesced": execution.requests > 1}, status=202)
+        if parts == ["jobs"] and request.method == "GET":
+            return Response.json([e.to_dict(include_result=False) for e in self.executions.values()])
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            execution = self.executions.get(parts[1])
+            if execution is None:
+                return Response.json({"error": "not found"}, status=404)
+            if len(parts) == 2:
+                return Response.json(execution.to_dict())
+            if parts[2] == "events":
+                return StreamResponse(execution.events())
+        return Response.json({"error": "not found"}, status=404)
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8080, max_concurrent: int = 4):
+    service = ResearchService(max_concurrent=max_concurrent)
+    server = await HTTPServer(service.handle, host, port).start()
+    print(f"Serving research jobs on {server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="HTTP service for research jobs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_concurrent))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
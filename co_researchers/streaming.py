@@ -0,0 +1,172 @@
+"""Token streaming through the agent layer.
+
+`stream_response` consumes `RoutedAgent.astream`, optionally renders the
+partial content live in a rich console, aborts runaway generations with a
+`StopGuard`, and reports time-to-first-token and tokens/s for the stage.
+A result cut off by the guard is partial; callers that store or build on
+responses should raise `GenerationAborted` for it rather than use it.
+"""
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+from .telemetry import CHARS_PER_TOKEN
+
+
+@dataclass
+class StreamMetrics:
+    stage: str
+    model: Optional[str]
+    ttft: Optional[float]
+    duration: float
+    tokens: int  # estimated from the text: stream deltas are not tokens
+    aborted: Optional[str] = None
+
+    @property
+    def tokens_per_second(self) -> float:
+        generating = self.duration - (self.ttft or 0.0)
+        return self.tokens / generating if generating > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "model": self.model,
+            "ttft": self.ttft,
+            "duration": self.duration,
+            "tokens": self.tokens,
+            "tokens_per_second": self.tokens_per_second,
+            "aborted": self.aborted,
+        }
+
+
+class GenerationAborted(Exception):
+    """A streamed generation was stopped early by its guard; `content` is the partial output"""
+
+    def __init__(self, stage: str, reason: str, content: str = ""):
+        super().__init__(f"{stage}: generation stopped early ({reason})")
+        self.stage = stage
+        self.reason = reason
+        self.content = content
+
+
+@dataclass
+class StreamResult:
+    content: str
+    metrics: StreamMetrics
+
+    def complete(self) -> str:
+        """The content, or GenerationAborted if the guard cut the generation off"""
+        if self.metrics.aborted:
+            raise GenerationAborted(self.metrics.stage, self.metrics.aborted, self.content)
+        return self.content
+
+
+class StopGuard:
+    """Decides when a streaming generation should be cut off early"""
+
+    def __init__(self, max_chars: Optional[int] = None, stop_patterns: Sequence[str] = (),
+                 max_line_repeats: Optional[int] = 8,
+                 predicate: Optional[Callable[[str], bool]] = None, pattern_window: int = 512):
+        """
+        Args:
+            pattern_window: Longest match expected from a stop pattern; only the newest text plus
+                this many characters before it is searched on each delta
+        """
+        self.max_chars = max_chars
+        self.stop_patterns = [re.compile(p) for p in stop_patterns]
+        self.max_line_repeats = max_line_repeats
+        self.predicate = predicate
+        self.pattern_window = pattern_window
+
+    def check(self, content: str, new_chars: Optional[int] = None) -> Optional[str]:
+        """Reason to abort, or None to keep streaming
+
+        `new_chars` is how much of `content` arrived since the last check (None: all of it).
+        """
+        if self.max_chars is not None and len(content) > self.max_chars:
+            return f"output exceeded {self.max_chars} characters"
+        # Earlier text was already searched, so only a match reaching into the new text can be new
+        tail = content if new_chars is None else content[-(new_chars + self.pattern_window):]
+        for pattern in self.stop_patterns:
+            if pattern.search(tail):
+                return f"stop pattern {pattern.pattern!r} matched"
+        if self.max_line_repeats and content.endswith("\n"):
+            lines = [line for line in content[-4000:].splitlines() if line.strip()]
+            tail = lines[-self.max_line_repeats:]
+            if len(tail) == self.max_line_repeats and len(set(tail)) == 1:
+                return f"line repeated {self.max_line_repeats} times"
+        if self.predicate is not None and self.predicate(content):
+            return "stop condition met"
+        return None
+
+
+class LiveRenderer:
+    """Shows the tail of a streaming response in a transient rich Live panel"""
+
+    def __init__(self, console: Any, title: str, max_lines: int = 25):
+        self.console = console
+        self.title = title
+        self.max_lines = max_lines
+        self._live = None
+        self._last_update = 0.0
+
+    def _renderable(self, content: str):
+        from rich.markdown import Markdown
+        from rich.panel import Panel
+
+        tail = "\n".join(content.splitlines()[-self.max_lines:])
+        return Panel(Markdown(tail), title=self.title, border_style="dim")
+
+    def __enter__(self) -> "LiveRenderer":
+        from rich.live import Live
+
+        self._live = Live(self._renderable(""), console=self.console, refresh_per_second=8, transient=True)
+        self._live.__enter__()
+        return self
+
+    def update(self, content: str):
+        # Re-rendering markdown on every token is wasted work above the refresh rate
+        now = time.monotonic()
+        if now - self._last_update >= 0.1:
+            self._last_update = now
+            self._live.update(self._renderable(content))
+
+    def __exit__(self, *exc):
+        self._live.__exit__(*exc)
+
+
+async def stream_response(agent: Any, message: Any, *, guard: Optional[StopGuard] = None,
+                          console: Any = None, title: Optional[str] = None,
+                          on_delta: Optional[Callable[[str], None]] = None, **kwargs) -> StreamResult:
+    """Stream a routed agent's response to completion, a guard abort, or the end of input"""
+    stage = getattr(agent, "stage", type(agent).__name__)
+    renderer = LiveRenderer(console, title or stage) if console is not None else None
+    content = ""
+    ttft = None
+    aborted = None
+    start = time.perf_counter()
+    stream = agent.astream(message, **kwargs)
+    try:
+        if renderer:
+            renderer.__enter__()
+        async for delta in stream:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            content += delta
+            if on_delta:
+                on_delta(delta)
+            if renderer:
+                renderer.update(content)
+            if guard:
+                aborted = guard.check(content, len(delta))
+                if aborted:
+                    break
+    finally:
+        await stream.aclose()
+        if renderer:
+            renderer.__exit__(None, None, None)
+
+    metrics = StreamMetrics(stage, getattr(agent, "last_model", None), ttft,
+                            time.perf_counter() - start, len(content) // CHARS_PER_TOKEN, aborted)
+    return StreamResult(content, metrics)
@@ -0,0 +1,173 @@
+"""Per-stage call telemetry shared by routing and scheduling decisions.
+
+The process-wide telemetry is seeded on first use with the samples saved at
+`$CO_RESEARCHERS_TELEMETRY` (default `co_researchers_telemetry.json`; set it
+empty to disable). Routing and deadline estimates therefore start from
+earlier runs, not from defaults. Entry points that run research call
+`save_telemetry` when a run finishes.
+"""
+import json
+import logging
+import math
+import os
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_ENV = "CO_RESEARCHERS_TELEMETRY"
+DEFAULT_TELEMETRY_PATH = "co_researchers_telemetry.json"
+CHARS_PER_TOKEN = 4
+
+@dataclass
+class CallSample:
+    stage: str
+    model: str
+    latency: float
+    outcome: str = "ok"  # "ok", "timeout", "throttled", "error" or "aborted" (a stream stopped early)
+    tokens: int = 0
+    ttft: Optional[float] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+def response_tokens(response: Any) -> int:
+    """Total tokens reported on an agno RunResponse, estimated from the text if absent"""
+    metrics = getattr(response, "metrics", None) or {}
+    total = metrics.get("total_tokens")
+    if isinstance(total, list):
+        return int(sum(total))
+    if isinstance(total, (int, float)):
+        return int(total)
+    content = getattr(response, "content", None)
+    return len(str(content)) // CHARS_PER_TOKEN if content else 0
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, `q` in [0, 1]"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class Telemetry:
+    """Rolling window of call samples and quality scores per (stage, model) route"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], Deque[CallSample]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._quality: Dict[Tuple[str, str], Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, sample: CallSample):
+        self._samples[(sample.stage, sample.model)].append(sample)
+
+    def record_quality(self, stage: str, model: str, score: float):
+        self._quality[(stage, model)].append(float(score))
+
+    def samples(self, stage: Optional[str] = None, model: Optional[str] = None) -> List[CallSample]:
+        return [
+            sample
+            for (s, m), samples in self._samples.items()
+            if (stage is None or s == stage) and (model is None or m == model)
+            for sample in samples
+        ]
+
+    def latencies(self, stage: str, model: Optional[str] = None) -> List[float]:
+        return [s.latency for s in self.samples(stage, model) if s.outcome == "ok"]
+
+    def token_counts(self, stage: str, model: Optional[str] = None) -> List[int]:
+        return [s.tokens for s in self.samples(stage, model) if s.outcome == "ok"]
+
+    def latency_percentile(self, stage: str, q: float, model: Optional[str] = None) -> Optional[float]:
+        return percentile(self.latencies(stage, model), q)
+
+    def throttle_rate(self, stage: str, model: str, recent: int = 20) -> float:
+        samples = self.samples(stage, model)[-recent:]
+        if not samples:
+            return 0.0
+        return sum(1 for s in samples if s.outcome == "throttled") / len(samples)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-route counts, latency percentiles and mean quality"""
+        report: Dict[str, Dict[str, Any]] = {}
+        for (stage, model), samples in sorted(self._samples.items()):
+            latencies = [s.latency for s in samples if s.outcome == "ok"]
+            streamed = [s for s in samples if s.outcome == "ok" and s.ttft is not None and s.latency > s.ttft]
+            quality = self._quality.get((stage, model))
+            report[f"{stage}:{model}"] = {
+                "calls": len(samples),
+                "ok": len(latencies),
+                "timeouts": sum(1 for s in samples if s.outcome == "timeout"),
+                "throttled": sum(1 for s in samples if s.outcome == "throttled"),
+                "errors": sum(1 for s in samples if s.outcome == "error"),
+                "aborted": sum(1 for s in samples if s.outcome == "aborted"),
+                "p50": percentile(latencies, 0.5),
+                "p95": percentile(latencies, 0.95),
+                "tokens": sum(s.tokens for s in samples),
+                "ttft_p50": percentile([s.ttft for s in streamed], 0.5),
+                "tokens_per_second": (
+                    sum(s.tokens for s in streamed) / sum(s.latency - s.ttft for s in streamed)
+                    if streamed else None
+                ),
+                "quality": sum(quality) / len(quality) if quality else None,
+            }
+        return report
+
+    def save(self, path: Union[str, Path]):
+        data = {
+            "samples": [asdict(s) for samples in self._samples.values() for s in samples],
+            "quality": [[stage, model, list(scores)] for (stage, model), scores in self._quality.items()],
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    def load(self, path: Union[str, Path]) -> "Telemetry":
+        with open(path) as f:
+            data = json.load(f)
+        for sample in data.get("samples", []):
+            self.record(CallSample(**sample))
+        for stage, model, scores in data.get("quality", []):
+            self._quality[(stage, model)].extend(scores)
+        return self
+
+
+_telemetry: Optional[Telemetry] = None
+
+
+def telemetry_path() -> Optional[str]:
+    return os.environ.get(TELEMETRY_ENV, DEFAULT_TELEMETRY_PATH) or None
+
+
+def get_telemetry() -> Telemetry:
+    """The process-wide telemetry, seeded on first use with the samples persisted at `telemetry_path()`"""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry()
+        path = telemetry_path()
+        if path and os.path.exists(path):
+            try:
+                _telemetry.load(path)
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                logger.warning("Ignoring unreadable telemetry file %s: %r", path, e)
+    return _telemetry
+
+
+def save_telemetry(path: Optional[str] = None):
+    """Persist the process-wide telemetry for later runs and other processes; the last writer wins"""
+    path = path or telemetry_path()
+    if not path or _telemetry is None:
+        return
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        _telemetry.save(temporary)
+        os.replace(temporary, path)
+    except OSError as e:
+        logger.warning("Could not save telemetry to %s: %r", path, e)
+
+
+def set_telemetry(telemetry: Telemetry):
+    global _telemetry
+    _telemetry = telemetry
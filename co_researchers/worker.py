@@ -0,0 +1,263 @@
+"""Worker processes for the research job queue.
+
+Usage:
+    python -m co_researchers.worker submit deep_research topic="Quantum error correction" depth=brief
+    python -m co_researchers.worker work --processes 4 --concurrency 4
+    python -m co_researchers.worker status [--job 12]
+
+Each worker process runs its own event loop and executes up to
+`--concurrency` jobs at once, renewing each job's lease while it runs. Queue
+calls run in a thread, so a locked database does not stall the loop and the
+heartbeats of other jobs.
+Queued jobs run in the "batch" scheduling class, so their model calls yield
+to interactive work in the same process; a job's `--priority` also raises
+its share of the batch call slots.
+
+asyncio is imported where it is used so that the queue commands (`submit`,
+`status`) start without it.
+"""
+import argparse
+import json
+import multiprocessing
+import sqlite3
+import sys
+import traceback
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from .jobqueue import DEFAULT_DB, Job, JobQueue, worker_id
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+async def _deep_research(params: Dict[str, Any]) -> Dict[str, Any]:
+    from deep_research.coordinator import DeepResearcher
+    from deep_research.topic_cache import default_cache
+    return await DeepResearcher(cache=default_cache()).research(params["topic"],
+                                                               depth=params.get("depth", "comprehensive"),
+                                                               deadline=params.get("deadline"),
+                                                               token_budget=params.get("token_budget"))
+
+
+async def _ai_co_scientist(params: Dict[str, Any]) -> Dict[str, Any]:
+    from ai_co_scientist.coordinator import AICoScientist
+    from ai_co_scientist.store import default_store
+    return await AICoScientist(store=default_store()).research(params["goal"], deadline=params.get("deadline"),
+                                                               token_budget=params.get("token_budget"))
+
+
+async def _mlx_codegen(params: Dict[str, Any]) -> Dict[str, Any]:
+    from mlx_t2v_researcher.agents import MLXCodeGenerator
+    from mlx_t2v_researcher.components import default_component_cache
+    generator = MLXCodeGenerator(params["model_repo_path"], output_path=params.get("output_path", "mlx_output"),
+                                 candidates=params.get("candidates", 1), component_cache=default_component_cache())
+    analysis = await generator.analyze_and_plan()
+    results = await generator.generate_initial_code(analysis)
+    return await generator.refine_until_converged(results, max_refinements=int(params.get("refinements", 1)))
+
+
+JOB_KINDS: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+    "deep_research": _deep_research,
+    "ai_co_scientist": _ai_co_scientist,
+    "mlx_codegen": _mlx_codegen,
+}
+
+
+class Worker:
+    def __init__(self, db_path: str = DEFAULT_DB, concurrency: int = 4, poll_interval: float = 1.0,
+                 lease_seconds: float = 60.0, kinds: Optional[List[str]] = None,
+                 max_jobs: Optional[int] = None):
+        """
+        Args:
+            db_path: SQLite queue file
+            concurrency: Jobs run at once by this process
+            poll_interval: Seconds to wait when the queue is empty
+            lease_seconds: Lease length; heartbeats renew it every third of this
+            kinds: Only claim these job kinds
+            max_jobs: Exit after this many jobs (None runs until stopped)
+        """
+        self.queue = JobQueue(db_path, lease_seconds)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.kinds = kinds
+        self.max_jobs = max_jobs
+        self.id = worker_id()
+
+    async def _heartbeat(self, job: Job, task: "asyncio.Task"):
+        import asyncio
+
+        while not task.done():
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                owned = await asyncio.to_thread(self.queue.heartbeat, job.id, job.lease)
+            except sqlite3.Error:
+                # Busy database: the lease has two more beats before it lapses
+                continue
+            if not owned:
+                # The lease was lost (e.g. the job was re-queued); stop duplicate work
+                task.cancel()
+                return
+
+    async def _execute(self, job: Job):
+        import asyncio
+
+        from .context import run_scope
+        from .telemetry import save_telemetry
+
+        runner = JOB_KINDS.get(job.kind)
+        if runner is None:
+            await asyncio.to_thread(self.queue.fail, job.id, job.lease, f"Unknown job kind: {job.kind}", retry=False)
+            return
+        with run_scope(priority="batch", job=f"job-{job.id}", weight=1.0 + max(0, job.priority)):
+            task = asyncio.ensure_future(runner(job.params))
+        heartbeat = asyncio.ensure_future(self._heartbeat(job, task))
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            return
+        except Exception:
+            await asyncio.to_thread(self.queue.fail, job.id, job.lease, traceback.format_exc())
+        else:
+            try:
+                await asyncio.to_thread(self.queue.complete, job.id, job.lease, result)
+            except (TypeError, ValueError, sqlite3.Error) as e:
+                # Retrying would only rerun the job to the same unstorable result
+                await asyncio.to_thread(self.queue.fail, job.id, job.lease, f"Could not store the result: {e!r}",
+                                        retry=False)
+        finally:
+            heartbeat.cancel()
+            save_telemetry()
+
+    async def run(self):
+        import asyncio
+
+        slots = asyncio.Semaphore(self.concurrency)
+        running = set()
+        claimed = 0
+        while self.max_jobs is None or claimed < self.max_jobs:
+            await slots.acquire()
+            job = await asyncio.to_thread(self.queue.claim, self.id, self.kinds)
+            if job is None:
+                slots.release()
+                if self.max_jobs is not None and not running:
+                    break
+                await asyncio.sleep(self.poll_interval)
+                continue
+            claimed += 1
+            task = asyncio.ensure_future(self._execute(job))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            task.add_done_callback(lambda _: slots.release())
+        if running:
+            await asyncio.gather(*running)
+
+
+def _work(options: Dict[str, Any]):
+    import asyncio
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    asyncio.run(Worker(**options).run())
+
+
+def run_workers(processes: int, **options):
+    """Run `processes` worker processes until they exit or are interrupted"""
+    if processes <= 1:
+        _work(options)
+        return
+    context = multiprocessing.get_context("spawn")
+    children = [context.Process(target=_work, args=(options,), daemon=False) for _ in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+
+
+def _parse_params(pairs: List[str]) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"Expected key=value, got {pair!r}")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+def add_job_commands(subparsers):
+    """Register the `submit`, `work` and `status` subcommands"""
+    submit = subparsers.add_parser("submit", help="Queue a research job")
+    submit.add_argument("kind", choices=sorted(JOB_KINDS))
+    submit.add_argument("params", nargs="*", help="key=value parameters (values may be JSON)")
+    submit.add_argument("--priority", type=int, default=0)
+    submit.add_argument("--max-attempts", type=int, default=3)
+    submit.set_defaults(handler=_submit)
+
+    work = subparsers.add_parser("work", help="Run worker processes")
+    work.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    work.add_argument("--concurrency", type=int, default=4, help="Concurrent jobs per process")
+    work.add_argument("--lease", type=float, default=60.0, help="Lease length in seconds")
+    work.add_argument("--poll-interval", type=float, default=1.0)
+    work.add_argument("--kinds", nargs="+", choices=sorted(JOB_KINDS))
+    work.add_argument("--max-jobs", type=int, help="Exit after this many jobs per process")
+    work.set_defaults(handler=_run)
+
+    status = subparsers.add_parser("status", help="Show queue status or one job")
+    status.add_argument("--job", type=int)
+    status.add_argument("--status", dest="filter", choices=["queued", "running", "done", "failed"])
+    status.add_argument("--limit", type=int, default=20)
+    status.set_defaults(handler=_status)
+
+
+def _submit(args):
+    queue = JobQueue(args.db)
+    job_id = queue.submit(args.kind, _parse_params(args.params), args.priority, args.max_attempts)
+    print(job_id)
+
+
+def _run(args):
+    run_workers(
+        args.processes,
+        db_path=args.db,
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        lease_seconds=args.lease,
+        kinds=args.kinds,
+        max_jobs=args.max_jobs,
+    )
+
+
+def _status(args):
+    queue = JobQueue(args.db)
+    if args.job is not None:
+        job = queue.get(args.job)
+        if job is None:
+            raise SystemExit(f"No job {args.job}")
+        print(json.dumps(vars(job), indent=2, default=str))
+        return
+    print(json.dumps(queue.counts(), sort_keys=True))
+    for job in queue.jobs(args.filter, args.limit):
+        summary = json.dumps(job.params)[:60]
+        print(f"{job.id:>6}  {job.status:<8} {job.kind:<16} attempts={job.attempts}/{job.max_attempts}  {summary}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Research job queue")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite queue file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_job_commands(subparsers)
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,12 +1,13 @@
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 from agno.tools.exa import ExaTools
 from typing import List, Dict, Any
+from co_researchers.routing import routed_agent
 
 class InitialResearchAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4o-mini-2024-07-18"),
+        self.agent = routed_agent(
+            stage="deep_research.initial_research",
+            tier="standard",
+            latency_target=60,
             description="""You are an initial research agent that performs broad exploration of topics.
             You identify key areas to investigate and create a research framework.""",
             tools=[ExaTools()],
@@ -22,8 +23,10 @@ class InitialResearchAgent:
 
 class DeepDiveAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4o-mini-2024-07-18"),
+        self.agent = routed_agent(
+            stage="deep_research.deep_dive",
+            tier="standard",
+            latency_target=90,
             description="""You are a deep-dive research agent that performs detailed investigation 
             into specific aspects of the topic. You focus on finding detailed technical information
             and specialized knowledge.""",
@@ -40,8 +43,10 @@ class DeepDiveAgent:
 
 class AnalysisAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4o-mini-2024-07-18"),
+        self.agent = routed_agent(
+            stage="deep_research.analysis",
+            tier="standard",
+            latency_target=60,
             description="""You are an analysis agent that evaluates research findings.
             You analyze trends, patterns, and implications of the research.""",
             markdown=True,
@@ -56,8 +61,10 @@ class AnalysisAgent:
 
 class FactCheckAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4o-mini-2024-07-18"),
+        self.agent = routed_agent(
+            stage="deep_research.fact_check",
+            tier="fast",
+            latency_target=45,
             description="""You are a fact-checking agent that verifies claims and findings.
             You look for supporting evidence and identify potential inaccuracies.""",
             tools=[ExaTools()],
@@ -73,8 +80,10 @@ class FactCheckAgent:
 
 class CriticalReviewAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4o-mini-2024-07-18"),
+        self.agent = routed_agent(
+            stage="deep_research.critical_review",
+            tier="standard",
+            latency_target=60,
             description="""You are a critical review agent that challenges assumptions
             and identifies potential biases or limitations in the research.""",
             markdown=True,
@@ -89,8 +98,10 @@ class CriticalReviewAgent:
 
 class SynthesisAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4o-mini-2024-07-18"),
+        self.agent = routed_agent(
+            stage="deep_research.synthesis",
+            tier="standard",
+            latency_target=90,
             description="""You are a synthesis agent that combines and integrates all research findings.
             You create a coherent narrative and identify key insights.""",
             markdown=True,
@@ -105,8 +116,10 @@ class SynthesisAgent:
 
 class RecommendationAgent:
     def __init__(self):
-        self.agent = Agent(
-            model=OpenAIChat(id="gpt-4o-mini-2024-07-18"),
+        self.agent = routed_agent(
+            stage="deep_research.recommendation",
+            tier="standard",
+            latency_target=60,
             description="""You are a recommendation agent that provides actionable insights
             and suggests next steps based on the research findings.""",
             markdown=True,
@@ -1,9 +1,22 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import asyncio
+from co_researchers.budget import SHORTEN_PROMPT, BudgetExceeded, BudgetStage, RunBudget, budget_scope
+from co_researchers.context import report_stage
+from co_researchers.ratelimit import RateLimiter
 from .agents import *
+from .framework import DEPTH_AREAS, area_title, merge_deep_dives, parse_research_areas
+from .topic_cache import CacheLookup, TopicCache
+
+STAGES = ["framework", "deep_dive", "analysis", "fact_check", "critique", "synthesis", "recommendations"]
+SKIPPED = "(Skipped to meet the deadline or token budget.)"
 
 class DeepResearcher:
-    def __init__(self):
+    def __init__(self, cache: Optional[TopicCache] = None):
+        """
+        Args:
+            cache: Semantic topic cache; near-duplicate topics reuse or update earlier results
+        """
+        self.cache = cache
         self.initial_researcher = InitialResearchAgent()
         self.deep_diver = DeepDiveAgent()
         self.analyzer = AnalysisAgent()
@@ -11,76 +24,194 @@ class DeepResearcher:
         self.critic = CriticalReviewAgent()
         self.synthesizer = SynthesisAgent()
         self.recommender = RecommendationAgent()
+        # Shared across concurrent calls to stay under 5 req/sec
+        self.rate_limiter = RateLimiter(rate=4)
 
-    async def research(self, topic: str, depth: str = "comprehensive") -> Dict[str, Any]:
+    async def research(self, topic: str, depth: str = "comprehensive", deadline: Optional[float] = None,
+                       token_budget: Optional[int] = None) -> Dict[str, Any]:
         """
         Perform deep research on a topic
         
         Args:
             topic: The research topic or question
-            depth: Research depth ("brief", "comprehensive", or "exhaustive")
+            depth: Research depth ("brief", "comprehensive", or "exhaustive"), which also
+                sets how many framework areas get their own concurrent deep dive
+            deadline: Seconds within which to return; fact-check and critique are shortened or
+                skipped when telemetry says they would not fit, and a partial result is returned
+                if a required stage runs out of time
+            token_budget: Most tokens to spend, handled the same way
         """
-        # Add delays between API calls to respect rate limits
-        async def rate_limited_call(agent, prompt):
-            await asyncio.sleep(0.25)  # Wait 250ms between calls to stay under 5 req/sec
-            return await agent.arun(prompt)
+        budget = RunBudget(deadline, token_budget)
+        with budget_scope(budget):
+            results = await self._lookup_or_research(topic, depth, budget)
+        if budget.bounded:
+            results = {**results, "skipped_stages": list(budget.skipped), "budget": budget.to_dict()}
+        return results
+
+    async def _lookup_or_research(self, topic: str, depth: str, budget: RunBudget) -> Dict[str, Any]:
+        if self.cache is None:
+            return await self._research(topic, depth, budget)
+
+        lookup = self.cache.lookup(topic, depth)
+        report_stage("cache", lookup.to_dict())
+        if lookup.status == "hit":
+            for stage in STAGES:
+                report_stage(stage, lookup.result.get(stage, ""))
+            return {**lookup.result, "cache": lookup.to_dict()}
+        if lookup.status == "update":
+            results = await self._update(topic, lookup, budget)
+        else:
+            results = await self._research(topic, depth, budget)
+        # A partial result would be served as complete to later lookups
+        if not budget.skipped:
+            self.cache.store(topic, depth, results,
+                             source_id=lookup.entry_id if lookup.status == "update" else None)
+        return {**results, "cache": lookup.to_dict()}
+
+    async def _call(self, agent, prompt):
+        # Space out API calls to respect rate limits
+        await self.rate_limiter.wait()
+        return await agent.arun(prompt)
+
+    def _pipeline(self, depth: str) -> List[BudgetStage]:
+        return [
+            BudgetStage("framework", self.initial_researcher.agent.stage),
+            BudgetStage("deep_dive", self.deep_diver.agent.stage,
+                        calls=DEPTH_AREAS.get(depth, DEPTH_AREAS["comprehensive"])),
+            BudgetStage("analysis", self.analyzer.agent.stage),
+            BudgetStage("fact_check", self.fact_checker.agent.stage, optional=True),
+            BudgetStage("critique", self.critic.agent.stage, optional=True),
+            BudgetStage("synthesis", self.synthesizer.agent.stage),
+            BudgetStage("recommendations", self.recommender.agent.stage),
+        ]
+
+    async def _update(self, topic: str, lookup: CacheLookup, budget: RunBudget) -> Dict[str, Any]:
+        """Adapt the cached research on a closely related topic: only synthesis and recommendations are redone"""
+        cached = lookup.result
+        for stage in STAGES[:5]:
+            report_stage(stage, cached.get(stage, ""))
+
+        budget.begin(self._pipeline("comprehensive")[5:])
+        results = dict(cached)
+        try:
+            synthesis = await budget.run("synthesis", self._call(
+                self.synthesizer.agent,
+                f"""
+                Synthesize all research components for the topic: {topic}
+                They were gathered for the closely related topic "{lookup.matched_topic}";
+                point out where they do not fully cover the new topic.
 
+                Framework: {cached["framework"]}
+                Deep Dive: {cached["deep_dive"]}
+                Analysis: {cached["analysis"]}
+                Fact Check: {cached["fact_check"]}
+                Critique: {cached["critique"]}
+                """
+            ))
+            results["synthesis"] = synthesis.content
+            report_stage("synthesis", synthesis.content)
+
+            recommendations = await budget.run("recommendations", self._call(
+                self.recommender.agent,
+                f"Provide recommendations based on the synthesis:\n{synthesis.content}"
+            ))
+            results["recommendations"] = recommendations.content
+            report_stage("recommendations", recommendations.content)
+        except BudgetExceeded:
+            budget.skip_remaining()
+        return results
+
+    async def _optional(self, budget: RunBudget, stage: str, agent, prompt: str) -> str:
+        """Run an optional stage in full, shortened or not at all, as the budget allows"""
+        mode = budget.decide(stage)
+        if mode == "skip":
+            return SKIPPED
+        response = await budget.run(stage, self._call(agent, prompt + (SHORTEN_PROMPT if mode == "short" else "")))
+        return SKIPPED if response is None else response.content
+
+    async def _research(self, topic: str, depth: str, budget: RunBudget) -> Dict[str, Any]:
+        budget.begin(self._pipeline(depth))
+        results: Dict[str, Any] = {}
+        try:
+            await self._stages(topic, depth, budget, results)
+        except BudgetExceeded:
+            budget.skip_remaining()
+        return results
+
+    async def _stages(self, topic: str, depth: str, budget: RunBudget, results: Dict[str, Any]):
+        """The research pipeline, filling `results` stage by stage so a partial result survives a deadline"""
         # Initial research framework
-        framework = await rate_limited_call(
+        framework = await budget.run("framework", self._call(
             self.initial_researcher.agent,
             f"Create a research framework for {depth} investigation of: {topic}"
-        )
+        ))
+        results["framework"] = framework.content
+        report_stage("framework", framework.content)
 
-        # Deep dive research
-        deep_dive = await rate_limited_call(
-            self.deep_diver.agent,
-            f"Conduct detailed research based on this framework:\n{framework.content}"
-        )
+        # Deep dive research: one concurrent deep dive per framework area (map),
+        # merged into a single document (reduce)
+        areas = parse_research_areas(framework.content)[:DEPTH_AREAS.get(depth, DEPTH_AREAS["comprehensive"])]
+        titles = "\n".join(f"- {area_title(area)}" for area in areas)
+        dives = await budget.run("deep_dive", asyncio.gather(*(
+            self._call(
+                self.deep_diver.agent,
+                f"Conduct detailed research on one area of a {depth} investigation of: {topic}\n\n"
+                f"Area:\n{area}\n\n"
+                f"Other areas are covered separately, avoid overlapping with them:\n{titles}"
+            )
+            for area in areas
+        )))
+        deep_dive_content = merge_deep_dives(areas, [dive.content for dive in dives])
+        results["deep_dive"] = deep_dive_content
+        results["deep_dive_areas"] = [
+            {"area": area_title(area), "findings": dive.content} for area, dive in zip(areas, dives)
+        ]
+        report_stage("deep_dive", deep_dive_content)
 
         # Analysis of findings
-        analysis = await rate_limited_call(
+        analysis = await budget.run("analysis", self._call(
             self.analyzer.agent,
-            f"Analyze these research findings:\n{deep_dive.content}"
-        )
+            f"Analyze these research findings:\n{deep_dive_content}"
+        ))
+        results["analysis"] = analysis.content
+        report_stage("analysis", analysis.content)
 
-        # Fact checking
-        fact_check = await rate_limited_call(
-            self.fact_checker.agent,
-            f"Verify the key claims and findings:\n{deep_dive.content}\n\nAnalysis:\n{analysis.content}"
+        # Fact checking (optional under a deadline or token budget)
+        fact_check = await self._optional(
+            budget, "fact_check", self.fact_checker.agent,
+            f"Verify the key claims and findings:\n{deep_dive_content}\n\nAnalysis:\n{analysis.content}"
         )
+        results["fact_check"] = fact_check
+        report_stage("fact_check", fact_check)
 
-        # Critical review
-        critique = await rate_limited_call(
-            self.critic.agent,
-            f"Critically review the research and analysis:\n{deep_dive.content}\n\nAnalysis:\n{analysis.content}"
+        # Critical review (optional under a deadline or token budget)
+        critique = await self._optional(
+            budget, "critique", self.critic.agent,
+            f"Critically review the research and analysis:\n{deep_dive_content}\n\nAnalysis:\n{analysis.content}"
         )
+        results["critique"] = critique
+        report_stage("critique", critique)
 
         # Synthesis of all findings
-        synthesis = await rate_limited_call(
+        synthesis = await budget.run("synthesis", self._call(
             self.synthesizer.agent,
             f"""
             Synthesize all research components:
             
             Framework: {framework.content}
-            Deep Dive: {deep_dive.content}
+            Deep Dive: {deep_dive_content}
             Analysis: {analysis.content}
-            Fact Check: {fact_check.content}
-            Critique: {critique.content}
+            Fact Check: {fact_check}
+            Critique: {critique}
             """
-        )
+        ))
+        results["synthesis"] = synthesis.content
+        report_stage("synthesis", synthesis.content)
 
         # Recommendations
-        recommendations = await rate_limited_call(
+        recommendations = await budget.run("recommendations", self._call(
             self.recommender.agent,
             f"Provide recommendations based on the synthesis:\n{synthesis.content}"
-        )
-
-        return {
-            "framework": framework.content,
-            "deep_dive": deep_dive.content,
-            "analysis": analysis.content,
-            "fact_check": fact_check.content,
-            "critique": critique.content,
-            "synthesis": synthesis.content,
-            "recommendations": recommendations.content
-        } 
\ No newline at end of file
+        ))
+        results["recommendations"] = recommendations.content
+        report_stage("recommendations", recommendations.content)
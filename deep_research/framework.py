@@ -0,0 +1,93 @@
+"""Splitting a research framework into areas for parallel deep dives."""
+import re
+from typing import List, Tuple
+
+# How many framework areas get their own deep dive at each research depth
+DEPTH_AREAS = {
+    "brief": 2,
+    "comprehensive": 4,
+    "exhaustive": 8,
+}
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*\S)\s*$")
+LIST_ITEM = re.compile(r"^(\s*)(?:\d+[.)]|[-*+])\s+(.*\S)\s*$")
+AREA_SECTION = re.compile(r"deep[- ]?dive|research areas|key areas|areas (?:of|for|to)", re.IGNORECASE)
+NOT_AN_AREA = re.compile(
+    r"^(?:\d+[.)]\s*)?(introduction|overview|summary|conclusion|next steps|references|sources|"
+    r"major sources|experts|key experts|methodology|timeline|research challenges|challenges)\b",
+    re.IGNORECASE,
+)
+
+
+def _sections(text: str) -> List[Tuple[int, str, str]]:
+    """(heading level, title, body) for each markdown heading"""
+    sections: List[Tuple[int, str, List[str]]] = []
+    for line in text.splitlines():
+        match = HEADING.match(line)
+        if match:
+            sections.append((len(match.group(1)), match.group(2).strip("*_ "), []))
+        elif sections:
+            sections[-1][2].append(line)
+    return [(level, title, "\n".join(body).strip()) for level, title, body in sections]
+
+
+def _top_level_items(text: str) -> List[str]:
+    """Top-level list items, each with its nested lines"""
+    items: List[List[str]] = []
+    indent = None
+    for line in text.splitlines():
+        match = LIST_ITEM.match(line)
+        if match and (indent is None or len(match.group(1)) <= indent):
+            indent = len(match.group(1))
+            items.append([match.group(2)])
+        elif items and line.strip():
+            items[-1].append(line.strip())
+    return ["\n".join(item) for item in items]
+
+
+def _is_area(title: str) -> bool:
+    return not NOT_AN_AREA.match(re.sub(r"[*_`]", "", title).strip())
+
+
+def parse_research_areas(framework: str) -> List[str]:
+    """Extract the research areas from an InitialResearchAgent framework.
+
+    Prefers the items of an explicit "areas for deep-dive" section, then the
+    framework's repeated headings, then its top-level list items. Falls back
+    to the whole framework as a single area.
+    """
+    sections = _sections(framework)
+
+    for index, (level, title, body) in enumerate(sections):
+        if not AREA_SECTION.search(title):
+            continue
+        children = []
+        for child_level, child_title, child_body in sections[index + 1:]:
+            if child_level <= level:
+                break
+            children.append(f"{child_title}\n{child_body}".strip())
+        areas = children if len(children) >= 2 else _top_level_items(body)
+        if len(areas) >= 2:
+            return areas
+
+    for level in sorted({level for level, _, _ in sections}):
+        areas = [f"{title}\n{body}".strip() for lvl, title, body in sections if lvl == level and _is_area(title)]
+        if len(areas) >= 2:
+            return areas
+
+    items = [item for item in _top_level_items(framework) if _is_area(item.splitlines()[0])]
+    if len(items) >= 2:
+        return items
+    return [framework.strip()]
+
+
+def area_title(area: str) -> str:
+    first = area.strip().splitlines()[0] if area.strip() else "Research area"
+    first = re.sub(r"^\s*(?:\d+(?:\.\d+)*[.)]?|[A-Za-z][.)])\s+", "", first)
+    bold = re.match(r"\*\*(.+?)\*\*", first)
+    return (bold.group(1) if bold else first).strip("*_:# ")
+
+
+def merge_deep_dives(areas: List[str], findings: List[str]) -> str:
+    """Reduce step: one markdown document with a section per area"""
+    return "\n\n".join(f"## {area_title(area)}\n\n{text.strip()}" for area, text in zip(areas, findings))
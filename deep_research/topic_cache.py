@@ -0,0 +1,304 @@
+"""Semantic cache of research results keyed by topic.
+
+Topics are embedded locally (hashed word, word-pair and character n-gram
+features, so no embedding API call is needed) and searched by cosine
+similarity. A lookup returns one of three decisions:
+
+- `hit`: a cached topic at or above `reuse_threshold` with the same or a
+  deeper research depth; its result is returned as is.
+- `update`: a cached topic at or above `update_threshold`; its framework and
+  deep dives are reused and only the later stages are re-run for the new
+  wording (see `DeepResearcher`).
+- `miss`: nothing close enough; the full pipeline runs.
+
+Only full research runs are matched. The result of an update is stored with
+the `source_id` of the entry it was adapted from. It is kept for the record
+but never indexed, so an update never serves as a hit or as the source of
+another update. Each of those would drift further from the research that was
+actually done.
+
+Entries live in SQLite so every worker process shares them; rows added by
+other processes are picked up on the next lookup. Search is an exact
+matrix-vector product until the index reaches `approximate_after` entries,
+after which random-hyperplane LSH narrows the candidates first.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DB = "co_researchers_topics.db"
+DEPTH_ORDER = {"brief": 0, "comprehensive": 1, "exhaustive": 2}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    depth TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    result TEXT NOT NULL,
+    source_id INTEGER,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+"""
+
+# Words that change how a topic is asked, not what it is about
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in into is it its me my of on or our please regarding
+research should tell than that the their them these this those to us was we what when where which who why
+will with about overview explain investigate investigation study report give provide summary summarize
+""".split())
+
+# Words common to research requests on any subject; they count, but far less than the subject itself
+GENERIC_WORDS = frozenset("""
+latest recent current new emerging future state art trends trend developments development advances advance
+progress challenges challenge problems problem issues open key main major important applications application
+impact implications opportunities risks limitations landscape analysis review comprehensive brief detailed
+""".split())
+GENERIC_WEIGHT = 0.3
+
+_WORD = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+
+def _features(text: str) -> List[Tuple[str, float]]:
+    words = [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+    weights = [GENERIC_WEIGHT if w in GENERIC_WORDS else 1.0 for w in words]
+    features = [(f"w:{w}", weight) for w, weight in zip(words, weights)]
+    features += [(f"b:{a} {b}", 0.7 * min(wa, wb)) for a, b, wa, wb in zip(words, words[1:], weights, weights[1:])]
+    for word, weight in zip(words, weights):
+        # Character 4-grams match inflections ("qubit"/"qubits") of subject words
+        if weight == 1.0:
+            padded = f"<{word}>"
+            features += [(f"c:{padded[i:i + 4]}", 0.25) for i in range(max(1, len(padded) - 3))]
+    return features
+
+
+def embed(text: str, dim: int = 1024) -> np.ndarray:
+    """Unit-length hashed n-gram embedding of `text` (signed feature hashing, deterministic across processes)"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(text):
+        h = zlib.crc32(feature.encode())
+        vector[h % dim] += weight if (h >> 31) & 1 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class VectorIndex:
+    """Cosine-similarity index over unit vectors: exact search, switching to LSH candidates when large"""
+
+    def __init__(self, dim: int, approximate_after: int = 20000, tables: int = 24, bits: int = 10, seed: int = 0):
+        self.dim = dim
+        self.approximate_after = approximate_after
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self.ids: List[int] = []
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(tables)]
+        self._powers = 1 << np.arange(bits)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def approximate(self) -> bool:
+        return len(self.ids) >= self.approximate_after
+
+    def _codes(self, vector: np.ndarray) -> np.ndarray:
+        return ((self._planes @ vector) > 0) @ self._powers
+
+    def add(self, item_id: int, vector: np.ndarray):
+        row = len(self.ids)
+        if row == len(self._vectors):
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        self._vectors[row] = vector
+        self.ids.append(item_id)
+        for table, code in enumerate(self._codes(vector)):
+            self._buckets[table].setdefault(int(code), []).append(row)
+
+    def search(self, vector: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        """Up to `k` (id, cosine similarity) pairs, most similar first"""
+        if not self.ids:
+            return []
+        if self.approximate:
+            rows = sorted({r for table, code in enumerate(self._codes(vector))
+                           for r in self._buckets[table].get(int(code), ())})
+            if not rows:
+                return []
+            rows = np.asarray(rows)
+            scores = self._vectors[rows] @ vector
+        else:
+            rows = np.arange(len(self.ids))
+            scores = self._vectors[:len(self.ids)] @ vector
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[int(rows[i])], float(scores[i])) for i in top]
+
+
+@dataclass
+class CacheLookup:
+    """A cache decision: `status` is hit, update or miss"""
+    status: str
+    similarity: float = 0.0
+    entry_id: Optional[int] = None
+    matched_topic: Optional[str] = None
+    matched_depth: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "similarity": round(self.similarity, 4),
+            "matched_topic": self.matched_topic,
+            "matched_depth": self.matched_depth,
+            "lookup_ms": round(self.seconds * 1000, 2),
+        }
+
+
+@dataclass
+class CacheStats:
+    lookups: int = 0
+    hits: int = 0
+    updates: int = 0
+    misses: int = 0
+    similarities: List[float] = field(default_factory=list)
+
+    def record(self, lookup: CacheLookup):
+        counter = {"hit": "hits", "update": "updates", "miss": "misses"}[lookup.status]
+        self.lookups += 1
+        setattr(self, counter, getattr(self, counter) + 1)
+        self.similarities.append(lookup.similarity)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "updates": self.updates,
+            "misses": self.misses,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "reuse_rate": (self.hits + self.updates) / self.lookups if self.lookups else 0.0,
+            "mean_similarity": float(np.mean(self.similarities)) if self.similarities else None,
+        }
+
+
+class TopicCache:
+    def __init__(self, path: str = DEFAULT_CACHE_DB, reuse_threshold: float = 0.9, update_threshold: float = 0.85,
+                 max_age: Optional[float] = 7 * 24 * 3600, dim: int = 1024, approximate_after: int = 20000):
+        """
+        Args:
+            path: SQLite file shared by every process using the cache
+            reuse_threshold: Similarity at or above which a cached result is returned as is
+            update_threshold: Similarity at or above which a cached result is updated instead of redone
+            max_age: Seconds after which an entry is only good for an update, never a plain hit
+            dim: Embedding size
+            approximate_after: Index size from which search uses LSH candidates
+        """
+        self.path = path
+        self.reuse_threshold = reuse_threshold
+        self.update_threshold = update_threshold
+        self.max_age = max_age
+        self.dim = dim
+        self.index = VectorIndex(dim, approximate_after=approximate_after)
+        self.stats = CacheStats()
+        self._meta: Dict[int, Tuple[str, str, float]] = {}
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._sync()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _sync(self):
+        """Index rows added since the last sync, including those written by other processes"""
+        rows = self._conn.execute(
+            "SELECT id, topic, depth, vector, source_id, created_at FROM topics WHERE id > ? ORDER BY id",
+            (self._last_id,),
+        ).fetchall()
+        for row in rows:
+            self._last_id = row["id"]
+            if row["source_id"] is not None:
+                # Updated results are never reused
+                continue
+            vector = np.frombuffer(row["vector"], dtype=np.float32)
+            if len(vector) != self.dim:
+                vector = embed(row["topic"], self.dim)
+            self.index.add(row["id"], vector)
+            self._meta[row["id"]] = (row["topic"], row["depth"], row["created_at"])
+
+    def lookup(self, topic: str, depth: str = "comprehensive") -> CacheLookup:
+        start = time.perf_counter()
+        with self._lock:
+            self._sync()
+            vector = embed(topic, self.dim)
+            candidates = self.index.search(vector, k=8)
+            lookup = CacheLookup("miss", candidates[0][1] if candidates else 0.0)
+            now = time.time()
+            # Candidates come most similar first, so the first usable one wins
+            for entry_id, similarity in candidates:
+                cached_topic, cached_depth, created_at = self._meta[entry_id]
+                deep_enough = DEPTH_ORDER.get(cached_depth, 1) >= DEPTH_ORDER.get(depth, 1)
+                fresh = self.max_age is None or now - created_at <= self.max_age
+                if similarity >= self.reuse_threshold and deep_enough and fresh:
+                    status = "hit"
+                elif similarity >= self.update_threshold and deep_enough:
+                    status = "update"
+                else:
+                    continue
+                lookup = CacheLookup(status, similarity, entry_id, cached_topic, cached_depth)
+                break
+            if lookup.entry_id is not None:
+                row = self._conn.execute("SELECT result FROM topics WHERE id = ?", (lookup.entry_id,)).fetchone()
+                lookup.result = json.loads(row["result"])
+                self._conn.execute("UPDATE topics SET hits = hits + 1 WHERE id = ?", (lookup.entry_id,))
+            lookup.seconds = time.perf_counter() - start
+            self.stats.record(lookup)
+        match = f"{lookup.similarity:.3f} to {lookup.matched_topic!r}" if lookup.matched_topic else \
+            f"nearest {lookup.similarity:.3f}"
+        logger.info("topic cache %s for %r (similarity %s); hit rate %.1f%%, reuse rate %.1f%% over %d lookups",
+                    lookup.status, topic, match, 100 * self.stats.hits / self.stats.lookups,
+                    100 * (self.stats.hits + self.stats.updates) / self.stats.lookups, self.stats.lookups)
+        return lookup
+
+    def store(self, topic: str, depth: str, result: Dict[str, Any], source_id: Optional[int] = None) -> int:
+        """Store a result; pass the `source_id` of the entry an updated result was adapted from"""
+        vector = embed(topic, self.dim)
+        stored = {k: v for k, v in result.items() if k != "cache"}
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO topics (topic, depth, vector, result, source_id, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (topic, depth, vector.tobytes(), json.dumps(stored), source_id, time.time()),
+            )
+            self._sync()
+        return cursor.lastrowid
+
+
+_default_cache: Optional[TopicCache] = None
+
+
+def default_cache() -> Optional[TopicCache]:
+    """This process's cache at `$CO_RESEARCHERS_TOPIC_CACHE`, or None when the variable is unset"""
+    global _default_cache
+    path = os.environ.get("CO_RESEARCHERS_TOPIC_CACHE")
+    if not path:
+        return None
+    if _default_cache is None or _default_cache.path != path:
+        _default_cache = TopicCache(path)
+    return _default_cache
@@ -1,19 +1,65 @@
 # Placeholder for future agent implementations
+import asyncio
 from datetime import datetime
 from textwrap import dedent
 from pathlib import Path
 import json
-from typing import Dict, Any
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from agno.tools.exa import ExaTools
+from co_researchers.context import report_stage
+from co_researchers.ratelimit import RateLimiter
+from co_researchers.routing import RoutedAgent, routed_agent
+from co_researchers.streaming import GenerationAborted, StopGuard, stream_response
+from .candidates import MAX_SCORE, score_candidate
+from .chunking import ChunkedCode, reassemble, split_code
+from .codeblocks import extract_code
+from .components import Component, ComponentCache, find_components
+from .convergence import ConvergenceMonitor
+from .smoke import SmokeResult, SmokeRunner
+
+# (temperature, prompt suffix) per candidate; candidate i uses entry i modulo the list length
+CANDIDATE_VARIANTS: List[Tuple[Optional[float], str]] = [
+    (None, ""),
+    (0.2, "\nPrefer a direct, conservative translation that only uses mlx.core and mlx.nn APIs you are sure exist."),
+    (0.7, "\nFavour Apple Silicon performance: fused mx.fast kernels, fewer intermediate arrays, mx.compile."),
+    (1.0, "\nWrite each component as a self-contained nn.Module with explicit input and output shapes."),
+]
 
 class MLXCodeGenerator:
-    def __init__(self, model_repo_path: str):
-        """Initialize the code generator with path to local model repo"""
+    def __init__(self, model_repo_path: str, stream: bool = False, console=None,
+                 guard: Optional[StopGuard] = None, output_path: str = "mlx_output",
+                 smoke_runner: Optional[SmokeRunner] = None, smoke_test: bool = True, candidates: int = 1,
+                 component_cache: Optional[ComponentCache] = None, refine_chunk_chars: int = 3000):
+        """Initialize the code generator with path to local model repo
+
+        Args:
+            model_repo_path: Local path of the model repo to convert
+            stream: Stream responses, rendering them live when a rich console is given
+            console: rich Console for live rendering of streamed responses
+            guard: Stops runaway generations early when streaming
+            output_path: Directory for iterations, analysis and generated code
+            smoke_runner: Runs generated code against the NumPy MLX shim
+            smoke_test: Smoke-test each code version and feed failures into the next refinement
+            candidates: Code versions generated concurrently per step; the best-scoring one is kept
+            component_cache: Analyze, plan and generate code per weight component, reusing the cached
+                work of any component with the same fingerprint (e.g. a T5 encoder shared by several repos)
+            refine_chunk_chars: Code longer than this is refined in chunks of whole classes and functions,
+                one concurrent call per chunk
+        """
         self.model_repo_path = Path(model_repo_path)
-        self.output_path = Path("mlx_output")
-        self.output_path.mkdir(exist_ok=True)
+        self.stream = stream
+        self.console = console
+        self.guard = guard or StopGuard(max_chars=40000)
+        self.stream_metrics: Dict[str, Dict[str, Any]] = {}
+        self.smoke_runner = (smoke_runner or SmokeRunner()) if smoke_test else None
+        self.candidates = max(1, candidates)
+        self.rate_limiter = RateLimiter(rate=4)
+        self._variants: Dict[Tuple[str, Optional[float]], RoutedAgent] = {}
+        self.component_cache = component_cache
+        self.components: List[Component] = []
+        self.refine_chunk_chars = refine_chunk_chars
+        self.output_path = Path(output_path)
+        self.output_path.mkdir(parents=True, exist_ok=True)
         
         # Create output directories
         (self.output_path / "code").mkdir(exist_ok=True)
@@ -23,7 +69,7 @@ class MLXCodeGenerator:
         self.agents = self._create_specialized_agents()
         self.iteration = self._load_latest_iteration()
 
-    def _create_specialized_agents(self) -> Dict[str, Agent]:
+    def _create_specialized_agents(self) -> Dict[str, RoutedAgent]:
         """Create specialized agents for different aspects of code generation"""
         
         architecture_analyzer = create_base_agent(
@@ -53,7 +99,8 @@ class MLXCodeGenerator:
             name="Code Generator",
             system_prompt="""Generate MLX implementation code.
             Focus on:
-            - Weight loading and conversion utilities
+            - Weight loading with `model.load_weights(...)`: key names and layouts are converted
+              beforehand by `mlx_t2v_researcher.remap` rules, not by per-module load_state_dict calls
             - Model architecture implementation in MLX
             - Efficient tensor operations
             - Proper handling of T5 encoder integration
@@ -90,6 +137,9 @@ class MLXCodeGenerator:
     async def save_iteration(self, results: Dict[str, Any]):
         """Save the current iteration results"""
         self.iteration += 1
+        if self.stream_metrics:
+            results = {**results, "stream_metrics": dict(self.stream_metrics)}
+            self.stream_metrics.clear()
         
         # Save iteration data
         iteration_file = self.output_path / "iterations" / f"iteration_{self.iteration}.json"
@@ -105,21 +155,113 @@ class MLXCodeGenerator:
             with open(code_file, 'w') as f:
                 f.write(results["code"])
 
+    async def _run(self, agent_name: str, prompt: str) -> str:
+        """Run one of the specialized agents and return its text
+
+        Raises GenerationAborted if the stream guard cuts the response off, so partial output is
+        never saved, cached or passed to the next stage.
+        """
+        agent = self.agents[agent_name]
+        await self.rate_limiter.wait()
+        if not self.stream:
+            response = await agent.arun(prompt)
+            return response.content if hasattr(response, 'content') else str(response)
+
+        title = agent_name.replace("_", " ").capitalize()
+        result = await stream_response(agent, prompt, guard=self.guard, console=self.console, title=title)
+        self.stream_metrics[agent_name] = result.metrics.to_dict()
+        return result.complete()
+
+    def _variant(self, agent_name: str, temperature: Optional[float]) -> RoutedAgent:
+        if temperature is None:
+            return self.agents[agent_name]
+        key = (agent_name, temperature)
+        if key not in self._variants:
+            self._variants[key] = self.agents[agent_name].variant(temperature=temperature)
+        return self._variants[key]
+
+    async def _candidate(self, agent_name: str, prompt: str, temperature: Optional[float]) -> Tuple[str, Optional[str]]:
+        agent = self._variant(agent_name, temperature)
+        await self.rate_limiter.wait()
+        response = await agent.arun(prompt)
+        return (response.content if hasattr(response, 'content') else str(response)), agent.last_model
+
+    async def _best_code(self, agent_name: str, prompt: str
+                         ) -> Tuple[str, Optional[SmokeResult], Optional[List[Dict[str, Any]]]]:
+        """Generate `self.candidates` code versions concurrently and keep the best-scoring one
+
+        Candidates differ in temperature and prompt wording (`CANDIDATE_VARIANTS`) and are
+        not streamed. Returns the code, its smoke result (if run) and every candidate's score.
+        """
+        if self.candidates == 1:
+            return await self._run(agent_name, prompt), None, None
+
+        variants = [CANDIDATE_VARIANTS[i % len(CANDIDATE_VARIANTS)] for i in range(self.candidates)]
+        outcomes = await asyncio.gather(
+            *(self._candidate(agent_name, prompt + suffix, temperature) for temperature, suffix in variants),
+            return_exceptions=True,
+        )
+        generated = [(variant, outcome) for variant, outcome in zip(variants, outcomes)
+                     if not isinstance(outcome, BaseException)]
+        if not generated:
+            raise outcomes[0]
+
+        codes = [code for _, (code, _) in generated]
+        smokes: List[Optional[SmokeResult]] = [None] * len(codes)
+        if self.smoke_runner is not None:
+            smokes = await self.smoke_runner.run_many(codes)
+        scores = [score_candidate(code, smoke.to_dict() if smoke else None) for code, smoke in zip(codes, smokes)]
+        agent = self.agents[agent_name]
+        for (_, (_, model)), score in zip(generated, scores):
+            agent.record_quality(score.total / MAX_SCORE, model)
+
+        best = max(range(len(codes)), key=lambda i: scores[i].total)
+        summary = [
+            {**score.to_dict(), "temperature": temperature, "model": model, "selected": i == best}
+            for i, (((temperature, _), (_, model)), score) in enumerate(zip(generated, scores))
+        ]
+        failed = len(outcomes) - len(generated)
+        report_stage("candidates", {"scores": summary, "failed": failed})
+        if self.console is not None:
+            totals = ", ".join(f"{s.total:.0f}" for s in scores)
+            self.console.print(f"[dim]Candidates scored {totals}; kept #{best + 1}"
+                               + (f", {failed} failed" if failed else "") + "[/dim]")
+        return codes[best], smokes[best], summary
+
+    async def smoke_test(self, code: str, result: Optional[SmokeResult] = None) -> Optional[Dict[str, Any]]:
+        """Run `code` in a sandboxed subprocess against the NumPy MLX shim, unless `result` is already known"""
+        if self.smoke_runner is None:
+            return None
+        if result is None:
+            result = await self.smoke_runner.run(code)
+        if self.console is not None:
+            style = "green" if result.passed else "red"
+            self.console.print(f"[{style}]Smoke test: {result.status} ({result.duration:.1f}s)[/{style}]")
+        smoke = result.to_dict()
+        report_stage("smoke", smoke)
+        return smoke
+
     async def analyze_and_plan(self) -> Dict[str, str]:
         """Analyze model architecture and create conversion plan"""
-        
+        if self.component_cache is not None:
+            self.components = await asyncio.to_thread(find_components, self.model_repo_path)
+            if self.components:
+                return await self._analyze_components()
+
         # Analyze architecture
-        arch_response = await self.agents["architecture_analyzer"].arun(
+        architecture_analysis = await self._run(
+            "architecture_analyzer",
             f"Analyze the model architecture in {self.model_repo_path}. "
             "Focus on components that need to be converted to MLX."
         )
-        architecture_analysis = arch_response.content if hasattr(arch_response, 'content') else str(arch_response)
+        report_stage("architecture_analysis", architecture_analysis)
         
         # Create conversion plan
-        plan_response = await self.agents["mlx_converter"].arun(
+        conversion_plan = await self._run(
+            "mlx_converter",
             f"Create MLX conversion plan based on this analysis: {architecture_analysis[:2000]}"
         )
-        conversion_plan = plan_response.content if hasattr(plan_response, 'content') else str(plan_response)
+        report_stage("conversion_plan", conversion_plan)
         
         results = {
             "architecture_analysis": architecture_analysis,
@@ -128,44 +270,238 @@ class MLXCodeGenerator:
         await self.save_iteration(results)
         return results
 
+    async def _per_component(self, work: Callable[[Component], Awaitable[Any]]) -> List[Any]:
+        """Run `work` for every component, concurrently unless responses are streamed to the console"""
+        if self.stream:
+            return [await work(component) for component in self.components]
+        return list(await asyncio.gather(*(work(component) for component in self.components)))
+
+    async def _analyze_components(self) -> Dict[str, Any]:
+        """Analysis and plan per component, reusing cached ones for known fingerprints"""
+        cache = self.component_cache
+
+        async def analyze(component: Component) -> Dict[str, Any]:
+            analysis, analysis_source = await cache.fetch(component, "analysis", lambda: self._run(
+                "architecture_analyzer",
+                f"Analyze this component of the model in {self.model_repo_path} for conversion to MLX:\n"
+                f"{component.summary()}"
+            ), self.model_repo_path)
+            plan, plan_source = await cache.fetch(component, "plan", lambda: self._run(
+                "mlx_converter",
+                f"Create an MLX conversion plan for component `{component.name}` based on this analysis: "
+                f"{analysis[:2000]}"
+            ), self.model_repo_path)
+            return {**component.to_dict(), "analysis": analysis, "plan": plan,
+                    "sources": {"analysis": analysis_source, "plan": plan_source}}
+
+        entries = await self._per_component(analyze)
+        architecture_analysis = "\n\n".join(f"## {e['name']}\n\n{e.pop('analysis')}" for e in entries)
+        conversion_plan = "\n\n".join(f"## {e['name']}\n\n{e.pop('plan')}" for e in entries)
+        report_stage("components", entries)
+        report_stage("architecture_analysis", architecture_analysis)
+        report_stage("conversion_plan", conversion_plan)
+        results = {
+            "architecture_analysis": architecture_analysis,
+            "conversion_plan": conversion_plan,
+            "components": entries,
+        }
+        await self.save_iteration(results)
+        return results
+
+    async def _generate_component_code(self, analysis: Dict[str, Any]
+                                       ) -> Tuple[str, Dict[str, List[Dict[str, Any]]]]:
+        """Code per component, cached by fingerprint, joined into one implementation"""
+        cache = self.component_cache
+        candidates: Dict[str, List[Dict[str, Any]]] = {}
+        smoke_results: Dict[str, SmokeResult] = {}
+
+        async def generate(component: Component) -> str:
+            code, smoke_result, summary = await self._best_code(
+                "code_generator",
+                f"Generate the MLX implementation of component `{component.name}` based on:\n"
+                f"Architecture: {(cache.get(component.fingerprint, 'analysis') or '')[:1000]}\n"
+                f"Plan: {(cache.get(component.fingerprint, 'plan') or '')[:1000]}\n"
+                "Name its top-level classes after the component: its code is combined into one module "
+                "with the other components' code."
+            )
+            if summary is not None:
+                candidates[component.name] = summary
+            if smoke_result is not None:
+                smoke_results[component.name] = smoke_result
+            return code
+
+        async def code_for(component: Component) -> str:
+            async def passes(code: str) -> bool:
+                # Code that was never smoke-tested, or failed, would be reused by every later repo
+                if self.smoke_runner is None:
+                    return False
+                result = smoke_results.get(component.name) or await self.smoke_runner.run(code)
+                return result.passed
+
+            code, source = await cache.fetch(component, "code", lambda: generate(component), self.model_repo_path,
+                                             validate=passes)
+            entry = next((e for e in analysis["components"] if e["fingerprint"] == component.fingerprint), None)
+            if entry is not None:
+                entry["sources"]["code"] = source
+            return f"## {component.name}\n\n{code}"
+
+        codes = await self._per_component(code_for)
+        return "\n\n".join(codes), candidates
+
     async def generate_initial_code(self, analysis: Dict[str, str]) -> Dict[str, str]:
         """Generate initial MLX implementation code"""
-        
-        code_response = await self.agents["code_generator"].arun(
-            f"Generate initial MLX implementation based on:\n"
-            f"Architecture: {analysis['architecture_analysis'][:1000]}\n"
-            f"Plan: {analysis['conversion_plan'][:1000]}"
-        )
-        code = code_response.content if hasattr(code_response, 'content') else str(code_response)
+        if self.components and analysis.get("components"):
+            # The combined code is smoke-tested as a whole below
+            code, candidates = await self._generate_component_code(analysis)
+            smoke_result, candidates = None, candidates or None
+        else:
+            code, smoke_result, candidates = await self._best_code(
+                "code_generator",
+                f"Generate initial MLX implementation based on:\n"
+                f"Architecture: {analysis['architecture_analysis'][:1000]}\n"
+                f"Plan: {analysis['conversion_plan'][:1000]}"
+            )
+        report_stage("code", code)
         
         results = {
             "code": code,
             "previous_analysis": analysis
         }
+        if candidates is not None:
+            results["candidates"] = candidates
+        if "components" in analysis:
+            results["components"] = analysis["components"]
+        smoke = await self.smoke_test(code, smoke_result)
+        if smoke is not None:
+            results["smoke"] = smoke
         await self.save_iteration(results)
         return results
 
+    async def _refine_chunks(self, chunked: ChunkedCode, fix: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """Refine each chunk of a large implementation concurrently and reassemble the module"""
+        chunks = chunked.chunks
+
+        async def refine(chunk) -> str:
+            return await self._run(
+                "code_refiner",
+                f"Refine part {chunk.index + 1} of {len(chunks)} of a larger MLX implementation.\n"
+                "The rest of the module is summarized below (imports and signatures); do not repeat it:\n"
+                f"```python\n{chunked.context(chunk)}\n```\n"
+                f"Part to refine:\n```python\n{chunk.source}```\n"
+                "Focus on improving performance and handling edge cases. Return the refined part as one "
+                "python code block, keeping every class and function it defines under the same name." + fix
+            )
+
+        if self.stream:
+            responses = []
+            for chunk in chunks:
+                try:
+                    responses.append(await refine(chunk))
+                except Exception as e:
+                    responses.append(e)
+        else:
+            responses = await asyncio.gather(*(refine(chunk) for chunk in chunks), return_exceptions=True)
+        if all(isinstance(r, BaseException) for r in responses):
+            raise responses[0]
+        source, report = reassemble(chunked, responses)
+        report_stage("refined_chunks", report)
+        if self.console is not None:
+            refined = sum(entry["status"] == "refined" for entry in report)
+            self.console.print(f"[dim]Refined {refined} of {len(report)} chunks[/dim]")
+        return f"```python\n{source}```\n", report
+
     async def refine_code(self, previous_results: Dict[str, str]) -> Dict[str, str]:
-        """Refine and improve existing code"""
-        
-        refine_response = await self.agents["code_refiner"].arun(
-            f"Refine this MLX implementation:\n{previous_results['code'][:3000]}\n"
-            "Focus on improving performance and handling edge cases."
-        )
-        refined_code = refine_response.content if hasattr(refine_response, 'content') else str(refine_response)
+        """Refine and improve existing code
+
+        Code longer than `refine_chunk_chars` is split along classes and top-level functions and
+        the chunks are refined concurrently, so nothing past the limit is dropped.
+        """
+        fix = ""
+        smoke = previous_results.get("smoke")
+        if smoke is not None and not smoke["passed"]:
+            fix = (
+                "\nThe code failed a CPU smoke test against the MLX API (small synthetic inputs). "
+                f"Fix these errors first:\n{smoke['feedback'][:2000]}"
+            )
+        chunks = None
+        # Measured without the markdown around the code blocks
+        code = extract_code(previous_results["code"])
+        if len(code) > self.refine_chunk_chars:
+            chunked = split_code(code, self.refine_chunk_chars)
+            if chunked.chunks:
+                refined_code, chunks = await self._refine_chunks(chunked, fix)
+                smoke_result, candidates = None, None
+        if chunks is None:
+            # Small enough, or nothing to split along: the whole implementation in one call
+            prompt = (
+                f"Refine this MLX implementation:\n{previous_results['code']}\n"
+                "Focus on improving performance and handling edge cases." + fix
+            )
+            refined_code, smoke_result, candidates = await self._best_code("code_refiner", prompt)
+        report_stage("refined_code", refined_code)
         
         results = {
             "code": refined_code,
             "previous_code": previous_results["code"],
             "refinement_notes": "Code refined for performance and edge cases"
         }
+        if candidates is not None:
+            results["candidates"] = candidates
+        if chunks is not None:
+            results["chunks"] = chunks
+        smoke = await self.smoke_test(refined_code, smoke_result)
+        if smoke is not None:
+            results["smoke"] = smoke
+            if smoke["passed"] and self.component_cache is not None and len(self.components) == 1:
+                # The module is the one component's code, so the passing refinement replaces the cached version
+                component = self.components[0]
+                self.component_cache.put(component.fingerprint, "code", refined_code, component.name,
+                                         self.model_repo_path)
         await self.save_iteration(results)
         return results
 
-def create_base_agent(name: str, system_prompt: str) -> Agent:
+    async def refine_until_converged(self, previous_results: Dict[str, str], max_refinements: int = 5,
+                                     monitor: Optional[ConvergenceMonitor] = None) -> Dict[str, Any]:
+        """Refine repeatedly until the code stops changing meaningfully or `max_refinements` is reached"""
+        monitor = monitor or ConvergenceMonitor()
+        monitor.observe(previous_results["code"])
+        results = previous_results
+        aborted = None
+        for _ in range(max_refinements):
+            try:
+                results = await self.refine_code(results)
+            except GenerationAborted as e:
+                # Keep the last complete version rather than refine a cut-off one
+                aborted = str(e)
+                if self.console is not None:
+                    self.console.print(f"[yellow]Stopped refining: {aborted}[/yellow]")
+                break
+            diff = monitor.observe(results["code"])
+            if self.console is not None and diff is not None:
+                self.console.print(
+                    f"[dim]Refinement changed {diff.change:.1%} of the code "
+                    f"({len(diff.changed_symbols)} symbols)[/dim]"
+                )
+            # Converged code that still fails the smoke test gets another round with the failures in the prompt
+            if monitor.converged and results.get("smoke", {}).get("passed", True):
+                break
+        convergence = monitor.report(max_refinements)
+        if aborted is not None:
+            convergence["aborted"] = aborted
+        if self.console is not None and monitor.converged:
+            self.console.print(
+                f"[green]Converged after {convergence['refinements']} refinements: {monitor.reason}; "
+                f"{convergence['llm_calls_saved']} LLM calls saved[/green]"
+            )
+        return {**results, "convergence": convergence}
+
+def create_base_agent(name: str, system_prompt: str, tier: str = "standard",
+                      latency_target: float = 90) -> RoutedAgent:
     """Helper function to create agents with consistent configuration"""
-    return Agent(
-        model=OpenAIChat(id="gpt-4o-mini-2024-07-18"),
+    return routed_agent(
+        stage="mlx_t2v_researcher." + name.lower().replace(" ", "_"),
+        tier=tier,
+        latency_target=latency_target,
         description=dedent(f"""
         You are {name}, an expert AI agent specializing in MLX model conversion.
         {system_prompt}
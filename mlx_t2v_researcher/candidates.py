@@ -0,0 +1,169 @@
+"""Cheap local scoring of generated MLX code, used to pick the best of several candidates.
+
+A candidate is scored without running it: does its code parse, do the
+`mlx.core`/`mlx.nn` names it uses exist, how many `nn.Module`s does it
+define, and is it a plausible size. The known API surface is read from the
+NumPy shim's source (`shim/mlx/*.py`) with `ast`, so it always matches what
+the smoke test can execute. A smoke-test result, when available, is folded
+into the score as the strongest signal.
+"""
+import ast
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .codeblocks import extract_code, parse_partial
+
+SHIM_MLX = Path(__file__).parent / "shim" / "mlx"
+MAX_SCORE = 130.0
+
+
+def _public_names(tree: ast.Module) -> Set[str]:
+    """Module-level names of a shim module, with `ns.attr` entries for its namespaces"""
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+    names: Set[str] = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        names.add(name.id)
+            call = node.value
+            if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name) and isinstance(call, ast.Call) \
+                    and isinstance(call.func, ast.Name):
+                prefix = node.targets[0].id
+                names.update(f"{prefix}.{kw.arg}" for kw in call.keywords if kw.arg)
+                cls = classes.get(call.func.id)
+                if cls is not None:
+                    names.update(f"{prefix}.{item.name}" for item in cls.body
+                                 if isinstance(item, ast.FunctionDef) and not item.name.startswith("_"))
+    return {name for name in names if not name.split(".")[0].startswith("_")}
+
+
+@lru_cache(maxsize=1)
+def api_surface() -> Dict[str, Set[str]]:
+    """Names the shim provides for each MLX module"""
+    surface = {}
+    for module in ("core", "nn", "utils"):
+        tree = ast.parse((SHIM_MLX / f"{module}.py").read_text())
+        surface[f"mlx.{module}"] = _public_names(tree)
+    surface["mlx"] = {"core", "nn", "utils", "optimizers"}
+    return surface
+
+
+def _aliases(tree: ast.Module) -> Dict[str, str]:
+    """Local name to MLX module path, from the candidate's imports"""
+    aliases = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split(".")[0].lower() == "mlx":
+                    aliases[alias.asname or alias.name.split(".")[0]] = alias.name if alias.asname else \
+                        alias.name.split(".")[0]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.module.split(".")[0].lower() == "mlx":
+            for alias in node.names:
+                aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+    return aliases
+
+
+def _dotted(node: ast.AST) -> Optional[List[str]]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return parts[::-1]
+
+
+def _known(path: str, surface: Dict[str, Set[str]]) -> Optional[bool]:
+    """Whether an MLX dotted path exists; None for paths the shim does not describe (e.g. mlx.optimizers)"""
+    parts = path.split(".")
+    if parts[0] != "mlx":
+        return False  # `MLX`, `Mlx`: not the package
+    if len(parts) == 1:
+        return True
+    if parts[1] not in surface["mlx"]:
+        return False
+    module = f"mlx.{parts[1]}"
+    if module not in surface:
+        return None
+    rest = parts[2:]
+    if not rest:
+        return True
+    if rest[0] not in surface[module]:
+        return False
+    namespaces = {name.split(".")[0] for name in surface[module] if "." in name}
+    # Inside a namespace (mx.random.normal) the member must exist; attributes of classes are not checked
+    return len(rest) == 1 or rest[0] not in namespaces or ".".join(rest[:2]) in surface[module]
+
+
+@dataclass
+class CandidateScore:
+    parses: bool
+    partial_parse: bool
+    api_uses: int
+    unknown_api: List[str] = field(default_factory=list)
+    modules: int = 0
+    chars: int = 0
+    smoke: Optional[Dict[str, Any]] = None
+    total: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in asdict(self).items() if k != "smoke"} | {
+            "smoke": self.smoke["status"] if self.smoke else None}
+
+
+def score_candidate(response: str, smoke: Optional[Dict[str, Any]] = None) -> CandidateScore:
+    """Score a generated response by its code; `smoke` is its smoke-test result, if one was run"""
+    code = extract_code(response)
+    surface = api_surface()
+    try:
+        tree = ast.parse(code)
+        parses = True
+    except SyntaxError:
+        tree = parse_partial(code)
+        parses = False
+    score = CandidateScore(parses=parses, partial_parse=tree is not None, api_uses=0, chars=len(code), smoke=smoke)
+    if tree is not None:
+        aliases = _aliases(tree)
+        unknown = set()
+        for path in aliases.values():
+            if _known(path, surface) is False:
+                unknown.add(path)
+        inner = {id(node.value) for node in ast.walk(tree) if isinstance(node, ast.Attribute)}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Attribute) and id(node) not in inner:
+                parts = _dotted(node)
+                if not parts or parts[0] not in aliases:
+                    continue
+                path = ".".join([aliases[parts[0]]] + parts[1:])
+                score.api_uses += 1
+                if _known(path, surface) is False:
+                    unknown.add(path)
+            elif isinstance(node, ast.ClassDef):
+                bases = [".".join(_dotted(base) or []) for base in node.bases]
+                if any(base.endswith("Module") for base in bases):
+                    score.modules += 1
+        score.unknown_api = sorted(unknown)
+
+    total = 40.0 if parses else 15.0 if score.partial_parse else 0.0
+    if score.api_uses:
+        total += 30.0 * (1 - min(len(score.unknown_api), score.api_uses) / score.api_uses)
+    total -= 5.0 * len(score.unknown_api)
+    total += 10.0 * min(score.modules, 4) / 4
+    # Very short answers are usually prose or stubs; very long ones tend to be truncated
+    total += 10.0 if 1500 <= score.chars <= 30000 else 10.0 * min(score.chars, 1500) / 1500 if score.chars < 1500 \
+        else 5.0
+    if smoke is not None:
+        checked = [m for m in smoke.get("modules", []) if m["status"] != "skipped"]
+        if smoke["status"] == "pass" and checked:
+            total += 40.0
+        elif smoke.get("error") is None and checked:
+            total += 40.0 * sum(m["status"] == "pass" for m in checked) / len(checked)
+    score.total = round(total, 2)
+    return score
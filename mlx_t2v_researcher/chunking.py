@@ -0,0 +1,241 @@
+"""Splitting generated modules along top-level definitions, so large ones can be refined in parallel.
+
+`split_code` cuts a module into chunks of whole classes and top-level
+functions, packed up to about `max_chars` each. A single definition larger
+than that is a chunk of its own. Imports and other module-level statements
+are not refined. Each chunk is sent with a shared context instead: the
+module's imports, its short module-level assignments and the signature of
+every definition outside the chunk. That way a chunk can use code it cannot
+see.
+
+`reassemble` puts refined chunks back in their original order. A refined
+chunk is kept only if it parses and still defines every name and class
+method its original defined; otherwise the original is used. Imports a refined chunk adds are
+merged into the module's import block. Modules that do not parse are split
+at unindented lines after a blank line instead, and names are found with a
+regex.
+"""
+import ast
+import copy
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .codeblocks import extract_code
+
+_DEFINITION = re.compile(r"^(?:[#@].*\n)*(?:async\s+def|def|class)\s+(\w+)", re.MULTILINE)
+_IMPORT = re.compile(r"^(?:import|from)\s+\S")
+_BOUNDARY = re.compile(r"\n\s*\n(?=\S)")
+MAX_CONTEXT_STATEMENT = 200
+
+
+@dataclass
+class Segment:
+    source: str
+    kind: str  # "import", "definition" or "statement"
+    names: List[str] = field(default_factory=list)
+    node: Optional[ast.AST] = field(default=None, repr=False)
+
+
+@dataclass
+class CodeChunk:
+    index: int
+    segments: List[Segment] = field(repr=False)
+
+    @property
+    def source(self) -> str:
+        return "\n\n\n".join(segment.source for segment in self.segments) + "\n"
+
+    @property
+    def names(self) -> List[str]:
+        return [name for segment in self.segments for name in segment.names]
+
+
+@dataclass
+class ChunkedCode:
+    parts: List[Union[Segment, CodeChunk]]
+    imports: List[str]
+    parsed: bool
+
+    @property
+    def chunks(self) -> List[CodeChunk]:
+        return [part for part in self.parts if isinstance(part, CodeChunk)]
+
+    def context(self, chunk: CodeChunk) -> str:
+        """Imports, short module-level assignments and the signatures of definitions outside `chunk`"""
+        lines = list(self.imports)
+        for part in self.parts:
+            if isinstance(part, Segment) and part.kind == "statement" and len(part.source) <= MAX_CONTEXT_STATEMENT \
+                    and (part.node is None or isinstance(part.node, (ast.Assign, ast.AnnAssign))):
+                lines.append(part.source)
+        for other in self.chunks:
+            if other is not chunk:
+                lines.extend(_signature(segment) for segment in other.segments)
+        return "\n".join(lines)
+
+
+def _methods(node: ast.ClassDef) -> List[str]:
+    return [child.name for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))]
+
+
+def _stub(node: ast.AST) -> ast.AST:
+    stub = copy.copy(node)
+    if isinstance(node, ast.ClassDef):
+        methods = [_stub(child) for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        stub.body = methods or [ast.Expr(ast.Constant(Ellipsis))]
+    else:
+        stub.body = [ast.Expr(ast.Constant(Ellipsis))]
+    return stub
+
+
+def _signature(segment: Segment) -> str:
+    if segment.node is not None:
+        return "\n".join(line for line in ast.unparse(_stub(segment.node)).splitlines() if line.strip())
+    # Unparsed source: the definition's first line
+    lines = [line for line in segment.source.splitlines() if re.match(r"(?:async\s+def|def|class)\s", line)]
+    return lines[0] + " ..." if lines else ""
+
+
+def _parsed_segments(source: str, tree: ast.Module) -> List[Segment]:
+    lines = source.splitlines()
+    segments = []
+    previous_end = 0
+    for node in tree.body:
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+        # Comment lines directly above a statement belong to it
+        while start > previous_end and lines[start - 1].lstrip().startswith("#"):
+            start -= 1
+        previous_end = node.end_lineno
+        text = "\n".join(lines[start:node.end_lineno])
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            segments.append(Segment(text, "import", node=node))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            segments.append(Segment(text, "definition", [node.name], node))
+        else:
+            segments.append(Segment(text, "statement", node=node))
+    return segments
+
+
+def _text_segments(source: str) -> List[Segment]:
+    segments = []
+    for text in _BOUNDARY.split(source.strip("\n")):
+        text = text.rstrip()
+        names = _DEFINITION.findall(text)
+        if all(_IMPORT.match(line) for line in text.splitlines() if line.strip()):
+            segments.append(Segment(text, "import"))
+        elif names and _DEFINITION.match(text):
+            segments.append(Segment(text, "definition", names))
+        else:
+            segments.append(Segment(text, "statement"))
+    return segments
+
+
+def split_code(source: str, max_chars: int = 3000) -> ChunkedCode:
+    """Chunks of consecutive top-level definitions, each about `max_chars` at most"""
+    try:
+        segments, parsed = _parsed_segments(source, ast.parse(source)), True
+    except SyntaxError:
+        segments, parsed = _text_segments(source), False
+
+    parts: List[Union[Segment, CodeChunk]] = []
+    imports: List[str] = []
+    current: Optional[CodeChunk] = None
+    for segment in segments:
+        if segment.kind == "import":
+            imports.append(segment.source)
+            continue
+        if segment.kind == "statement":
+            parts.append(segment)
+            current = None
+            continue
+        if current is None or len(current.source) + len(segment.source) > max_chars:
+            current = CodeChunk(len([p for p in parts if isinstance(p, CodeChunk)]), [])
+            parts.append(current)
+        current.segments.append(segment)
+    return ChunkedCode(parts, imports, parsed)
+
+
+def _defined_names(code: str) -> Optional[Tuple[List[str], Dict[str, List[str]], List[str], str]]:
+    """(top-level names, methods per class, import lines, code without its imports) of a parseable refined chunk"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    segments = _parsed_segments(code, tree)
+    names = [name for segment in segments for name in segment.names]
+    methods = {node.name: _methods(node) for node in tree.body if isinstance(node, ast.ClassDef)}
+    imports = [segment.source for segment in segments if segment.kind == "import"]
+    body = "\n\n\n".join(segment.source for segment in segments if segment.kind != "import")
+    return names, methods, imports, body
+
+
+def _validate(chunk: CodeChunk, response: str, parsed: bool) -> Tuple[Optional[str], List[str], str]:
+    """The refined chunk's code and added imports, or None and why it was rejected"""
+    code = extract_code(response).strip("\n")
+    if not code.strip():
+        return None, [], "empty response"
+    defined = _defined_names(code)
+    if defined is None:
+        if parsed:
+            return None, [], "does not parse"
+        names, methods, imports = _DEFINITION.findall(code), None, []
+        body = code
+    else:
+        names, methods, imports, body = defined
+    missing = [name for name in chunk.names if name not in names]
+    if methods is not None:
+        for segment in chunk.segments:
+            if isinstance(segment.node, ast.ClassDef):
+                kept = methods.get(segment.node.name, [])
+                missing += [f"{segment.node.name}.{name}" for name in _methods(segment.node) if name not in kept]
+    if missing:
+        return None, [], "drops " + ", ".join(missing)
+    return body, imports, ""
+
+
+def reassemble(chunked: ChunkedCode, responses: Sequence[Union[str, BaseException, None]]
+               ) -> Tuple[str, List[Dict[str, Any]]]:
+    """The module with each chunk replaced by its refined response where that is valid
+
+    `responses` holds one refined response per chunk (an exception or None when its call
+    failed). Returns the source and, per chunk, its names, size and whether it was refined.
+    """
+    chunks = chunked.chunks
+    refined: Dict[int, str] = {}
+    imports = list(chunked.imports)
+    report = []
+    for chunk, response in zip(chunks, responses):
+        entry = {"chunk": chunk.index, "names": chunk.names, "chars": len(chunk.source)}
+        if response is None or isinstance(response, BaseException):
+            entry.update(status="failed", reason=repr(response) if response is not None else "no response")
+        else:
+            body, added, reason = _validate(chunk, response, chunked.parsed)
+            if body is None:
+                entry.update(status="kept", reason=reason)
+            else:
+                refined[chunk.index] = body
+                imports.extend(line for line in added if line not in imports)
+                entry.update(status="refined", refined_chars=len(body))
+        report.append(entry)
+
+    def assemble(use: Dict[int, str], imports: List[str]) -> str:
+        # A module docstring stays above the imports
+        head = [p.source for p in chunked.parts[:1] if isinstance(p, Segment) and isinstance(p.node, ast.Expr)
+                and isinstance(p.node.value, ast.Constant) and isinstance(p.node.value.value, str)]
+        future = [line for line in imports if line.startswith("from __future__")]
+        body = [part.source if isinstance(part, Segment) else use.get(part.index, part.source.rstrip("\n"))
+                for part in chunked.parts[len(head):]]
+        blocks = head + ["\n".join(future + [line for line in imports if line not in future])] + body
+        return "\n\n\n".join(block for block in blocks if block.strip()) + "\n"
+
+    source = assemble(refined, imports)
+    if chunked.parsed:
+        try:
+            ast.parse(source)
+        except SyntaxError as e:
+            # Valid chunks can still clash once combined: fall back to the original chunks
+            for entry in report:
+                if entry["status"] == "refined":
+                    entry.update(status="kept", reason=f"combined module does not parse: {e.msg}")
+            source = assemble({}, chunked.imports)
+    return source, report
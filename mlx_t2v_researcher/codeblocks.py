@@ -0,0 +1,42 @@
+"""Helpers for pulling source code out of markdown agent responses."""
+import ast
+import re
+from typing import List, Optional, Sequence
+
+_FENCE = re.compile(r"^(`{3,}|~{3,})[ \t]*([\w+-]*)[^\n]*\n(.*?)^\1[ \t]*$", re.MULTILINE | re.DOTALL)
+
+PYTHON_LANGUAGES = ("python", "py", "python3", "")
+
+
+def extract_code_blocks(text: str, languages: Optional[Sequence[str]] = PYTHON_LANGUAGES) -> List[str]:
+    """Fenced code blocks in `text`, limited to `languages` (None keeps every block)"""
+    blocks = []
+    for match in _FENCE.finditer(text or ""):
+        language = match.group(2).lower()
+        if languages is None or language in languages:
+            blocks.append(match.group(3))
+    return blocks
+
+
+def extract_code(text: str, languages: Optional[Sequence[str]] = PYTHON_LANGUAGES) -> str:
+    """All matching code blocks joined into one source, or the text itself if it has none"""
+    blocks = extract_code_blocks(text, languages)
+    if not blocks:
+        return text or ""
+    return "\n\n".join(block.rstrip() for block in blocks) + "\n"
+
+
+def parse_partial(source: str) -> Optional[ast.Module]:
+    """The module's AST; if it does not parse, the statements of the pieces between triple blank lines that do"""
+    # Generated files are often several blocks that only parse one at a time
+    try:
+        return ast.parse(source)
+    except SyntaxError:
+        pass
+    module = ast.Module(body=[], type_ignores=[])
+    for chunk in source.split("\n\n\n"):
+        try:
+            module.body.extend(ast.parse(chunk).body)
+        except SyntaxError:
+            continue
+    return module if module.body else None
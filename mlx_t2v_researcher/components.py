@@ -0,0 +1,314 @@
+"""Weight-manifest fingerprints for a model repo's components, and a shared cache of per-component LLM work.
+
+A component is one checkpoint in a repo: a single weight file, or the
+shards of one (`model-00001-of-00003.safetensors`, ...). Its fingerprint is
+a hash of the tensor names, shapes and dtypes. These come from the
+safetensors headers, the `.npy` headers or the torch pickle, so no tensor
+data is read. A key prefix shared by every tensor (`text_encoder.`,
+`model.`) is stripped first, so the same encoder still matches when another
+repo packages it differently.
+
+`ComponentCache` keeps each fingerprint's architecture analysis, conversion
+plan and generated code in SQLite. Generators working on different repos,
+whether in one process or in several workers, reuse each other's work. A
+generator that needs a result another generator in the same process is
+still producing waits for it instead of making its own LLM call. Code is
+stored only once it passes validation (the smoke test), and a later passing
+version replaces it; `evict` drops a fingerprint's entries.
+"""
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .remap import specs_fingerprint
+from .weights import DTYPE_TAGS, TORCH_SUFFIXES, read_safetensors_header, read_torch_specs
+
+DEFAULT_COMPONENT_DB = "co_researchers_components.db"
+WEIGHT_SUFFIXES = (".safetensors",) + TORCH_SUFFIXES + (".npz", ".npy")
+STAGES = ("analysis", "plan", "code")
+
+Specs = Dict[str, Tuple[Tuple[int, ...], str]]
+
+_SHARD = re.compile(r"^(.*?)[-_.]\d+-of-\d+$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    fingerprint TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    content TEXT NOT NULL,
+    component TEXT NOT NULL,
+    model_repo TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (fingerprint, stage)
+);
+"""
+
+
+def _npz_specs(path: Path) -> Specs:
+    specs = {}
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.namelist():
+            with archive.open(member) as f:
+                version = np.lib.format.read_magic(f)
+                read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else \
+                    np.lib.format.read_array_header_2_0
+                shape, _, dtype = read_header(f)
+            specs[member[:-4] if member.endswith(".npy") else member] = (tuple(shape), DTYPE_TAGS[dtype.name])
+    return specs
+
+
+def file_specs(path: Union[str, Path]) -> Specs:
+    """Shape and dtype tag of every tensor in one weight file, without reading tensor data"""
+    path = Path(path)
+    if path.suffix == ".safetensors":
+        header, _ = read_safetensors_header(path)
+        header.pop("__metadata__", None)
+        return {name: (tuple(info["shape"]), info["dtype"]) for name, info in header.items()}
+    if path.suffix == ".npy":
+        array = np.load(path, mmap_mode="r")
+        return {path.stem: (tuple(array.shape), DTYPE_TAGS[array.dtype.name])}
+    if path.suffix == ".npz":
+        return _npz_specs(path)
+    if path.suffix in TORCH_SUFFIXES:
+        return read_torch_specs(path)
+    raise ValueError(f"Unsupported weight file: {path}")
+
+
+def strip_common_prefix(specs: Specs) -> Specs:
+    """Drop the dotted key prefix shared by every tensor, e.g. `text_encoder.`"""
+    keys = list(specs)
+    if len(keys) < 2:
+        return specs
+    prefix = os.path.commonprefix(keys)
+    prefix = prefix[:prefix.rfind(".") + 1]
+    return {key[len(prefix):]: spec for key, spec in specs.items()} if prefix else specs
+
+
+@dataclass
+class Component:
+    name: str
+    files: List[str]
+    specs: Specs = field(repr=False)
+    fingerprint: str = ""
+
+    def __post_init__(self):
+        if not self.fingerprint:
+            self.fingerprint = specs_fingerprint(strip_common_prefix(self.specs))
+
+    @property
+    def parameters(self) -> int:
+        return sum(int(np.prod(shape)) for shape, _ in self.specs.values())
+
+    def modules(self) -> Counter:
+        """Tensor count per top-level module, after the shared prefix"""
+        return Counter(key.split(".")[0] for key in strip_common_prefix(self.specs))
+
+    def summary(self, limit: int = 40) -> str:
+        """A manifest of the component for prompts: sizes, dtypes, modules and a sample of tensors"""
+        dtypes = Counter(dtype for _, dtype in self.specs.values())
+        lines = [
+            f"Component `{self.name}` ({', '.join(Path(f).name for f in self.files)}): {len(self.specs)} tensors, "
+            f"{self.parameters / 1e6:.1f}M parameters, dtypes {dict(dtypes)}",
+            "Top-level modules: " + ", ".join(f"{name} ({count})" for name, count in self.modules().most_common(20)),
+            "Tensors:",
+        ]
+        for key, (shape, dtype) in list(strip_common_prefix(self.specs).items())[:limit]:
+            lines.append(f"- {key} {list(shape)} {dtype}")
+        if len(self.specs) > limit:
+            lines.append(f"- ... {len(self.specs) - limit} more")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "files": self.files,
+            "fingerprint": self.fingerprint,
+            "tensors": len(self.specs),
+            "parameters": self.parameters,
+        }
+
+
+def find_components(repo: Union[str, Path], max_depth: int = 2) -> List[Component]:
+    """The components of a model repo (a directory, searched `max_depth` levels down, or one weight file)
+
+    Files that cannot be read without loading them (e.g. legacy torch pickles) are skipped, and
+    a checkpoint saved in two formats (`model.safetensors` and `pytorch_model.bin`) counts once.
+    """
+    repo = Path(repo)
+    if repo.is_file():
+        files = [repo]
+    elif repo.is_dir():
+        files = sorted(p for p in repo.rglob("*") if p.suffix in WEIGHT_SUFFIXES and p.is_file()
+                       and len(p.relative_to(repo).parts) <= max_depth + 1
+                       and not any(part.startswith(".") for part in p.relative_to(repo).parts))
+    else:
+        return []
+
+    groups: Dict[Tuple[Path, str], List[Path]] = {}
+    for file in files:
+        shard = _SHARD.match(file.stem)
+        groups.setdefault((file.parent, shard.group(1) if shard else file.stem), []).append(file)
+
+    components: List[Component] = []
+    seen = set()
+    # safetensors sort first, so a checkpoint kept in several formats is named after its safetensors files
+    for (parent, stem), group in sorted(groups.items(), key=lambda g: (g[1][0].suffix != ".safetensors", g[0])):
+        specs: Specs = {}
+        try:
+            for file in group:
+                specs.update(file_specs(file))
+        except (ValueError, OSError, zipfile.BadZipFile):
+            continue
+        if not specs:
+            continue
+        relative = parent.relative_to(repo) if repo.is_dir() else Path()
+        name = "/".join(relative.parts + (stem,))
+        component = Component(name, [str(f) for f in group], specs)
+        if component.fingerprint not in seen:
+            seen.add(component.fingerprint)
+            components.append(component)
+    return components
+
+
+@dataclass
+class ComponentCacheStats:
+    hits: int = 0
+    shared: int = 0
+    misses: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared + self.misses
+        return {
+            "hits": self.hits,
+            "shared": self.shared,
+            "misses": self.misses,
+            "reuse_rate": (self.hits + self.shared) / lookups if lookups else 0.0,
+        }
+
+
+class ComponentCache:
+    def __init__(self, path: str = DEFAULT_COMPONENT_DB):
+        """
+        Args:
+            path: SQLite file shared by every process using the cache (":memory:" for one process only)
+        """
+        self.path = path
+        self.stats = ComponentCacheStats()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def get(self, fingerprint: str, stage: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM components WHERE fingerprint = ? AND stage = ?",
+                                     (fingerprint, stage)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE components SET hits = hits + 1 WHERE fingerprint = ? AND stage = ?",
+                                   (fingerprint, stage))
+        return row[0] if row else None
+
+    def put(self, fingerprint: str, stage: str, content: str, component: str = "", model_repo: str = ""):
+        """Store a result, replacing any earlier one for the fingerprint and stage"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO components (fingerprint, stage, content, component, model_repo, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (fingerprint, stage) DO UPDATE SET "
+                "content = excluded.content, component = excluded.component, model_repo = excluded.model_repo, "
+                "hits = 0, created_at = excluded.created_at",
+                (fingerprint, stage, content, component, str(model_repo), time.time()))
+
+    def evict(self, fingerprint: str, stage: Optional[str] = None) -> int:
+        """Drop the entries of every fingerprint starting with `fingerprint` (only `stage` when given)
+
+        Returns how many entries were removed.
+        """
+        query, args = "DELETE FROM components WHERE fingerprint LIKE ?", [fingerprint + "%"]
+        if stage is not None:
+            query += " AND stage = ?"
+            args.append(stage)
+        with self._lock:
+            return self._conn.execute(query, args).rowcount
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint, stage, component, model_repo, hits, created_at, length(content) "
+                "FROM components ORDER BY component, fingerprint, stage").fetchall()
+        keys = ("fingerprint", "stage", "component", "model_repo", "hits", "created_at", "chars")
+        return [dict(zip(keys, row)) for row in rows]
+
+    async def fetch(self, component: Component, stage: str, produce: Callable[[], Awaitable[str]],
+                    model_repo: Union[str, Path] = "",
+                    validate: Optional[Callable[[str], Awaitable[bool]]] = None) -> Tuple[str, str]:
+        """The cached result for a component's stage, producing it if nobody has
+
+        A produced result is stored only if `validate` (when given) accepts it; either way it is
+        returned. Returns the content and where it came from: "cache", "shared" (awaited from a
+        concurrent producer in this process) or "generated".
+        """
+        key = (component.fingerprint, stage)
+        cached = self.get(*key)
+        if cached is not None:
+            self.stats.hits += 1
+            return cached, "cache"
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                content = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The producer was cancelled, not us: produce it ourselves
+                return await self.fetch(component, stage, produce, model_repo)
+            self.stats.shared += 1
+            return content, "shared"
+
+        self.stats.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            content = await produce()
+            valid = validate is None or await validate(content)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved: there may be no waiter to see it
+            raise
+        finally:
+            del self._inflight[key]
+        if valid:
+            self.put(component.fingerprint, stage, content, component.name, model_repo)
+        future.set_result(content)
+        return content, "generated"
+
+
+_default_cache: Optional[ComponentCache] = None
+
+
+def default_component_cache() -> Optional[ComponentCache]:
+    """This process's cache at `$CO_RESEARCHERS_COMPONENT_CACHE`, or None when the variable is unset"""
+    global _default_cache
+    path = os.environ.get("CO_RESEARCHERS_COMPONENT_CACHE")
+    if not path:
+        return None
+    if _default_cache is None or _default_cache.path != path:
+        _default_cache = ComponentCache(path)
+    return _default_cache
@@ -0,0 +1,171 @@
+"""Detects when successive refinements of generated code stop making progress.
+
+Each version is compared with the previous one on its code blocks only, so
+rewording the surrounding prose does not count as a change. Sources that
+parse are compared structurally (AST with docstrings, comments and
+formatting removed) and by the set of top-level functions, classes and
+methods that were added, removed or modified; anything else falls back to a
+line diff of the whitespace-normalized text.
+"""
+import ast
+import difflib
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from .codeblocks import extract_code, parse_partial
+
+
+def _strip_docstrings(tree: ast.AST) -> ast.AST:
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            body = node.body
+            if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], "value", None), ast.Constant) \
+                    and isinstance(body[0].value.value, str):
+                node.body = body[1:] or [ast.Pass()]
+    return tree
+
+
+def _symbols(tree: ast.Module) -> Dict[str, str]:
+    """Hash of each top-level function and class, and of each method"""
+    symbols = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            symbols[node.name] = hashlib.sha1(ast.dump(node).encode()).hexdigest()
+            if isinstance(node, ast.ClassDef):
+                for child in node.body:
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        symbols[f"{node.name}.{child.name}"] = hashlib.sha1(ast.dump(child).encode()).hexdigest()
+    return symbols
+
+
+@dataclass
+class CodeVersion:
+    source: str
+    normalized: List[str]
+    symbols: Dict[str, str]
+    structural: bool
+
+    @classmethod
+    def from_response(cls, text: str) -> "CodeVersion":
+        source = extract_code(text)
+        tree = parse_partial(source)
+        if tree is None:
+            lines = [" ".join(line.split()) for line in source.splitlines() if line.strip()]
+            return cls(source, lines, {}, False)
+        tree = _strip_docstrings(tree)
+        return cls(source, ast.unparse(tree).splitlines(), _symbols(tree), True)
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha1("\n".join(self.normalized).encode()).hexdigest()
+
+
+@dataclass
+class CodeDiff:
+    text_change: float
+    structural_change: Optional[float]
+    added: Set[str] = field(default_factory=set)
+    removed: Set[str] = field(default_factory=set)
+    modified: Set[str] = field(default_factory=set)
+
+    @property
+    def change(self) -> float:
+        """Fraction of the code that changed; structural when both versions parse"""
+        return self.structural_change if self.structural_change is not None else self.text_change
+
+    @property
+    def changed_symbols(self) -> Set[str]:
+        return self.added | self.removed | self.modified
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "change": self.change,
+            "text_change": self.text_change,
+            "structural_change": self.structural_change,
+            "added": sorted(self.added),
+            "removed": sorted(self.removed),
+            "modified": sorted(self.modified),
+        }
+
+
+def _line_change(a: List[str], b: List[str]) -> float:
+    if not a and not b:
+        return 0.0
+    return 1.0 - difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def compare(previous: CodeVersion, current: CodeVersion) -> CodeDiff:
+    text_change = _line_change(
+        [" ".join(line.split()) for line in previous.source.splitlines() if line.strip()],
+        [" ".join(line.split()) for line in current.source.splitlines() if line.strip()],
+    )
+    if not (previous.structural and current.structural):
+        return CodeDiff(text_change, None)
+    before, after = previous.symbols, current.symbols
+    return CodeDiff(
+        text_change,
+        _line_change(previous.normalized, current.normalized),
+        added=set(after) - set(before),
+        removed=set(before) - set(after),
+        modified={name for name in set(before) & set(after) if before[name] != after[name]},
+    )
+
+
+class ConvergenceMonitor:
+    """Tracks code versions and says when further refinement is unlikely to pay off"""
+
+    def __init__(self, threshold: float = 0.1, patience: int = 1, max_symbol_changes: int = 2,
+                 oscillation_window: int = 4):
+        """
+        Args:
+            threshold: Changed fraction at or below which a refinement counts as negligible
+            patience: Consecutive negligible refinements needed to stop
+            max_symbol_changes: Changed functions/classes still tolerated by a negligible refinement
+            oscillation_window: How many earlier versions to check for a return to old code
+        """
+        self.threshold = threshold
+        self.patience = patience
+        self.max_symbol_changes = max_symbol_changes
+        self.oscillation_window = oscillation_window
+        self.versions: List[CodeVersion] = []
+        self.diffs: List[CodeDiff] = []
+        self.reason: Optional[str] = None
+        self._quiet = 0
+
+    @property
+    def converged(self) -> bool:
+        return self.reason is not None
+
+    def observe(self, response: str) -> Optional[CodeDiff]:
+        """Add the next version; returns its diff against the previous one and updates `converged`"""
+        version = CodeVersion.from_response(response)
+        previous = self.versions[-1] if self.versions else None
+        earlier = [v.digest for v in self.versions[-self.oscillation_window:-1]]
+        self.versions.append(version)
+        if previous is None:
+            return None
+
+        diff = compare(previous, version)
+        self.diffs.append(diff)
+        negligible = diff.change <= self.threshold and len(diff.changed_symbols) <= self.max_symbol_changes
+        self._quiet = self._quiet + 1 if negligible else 0
+        # Each verdict is about the latest version: a real change after converging clears it
+        self.reason = None
+        if self._quiet >= self.patience:
+            self.reason = f"change {diff.change:.1%} at or below {self.threshold:.1%}"
+        elif version.digest != previous.digest and version.digest in earlier:
+            self.reason = "oscillating between earlier versions"
+        return diff
+
+    def report(self, max_iterations: Optional[int] = None) -> Dict[str, Any]:
+        refinements = len(self.diffs)
+        report = {
+            "converged": self.converged,
+            "reason": self.reason,
+            "refinements": refinements,
+            "diffs": [d.to_dict() for d in self.diffs],
+        }
+        if max_iterations is not None:
+            report["llm_calls_saved"] = max(0, max_iterations - refinements)
+        return report
@@ -1,15 +1,24 @@
-from typing import Dict, Any
-from rich.console import Console
-from dotenv import load_dotenv
-import os
+from typing import Dict, Any, Optional
+from co_researchers.streaming import StopGuard, stream_response
 from .agents import create_base_agent
 
-# Load environment variables
-load_dotenv()
-
 class MLXConverter:
-    def __init__(self):
+    def __init__(self, stream: bool = True, guard: Optional[StopGuard] = None):
+        """
+        Args:
+            stream: Stream responses and render them live in the console
+            guard: Stops runaway generations early when streaming
+        """
+        # Imported here so importing the module stays cheap
+        from dotenv import load_dotenv
+        from rich.console import Console
+
+        # Load environment variables
+        load_dotenv()
         self.console = Console()
+        self.stream = stream
+        self.guard = guard or StopGuard(max_chars=60000)
+        self.stream_metrics: Dict[str, Dict[str, Any]] = {}
         
         # Initialize specialized agents
         self.architecture_analyzer = create_base_agent(
@@ -30,6 +39,24 @@ class MLXConverter:
             Focus on efficient and optimized implementations for Apple Silicon."""
         )
 
+    async def _run(self, agent, prompt: str, title: str) -> str:
+        """Run an agent, streaming into the console when enabled"""
+        if not self.stream:
+            response = await agent.arun(prompt)
+            return response.content if hasattr(response, 'content') else str(response)
+
+        result = await stream_response(agent, prompt, guard=self.guard, console=self.console, title=title)
+        self.stream_metrics[agent.stage] = result.metrics.to_dict()
+        if result.metrics.aborted:
+            self.console.print(f"[yellow]Stopped {title} early: {result.metrics.aborted}[/yellow]")
+        if result.metrics.ttft is not None:
+            self.console.print(
+                f"[dim]first token {result.metrics.ttft:.2f}s, "
+                f"{result.metrics.tokens_per_second:.1f} tokens/s[/dim]"
+            )
+        # A cut-off response would be fed to the next stage as if it were complete
+        return result.complete()
+
     async def plan_conversion(self, model_path: str) -> Dict[str, Any]:
         """Plan and execute the conversion of the model to MLX"""
         try:
@@ -37,29 +64,33 @@ class MLXConverter:
 
             # 1. Analyze model architecture
             self.console.print("\n[cyan]Analyzing model architecture...[/cyan]")
-            arch_response = await self.architecture_analyzer.arun(
-                f"Analyze the architecture of {model_path} for MLX conversion."
+            architecture_analysis = await self._run(
+                self.architecture_analyzer,
+                f"Analyze the architecture of {model_path} for MLX conversion.",
+                "Architecture analysis",
             )
-            architecture_analysis = arch_response.content if hasattr(arch_response, 'content') else str(arch_response)
 
             # 2. Plan MLX conversion
             self.console.print("\n[cyan]Creating MLX conversion plan...[/cyan]")
-            plan_response = await self.mlx_converter.arun(
-                f"Create MLX conversion plan for {model_path}. Analysis: {architecture_analysis[:1000]}"
+            conversion_plan = await self._run(
+                self.mlx_converter,
+                f"Create MLX conversion plan for {model_path}. Analysis: {architecture_analysis[:1000]}",
+                "Conversion plan",
             )
-            conversion_plan = plan_response.content if hasattr(plan_response, 'content') else str(plan_response)
 
             # 3. Generate code conversion strategy
             self.console.print("\n[cyan]Developing code conversion strategy...[/cyan]")
-            code_response = await self.code_converter.arun(
-                f"Create code strategy. Plan: {conversion_plan[:1000]}"
+            code_strategy = await self._run(
+                self.code_converter,
+                f"Create code strategy. Plan: {conversion_plan[:1000]}",
+                "Code strategy",
             )
-            code_strategy = code_response.content if hasattr(code_response, 'content') else str(code_response)
 
             return {
                 "architecture_analysis": architecture_analysis,
                 "conversion_plan": conversion_plan,
-                "code_strategy": code_strategy
+                "code_strategy": code_strategy,
+                "stream_metrics": dict(self.stream_metrics)
             }
         except Exception as e:
             self.console.print(f"[red]Error during conversion planning: {str(e)}[/red]")
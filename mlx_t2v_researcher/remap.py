@@ -0,0 +1,608 @@
+"""Declarative key-remapping and layout-transform rules for converting PyTorch weights to MLX.
+
+A `RuleSet` is an ordered list of `Rule`s; the first rule whose pattern
+matches a source key decides its target name(s) and the ops applied on the
+way. Patterns are regexes (or globs, where `*` matches within one dotted
+component and `**` across components), and targets are replacement
+templates (`\\1`, `\\g<name>`). Ops:
+
+- `transpose(*axes)` and `reshape(*shape)`: views where the layout allows
+- `split(sections, axis)`: one source into several targets (fused QKV)
+- `concat(axis, order)`: several sources into one target
+- `cast(dtype)`: change the stored dtype (bfloat16 is rounded to nearest even)
+
+A rule listing several targets without `split` aliases one source to all of
+them (tied embeddings); a rule with target `None` drops the key. `convert`
+stores such ties, and any targets with byte-identical contents, once and
+lists the copies as `aliases` in the shard index; `weights.Checkpoint` and
+`weights.load_mlx_weights` resolve them to the stored tensor's buffer.
+
+`RuleSet.compile` resolves the rules against a checkpoint's keys and shapes
+once, producing a `ConversionPlan` of per-tensor entries with their output
+shape and dtype. The plan is plain data, saved as JSON and reused for any
+checkpoint with the same keys, shapes and dtypes, and runs in three modes:
+`stream` (one tensor at a time), `convert` (materialized on a thread pool and
+written as safetensors shards) and `verify` (parity against a converted
+checkpoint, see `weights.ParityChecker`). `verify` reads the source through
+views and applies casts chunk by chunk as they are compared. Only
+concatenated targets are materialized, a bounded batch at a time.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .weights import (SAFETENSORS_DTYPES, Checkpoint, LazyTensor, ParityChecker, ParityReport, SafetensorsWriter,
+                      encode_bfloat16)
+
+Shape = Tuple[int, ...]
+
+DTYPE_ALIASES = {
+    "float32": "F32", "float16": "F16", "bfloat16": "BF16", "float64": "F64",
+    "int64": "I64", "int32": "I32", "int16": "I16", "int8": "I8", "uint8": "U8", "bool": "BOOL",
+}
+
+
+def _dtype_tag(dtype: str) -> str:
+    tag = DTYPE_ALIASES.get(dtype, dtype)
+    if tag not in SAFETENSORS_DTYPES:
+        raise ValueError(f"Unknown dtype {dtype!r}")
+    return tag
+
+
+@dataclass(frozen=True)
+class Op:
+    """One layout or dtype transform; `args` holds its parameters as plain JSON values"""
+    name: str
+    args: Tuple[Any, ...] = ()
+
+    def output(self, shape: Shape, dtype: str) -> Tuple[Shape, str]:
+        if self.name == "transpose":
+            if len(self.args) != len(shape):
+                raise ValueError(f"transpose{self.args} does not fit shape {list(shape)}")
+            return tuple(shape[axis] for axis in self.args), dtype
+        if self.name == "reshape":
+            # A zero-strided stand-in reshapes like the real tensor without allocating it
+            return np.broadcast_to(np.empty((), np.bool_), shape).reshape(self.args).shape, dtype
+        if self.name == "slice":
+            axis, start, stop = self.args
+            if stop > shape[axis]:
+                raise ValueError(f"slice {start}:{stop} on axis {axis} exceeds shape {list(shape)}")
+            return shape[:axis] + (stop - start,) + shape[axis + 1:], dtype
+        if self.name == "cast":
+            return shape, self.args[0]
+        raise ValueError(f"Unknown op {self.name}")
+
+    def apply(self, array: np.ndarray, dtype: str) -> Tuple[np.ndarray, str]:
+        if self.name == "transpose":
+            return array.transpose(self.args), dtype
+        if self.name == "reshape":
+            return array.reshape(self.args), dtype
+        if self.name == "slice":
+            axis, start, stop = self.args
+            index = [slice(None)] * array.ndim
+            index[axis] = slice(start, stop)
+            return array[tuple(index)], dtype
+        if self.name == "cast":
+            target = self.args[0]
+            if target == dtype:
+                return array, dtype
+            values = LazyTensor(array, dtype).decode(array)
+            if target == "BF16":
+                return encode_bfloat16(values), target
+            return values.astype(SAFETENSORS_DTYPES[target]), target
+        raise ValueError(f"Unknown op {self.name}")
+
+    @property
+    def copies(self) -> bool:
+        return self.name == "cast"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"op": self.name, "args": list(self.args)}
+
+
+def transpose(*axes: int) -> Op:
+    return Op("transpose", tuple(axes))
+
+
+def reshape(*shape: int) -> Op:
+    return Op("reshape", tuple(shape))
+
+
+def cast(dtype: str) -> Op:
+    return Op("cast", (_dtype_tag(dtype),))
+
+
+@dataclass(frozen=True)
+class Split:
+    """Cut the source into consecutive `sections` along `axis`, one per target (an int splits evenly)"""
+    sections: Union[int, Tuple[int, ...]]
+    axis: int = 0
+
+    def slices(self, length: int, parts: int) -> List[Op]:
+        if isinstance(self.sections, int):
+            if length % self.sections or self.sections != parts:
+                raise ValueError(f"Cannot split length {length} into {self.sections} parts for {parts} targets")
+            sizes = [length // self.sections] * self.sections
+        else:
+            sizes = list(self.sections)
+            if sum(sizes) != length or len(sizes) != parts:
+                raise ValueError(f"Sections {sizes} do not fit length {length} and {parts} targets")
+        bounds = np.cumsum([0] + sizes)
+        return [Op("slice", (self.axis, int(bounds[i]), int(bounds[i + 1]))) for i in range(parts)]
+
+
+@dataclass(frozen=True)
+class Concat:
+    """Join every source mapped to the same target along `axis`, ordered by the `part` group via `order`"""
+    axis: int = 0
+    order: Tuple[str, ...] = ()
+
+
+def split(sections: Union[int, Sequence[int]], axis: int = 0) -> Split:
+    return Split(sections if isinstance(sections, int) else tuple(sections), axis)
+
+
+def concat(axis: int = 0, order: Sequence[str] = ()) -> Concat:
+    return Concat(axis, tuple(order))
+
+
+def _glob_regex(pattern: str) -> str:
+    parts = re.split(r"(\*\*|\*|\?)", pattern)
+    wildcards = {"**": "(.*)", "*": "([^.]*)", "?": "([^.])"}
+    return "".join(wildcards.get(part, re.escape(part)) for part in parts)
+
+
+@dataclass
+class Rule:
+    """Maps matching source keys to target key(s)
+
+    Args:
+        pattern: Regex matched against the whole key (or a glob when `glob=True`)
+        target: Replacement template, a list of templates (split or alias), or None to drop
+        ops: Transforms applied in order; may include one `split(...)` or `concat(...)`
+        ndim: Only match tensors of this rank (e.g. 4 for Conv2d, 5 for Conv3d weights)
+    """
+    pattern: str
+    target: Union[str, Sequence[str], None]
+    ops: Sequence[Union[Op, Split, Concat]] = ()
+    glob: bool = False
+    ndim: Optional[int] = None
+    _regex: Any = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._regex = re.compile(_glob_regex(self.pattern) if self.glob else self.pattern)
+
+    @property
+    def targets(self) -> List[str]:
+        if self.target is None:
+            return []
+        return [self.target] if isinstance(self.target, str) else list(self.target)
+
+    def match(self, key: str, shape: Shape) -> Optional[re.Match]:
+        if self.ndim is not None and len(shape) != self.ndim:
+            return None
+        return self._regex.fullmatch(key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ops = []
+        for op in self.ops:
+            if isinstance(op, Split):
+                ops.append({"op": "split", "args": [op.sections if isinstance(op.sections, int)
+                                                    else list(op.sections), op.axis]})
+            elif isinstance(op, Concat):
+                ops.append({"op": "concat", "args": [op.axis, list(op.order)]})
+            else:
+                ops.append(op.to_dict())
+        return {"pattern": self.pattern, "target": self.target if isinstance(self.target, (str, type(None)))
+                else list(self.target), "ops": ops, "glob": self.glob, "ndim": self.ndim}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rule":
+        builders = {"transpose": transpose, "reshape": reshape, "cast": cast, "split": split, "concat": concat}
+        ops = [builders[op["op"]](*op.get("args", [])) for op in data.get("ops", [])]
+        return cls(data["pattern"], data.get("target"), ops, data.get("glob", False), data.get("ndim"))
+
+
+@dataclass
+class _CastView(LazyTensor):
+    """A view of a source tensor whose casts are applied to each chunk as it is decoded"""
+    stored: str = ""
+    casts: Tuple[str, ...] = ()
+
+    def decode(self, chunk: np.ndarray) -> np.ndarray:
+        dtype = self.stored
+        for target in self.casts:
+            chunk, dtype = cast(target).apply(chunk, dtype)
+        return LazyTensor(chunk, dtype).decode(chunk)
+
+
+@dataclass
+class PlanEntry:
+    """How to produce one target tensor: gather `sources` (concatenated along `concat_axis`), then apply `ops`"""
+    target: str
+    sources: List[str]
+    ops: List[Op]
+    shape: Shape
+    dtype: str
+    concat_axis: Optional[int] = None
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape, dtype=np.int64)) * np.dtype(SAFETENSORS_DTYPES[self.dtype]).itemsize
+
+    @property
+    def zero_copy(self) -> bool:
+        """Whether `view` avoids copying; a reshape of a transposed view may still copy at run time"""
+        return self.concat_axis is None and not any(op.copies for op in self.ops)
+
+    def view(self, checkpoint: Checkpoint) -> Tuple[np.ndarray, str]:
+        """The target tensor as a view of the source where possible, with its dtype tag"""
+        tensors = [checkpoint[source] for source in self.sources]
+        if self.concat_axis is not None:
+            array, dtype = np.concatenate([t.array for t in tensors], axis=self.concat_axis), tensors[0].dtype
+        else:
+            array, dtype = tensors[0].array, tensors[0].dtype
+        for op in self.ops:
+            array, dtype = op.apply(array, dtype)
+        return array, dtype
+
+    def materialize(self, checkpoint: Checkpoint) -> np.ndarray:
+        return np.ascontiguousarray(self.view(checkpoint)[0])
+
+    def expected(self, checkpoint: Checkpoint) -> LazyTensor:
+        """The target for comparison: casts commute with the layout ops, so they are deferred to
+        `decode` and only a concatenation copies"""
+        if self.concat_axis is not None:
+            array, dtype = self.view(checkpoint)
+            return LazyTensor(array, dtype, str(checkpoint.path))
+        source = checkpoint[self.sources[0]]
+        array, casts = source.array, []
+        for op in self.ops:
+            if op.name == "cast":
+                casts.append(op.args[0])
+            else:
+                array, _ = op.apply(array, source.dtype)
+        if not casts:
+            return LazyTensor(array, source.dtype, source.file)
+        return _CastView(array, self.dtype, source.file, source.dtype, tuple(casts))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"target": self.target, "sources": self.sources, "ops": [op.to_dict() for op in self.ops],
+                "shape": list(self.shape), "dtype": self.dtype, "concat_axis": self.concat_axis}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PlanEntry":
+        return cls(data["target"], data["sources"], [Op(op["op"], tuple(op["args"])) for op in data["ops"]],
+                   tuple(data["shape"]), data["dtype"], data.get("concat_axis"))
+
+
+def specs_fingerprint(specs: Dict[str, Tuple[Shape, str]]) -> str:
+    canonical = json.dumps(sorted((k, list(shape), dtype) for k, (shape, dtype) in specs.items()))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class ConversionPlan:
+    entries: List[PlanEntry]
+    dropped: List[str] = field(default_factory=list)
+    unmatched: List[str] = field(default_factory=list)
+    fingerprint: str = ""
+    rules_digest: str = ""
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.nbytes for entry in self.entries)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "targets": len(self.entries),
+            "zero_copy": sum(entry.zero_copy for entry in self.entries),
+            "dropped": len(self.dropped),
+            "unmatched": self.unmatched,
+            "bytes": self.nbytes,
+        }
+
+    def matches(self, checkpoint: Checkpoint) -> bool:
+        return self.fingerprint == specs_fingerprint(checkpoint.specs())
+
+    def stream(self, checkpoint: Checkpoint) -> Iterator[Tuple[str, np.ndarray, str]]:
+        """Yield (target, contiguous array, dtype tag) one tensor at a time"""
+        for entry in self.entries:
+            yield entry.target, entry.materialize(checkpoint), entry.dtype
+
+    def expected(self, checkpoint: Checkpoint, entries: Optional[Sequence[PlanEntry]] = None) -> Checkpoint:
+        """The converted tensors (of `entries`, default all) as lazy views of the source, for verification
+
+        Concatenated targets are built here, so pass them in bounded batches.
+        """
+        entries = self.entries if entries is None else entries
+        return Checkpoint.from_tensors({entry.target: entry.expected(checkpoint) for entry in entries},
+                                       checkpoint.path)
+
+    def verify(self, checkpoint: Checkpoint, converted: Checkpoint, checker: Optional[ParityChecker] = None,
+               max_bytes: int = 1 << 30) -> ParityReport:
+        """Compare a converted checkpoint with what this plan produces from `checkpoint`
+
+        Concatenated targets are materialized in batches of at most `max_bytes` (a larger
+        target alone), each compared before the next is built; every other target is a view.
+        """
+        checker = checker or ParityChecker()
+        start = time.perf_counter()
+        batches: List[List[PlanEntry]] = [[e for e in self.entries if e.concat_axis is None], []]
+        size = 0
+        for entry in (e for e in self.entries if e.concat_axis is not None):
+            if batches[-1] and size + entry.nbytes > max_bytes:
+                batches.append([])
+                size = 0
+            batches[-1].append(entry)
+            size += entry.nbytes
+        report = ParityReport()
+        for batch in filter(None, batches):
+            part = checker.check(self.expected(checkpoint, batch), converted)
+            report.tensors.extend(part.tensors)
+            report.missing_in_target.extend(part.missing_in_target)
+            report.bytes_compared += part.bytes_compared
+        report.unexpected_in_target = sorted(set(converted.keys()) - {entry.target for entry in self.entries})
+        report.duration = time.perf_counter() - start
+        return report
+
+    def convert(self, checkpoint: Checkpoint, output_dir: Union[str, Path], max_workers: Optional[int] = None,
+                max_shard_bytes: int = 5 * 1024 ** 3, prefix: str = "model", dedup: bool = True) -> Dict[str, Any]:
+        """Materialize every target on a thread pool and write safetensors shards in plan order.
+
+        At most `2 * max_workers` tensors are held in memory at once. Several
+        shards get a `<prefix>.safetensors.index.json` weight map.
+
+        With `dedup`, each distinct tensor is stored once and its duplicates become
+        `aliases` in the index (written even for a single shard). Targets built from the
+        same sources by the same ops (tied embeddings) are aliased without being read.
+        The rest are hashed on the worker threads as they are materialized, but only
+        when another target has the same shape and dtype.
+        """
+        start = time.perf_counter()
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        aliases: Dict[str, str] = {}
+        entries, hashed = self.entries, set()
+        if dedup:
+            produced: Dict[Tuple[Any, ...], str] = {}
+            entries = []
+            for entry in self.entries:
+                recipe = (tuple(entry.sources), tuple(entry.ops), entry.concat_axis)
+                if recipe in produced:
+                    aliases[entry.target] = produced[recipe]
+                else:
+                    produced[recipe] = entry.target
+                    entries.append(entry)
+            layouts = Counter((entry.shape, entry.dtype) for entry in entries)
+            hashed = {entry.target for entry in entries if layouts[(entry.shape, entry.dtype)] > 1}
+
+        shards: List[List[PlanEntry]] = [[]]
+        size = 0
+        for entry in entries:
+            if shards[-1] and size + entry.nbytes > max_shard_bytes:
+                shards.append([])
+                size = 0
+            shards[-1].append(entry)
+            size += entry.nbytes
+        names = [f"{prefix}.safetensors"] if len(shards) == 1 else \
+            [f"{prefix}-{i + 1:05d}-of-{len(shards):05d}.safetensors" for i in range(len(shards))]
+
+        def produce(entry: PlanEntry) -> Tuple[np.ndarray, Optional[bytes]]:
+            array = entry.materialize(checkpoint)
+            # hashlib releases the GIL on large buffers, so hashing overlaps like the copies do
+            return array, hashlib.blake2b(array.data, digest_size=32).digest() if entry.target in hashed else None
+
+        seen: Dict[Tuple[Shape, str, bytes], str] = {}
+        weight_map: Dict[str, str] = {}
+        written = 0
+        workers = max_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for name, shard in zip(names, shards):
+                tasks = [lambda e=entry: produce(e) for entry in shard]
+                with SafetensorsWriter(output_dir / name, [(entry.target, entry.dtype, entry.shape) for entry in shard],
+                                       metadata={"format": "mlx"}) as writer:
+                    for entry, (array, digest) in zip(shard, _ordered(pool, tasks, 2 * workers)):
+                        if digest is not None:
+                            key = (entry.shape, entry.dtype, digest)
+                            if key in seen:
+                                aliases[entry.target] = seen[key]
+                                continue
+                            seen[key] = entry.target
+                        writer.write(entry.target, array)
+                        weight_map[entry.target] = name
+                        written += array.nbytes
+        for alias, target in aliases.items():
+            while target in aliases:  # a tie of a tensor that was itself a content duplicate
+                target = aliases[target]
+            aliases[alias] = target
+            weight_map[alias] = weight_map[target]
+
+        if len(shards) > 1 or aliases:
+            index: Dict[str, Any] = {
+                "metadata": {"total_size": written},
+                "weight_map": {entry.target: weight_map[entry.target] for entry in self.entries},
+            }
+            if aliases:
+                index["aliases"] = aliases
+            (output_dir / f"{prefix}.safetensors.index.json").write_text(json.dumps(index, indent=2))
+        return {**self.summary(), "files": names, "written_bytes": written, "aliases": len(aliases),
+                "duration": time.perf_counter() - start}
+
+    def save(self, path: Union[str, Path]):
+        data = {
+            "fingerprint": self.fingerprint,
+            "rules_digest": self.rules_digest,
+            "dropped": self.dropped,
+            "unmatched": self.unmatched,
+            "entries": [entry.to_dict() for entry in self.entries],
+        }
+        Path(path).write_text(json.dumps(data))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ConversionPlan":
+        data = json.loads(Path(path).read_text())
+        return cls([PlanEntry.from_dict(e) for e in data["entries"]], data["dropped"], data["unmatched"],
+                   data["fingerprint"], data["rules_digest"])
+
+
+def _ordered(pool: ThreadPoolExecutor, tasks: List[Callable[[], np.ndarray]], window: int) -> Iterator[np.ndarray]:
+    """Results of `tasks` in order, keeping at most `window` of them running or finished but unconsumed"""
+    futures = [pool.submit(task) for task in tasks[:window]]
+    for index in range(len(tasks)):
+        if index + window < len(tasks):
+            futures.append(pool.submit(tasks[index + window]))
+        yield futures[index].result()
+        futures[index] = None
+
+
+class RuleSet:
+    def __init__(self, rules: Iterable[Rule], passthrough: bool = True, name: str = ""):
+        """
+        Args:
+            rules: Tried in order; the first match wins
+            passthrough: Keep unmatched keys unchanged (otherwise they are reported as unmatched)
+            name: Label used in saved plans and logs
+        """
+        self.rules = list(rules)
+        self.passthrough = passthrough
+        self.name = name
+
+    @property
+    def digest(self) -> str:
+        canonical = json.dumps({"rules": [rule.to_dict() for rule in self.rules], "passthrough": self.passthrough})
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "passthrough": self.passthrough, "rules": [rule.to_dict() for rule in self.rules]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RuleSet":
+        return cls([Rule.from_dict(rule) for rule in data["rules"]], data.get("passthrough", True), data.get("name", ""))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "RuleSet":
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+    def __add__(self, other: "RuleSet") -> "RuleSet":
+        return RuleSet(self.rules + other.rules, self.passthrough and other.passthrough,
+                       "+".join(filter(None, [self.name, other.name])))
+
+    def compile(self, checkpoint: Checkpoint) -> ConversionPlan:
+        """Resolve the rules against every tensor of `checkpoint` into a per-tensor plan"""
+        specs = checkpoint.specs()
+        plan = ConversionPlan([], fingerprint=specs_fingerprint(specs), rules_digest=self.digest)
+        groups: Dict[str, List[Tuple[str, re.Match, Rule]]] = {}
+        for key, (shape, dtype) in specs.items():
+            rule, match = next(((r, m) for r in self.rules for m in [r.match(key, shape)] if m), (None, None))
+            if rule is None:
+                if self.passthrough:
+                    plan.entries.append(PlanEntry(key, [key], [], shape, dtype))
+                else:
+                    plan.unmatched.append(key)
+                continue
+            targets = [match.expand(template) for template in rule.targets]
+            if not targets:
+                plan.dropped.append(key)
+                continue
+            if any(isinstance(op, Concat) for op in rule.ops):
+                groups.setdefault(targets[0], []).append((key, match, rule))
+                continue
+            plan.entries.extend(self._entries(targets, [key], rule, specs))
+
+        for target, members in groups.items():
+            rule = members[0][2]
+            order = next(op.order for op in rule.ops if isinstance(op, Concat))
+            if order:
+                members.sort(key=lambda m: order.index(m[1].group("part")))
+            else:
+                members.sort(key=lambda m: m[0])
+            plan.entries.extend(self._entries([target], [m[0] for m in members], rule, specs))
+        return plan
+
+    @staticmethod
+    def _entries(targets: List[str], sources: List[str], rule: Rule,
+                 specs: Dict[str, Tuple[Shape, str]]) -> List[PlanEntry]:
+        shape, dtype = specs[sources[0]]
+        concat_axis = None
+        if len(sources) > 1:
+            concat_axis = next(op.axis for op in rule.ops if isinstance(op, Concat))
+            shapes = [specs[s][0] for s in sources]
+            shape = shape[:concat_axis] + (sum(s[concat_axis] for s in shapes),) + shape[concat_axis + 1:]
+        ops: List[Op] = []
+        branches: Optional[List[Op]] = None
+        for op in rule.ops:
+            if isinstance(op, Concat):
+                continue
+            if isinstance(op, Split):
+                branches = op.slices(shape[op.axis], len(targets))
+                shape, dtype = branches[0].output(shape, dtype)
+                split_at = len(ops)
+                ops.append(branches[0])
+                continue
+            ops.append(op)
+            shape, dtype = op.output(shape, dtype)
+        if branches is None:
+            # Several targets without a split are aliases of one tensor, e.g. tied embeddings
+            return [PlanEntry(target, sources, list(ops), shape, dtype, concat_axis) for target in targets]
+        return [
+            PlanEntry(target, sources, ops[:split_at] + [branch] + ops[split_at + 1:], shape, dtype, concat_axis)
+            for target, branch in zip(targets, branches)
+        ]
+
+
+def compile_plan(rules: RuleSet, checkpoint: Checkpoint, cache_dir: Optional[Union[str, Path]] = None) -> ConversionPlan:
+    """Compile `rules` for `checkpoint`, reusing a cached plan compiled for identical keys, shapes and dtypes"""
+    if cache_dir is None:
+        return rules.compile(checkpoint)
+    fingerprint = specs_fingerprint(checkpoint.specs())
+    path = Path(cache_dir) / f"plan-{rules.digest[:12]}-{fingerprint[:16]}.json"
+    if path.exists():
+        plan = ConversionPlan.load(path)
+        if plan.fingerprint == fingerprint and plan.rules_digest == rules.digest:
+            return plan
+    plan = rules.compile(checkpoint)
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    plan.save(path)
+    return plan
+
+
+# Rules for the Wan2.1 reference checkpoints. PyTorch convolutions are
+# channels-first (O, I, [D,] H, W) while MLX's are channels-last; named
+# nn.Sequential children (`ffn.0`) become MLX Sequential layers (`ffn.layers.0`).
+_SEQUENTIAL = Rule(r"(.*\.)?(text_embedding|time_embedding|time_projection|ffn)\.(\d+)\.(.*)",
+                   r"\1\2.layers.\3.\4")
+_CONV3D = Rule(r"(.*)\.weight", r"\1.weight", [transpose(0, 2, 3, 4, 1)], ndim=5)
+_CONV2D = Rule(r"(.*)\.weight", r"\1.weight", [transpose(0, 2, 3, 1)], ndim=4)
+
+PRESETS: Dict[str, RuleSet] = {
+    # diffusion_pytorch_model.safetensors: patch embedding is a Conv3d, everything else linear or norm
+    "wan2.1-dit": RuleSet([
+        Rule(r"patch_embedding\.weight", "patch_embedding.weight", [transpose(0, 2, 3, 4, 1)]),
+        _SEQUENTIAL,
+    ], name="wan2.1-dit"),
+    # Wan2.1_VAE.pth: causal Conv3d and Conv2d layers, RMS_norm gammas shaped (C, 1, 1[, 1]),
+    # and a fused 1x1 `to_qkv` conv in the attention blocks
+    "wan2.1-vae": RuleSet([
+        Rule(r"(.*)\.to_qkv\.weight", [r"\1.to_q.weight", r"\1.to_k.weight", r"\1.to_v.weight"],
+             [split(3, axis=0), transpose(0, 2, 3, 1)], ndim=4),
+        Rule(r"(.*)\.to_qkv\.bias", [r"\1.to_q.bias", r"\1.to_k.bias", r"\1.to_v.bias"], [split(3, axis=0)]),
+        Rule(r"(.*)\.gamma", r"\1.weight", [reshape(-1)]),
+        _CONV3D,
+        _CONV2D,
+    ], name="wan2.1-vae"),
+    # models_t5_umt5-xxl-enc-bf16.pth: stored in bfloat16, run in float16 on MLX
+    "wan2.1-t5": RuleSet([
+        Rule(r"(.*)\.(\d+)\.(weight|bias)", r"\1.layers.\2.\3", [cast("float16")]),
+        Rule(r"(.*)", r"\1", [cast("float16")]),
+    ], name="wan2.1-t5"),
+}
@@ -0,0 +1,7 @@
+"""NumPy-backed stand-in for the `mlx` package, used to smoke-test generated code off Apple Silicon.
+
+It covers the commonly used part of `mlx.core`, `mlx.nn` and `mlx.utils`
+with MLX semantics (channels-last convolutions, `nn.Module` as a dict of
+parameters). Anything outside that surface raises AttributeError, as a
+nonexistent MLX API would.
+"""
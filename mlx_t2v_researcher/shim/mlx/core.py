@@ -0,0 +1,543 @@
+"""NumPy implementation of the commonly used `mlx.core` surface."""
+import builtins
+import math
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+
+class ShimUnsupported(NotImplementedError):
+    """Raised by real MLX APIs the shim does not emulate (training, streams, quantization)"""
+
+
+def _unsupported(name: str) -> Callable[..., Any]:
+    def call(*args, **kwargs):
+        raise ShimUnsupported(f"mlx.core.{name} is not emulated by the smoke-test shim")
+    call.__name__ = name
+    return call
+
+
+class array(np.ndarray):
+    """`mx.array`: an ndarray subclass with the MLX-specific methods"""
+
+    def __new__(cls, data: Any, dtype: Any = None):
+        return np.asarray(data, dtype=dtype).view(cls)
+
+    def flatten(self, start_axis: int = 0, end_axis: int = -1):
+        return flatten(self, start_axis, end_axis)
+
+    def square(self):
+        return np.square(self)
+
+    def sqrt(self):
+        return np.sqrt(self)
+
+    def rsqrt(self):
+        return 1.0 / np.sqrt(self)
+
+    def exp(self):
+        return np.exp(self)
+
+    def log(self):
+        return np.log(self)
+
+    def abs(self):
+        return np.abs(self)
+
+    def moveaxis(self, source: int, destination: int):
+        return np.moveaxis(self, source, destination)
+
+    def split(self, indices_or_sections, axis: int = 0):
+        return split(self, indices_or_sections, axis)
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, np.ndarray) and not isinstance(value, array):
+        return value.view(array)
+    if isinstance(value, np.generic):
+        return np.asarray(value).view(array)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_wrap(v) for v in value)
+    return value
+
+
+def _wrapped(fn: Callable[..., Any]) -> Callable[..., Any]:
+    def call(*args, **kwargs):
+        return _wrap(fn(*args, **kwargs))
+    call.__name__ = getattr(fn, "__name__", "function")
+    return call
+
+
+# dtypes; bfloat16 is stored as float32 since NumPy has no bfloat16
+Dtype = np.dtype
+bool_ = np.dtype(np.bool_)
+uint8, uint16, uint32, uint64 = (np.dtype(t) for t in (np.uint8, np.uint16, np.uint32, np.uint64))
+int8, int16, int32, int64 = (np.dtype(t) for t in (np.int8, np.int16, np.int32, np.int64))
+float16, float32, float64 = (np.dtype(t) for t in (np.float16, np.float32, np.float64))
+bfloat16 = float32
+complex64 = np.dtype(np.complex64)
+floating = np.floating
+integer = np.integer
+
+
+class Device:
+    def __init__(self, type: str = "cpu", index: int = 0):
+        self.type = type
+        self.index = index
+
+    def __repr__(self):
+        return f"Device({self.type}, {self.index})"
+
+
+cpu = Device("cpu")
+gpu = Device("gpu")
+_device = gpu
+
+
+def default_device() -> Device:
+    return _device
+
+
+def set_default_device(device: Device):
+    global _device
+    _device = device
+
+
+def eval(*args):
+    """Evaluation is eager in the shim"""
+
+
+def async_eval(*args):
+    """Evaluation is eager in the shim"""
+
+
+def compile(fn: Optional[Callable] = None, **kwargs):
+    return fn if fn is not None else (lambda f: f)
+
+
+def stop_gradient(a):
+    return a
+
+
+zeros = _wrapped(lambda shape, dtype=float32: np.zeros(shape, dtype))
+ones = _wrapped(lambda shape, dtype=float32: np.ones(shape, dtype))
+full = _wrapped(lambda shape, vals, dtype=None: np.full(shape, vals, dtype))
+zeros_like = _wrapped(np.zeros_like)
+ones_like = _wrapped(np.ones_like)
+eye = _wrapped(lambda n, m=None, k=0, dtype=float32: np.eye(n, m, k, dtype))
+identity = _wrapped(lambda n, dtype=float32: np.eye(n, dtype=dtype))
+tri = _wrapped(lambda n, m=None, k=0, dtype=float32: np.tri(n, m, k, dtype))
+tril = _wrapped(np.tril)
+triu = _wrapped(np.triu)
+
+
+def arange(start, stop=None, step=None, dtype=None):
+    if stop is None:
+        start, stop = 0, start
+    return _wrap(np.arange(start, stop, step if step is not None else 1, dtype=dtype))
+
+
+linspace = _wrapped(lambda start, stop, num=50, dtype=float32: np.linspace(start, stop, num, dtype=dtype))
+meshgrid = _wrapped(np.meshgrid)
+
+abs = _wrapped(np.abs)
+negative = _wrapped(np.negative)
+sign = _wrapped(np.sign)
+exp = _wrapped(np.exp)
+expm1 = _wrapped(np.expm1)
+log = _wrapped(np.log)
+log2 = _wrapped(np.log2)
+log10 = _wrapped(np.log10)
+log1p = _wrapped(np.log1p)
+sqrt = _wrapped(np.sqrt)
+rsqrt = _wrapped(lambda a: 1.0 / np.sqrt(a))
+square = _wrapped(np.square)
+reciprocal = _wrapped(np.reciprocal)
+sin = _wrapped(np.sin)
+cos = _wrapped(np.cos)
+tan = _wrapped(np.tan)
+arcsin = _wrapped(np.arcsin)
+arccos = _wrapped(np.arccos)
+arctan = _wrapped(np.arctan)
+arctan2 = _wrapped(np.arctan2)
+sinh = _wrapped(np.sinh)
+cosh = _wrapped(np.cosh)
+tanh = _wrapped(np.tanh)
+floor = _wrapped(np.floor)
+ceil = _wrapped(np.ceil)
+round = _wrapped(np.round)
+isnan = _wrapped(np.isnan)
+isinf = _wrapped(np.isinf)
+isfinite = _wrapped(np.isfinite)
+erf = _wrapped(np.vectorize(math.erf, otypes=[np.float32]))
+erfinv = _unsupported("erfinv")
+sigmoid = _wrapped(lambda a: 1.0 / (1.0 + np.exp(-a)))
+
+add = _wrapped(np.add)
+subtract = _wrapped(np.subtract)
+multiply = _wrapped(np.multiply)
+divide = _wrapped(np.divide)
+floor_divide = _wrapped(np.floor_divide)
+remainder = _wrapped(np.remainder)
+power = _wrapped(np.power)
+maximum = _wrapped(np.maximum)
+minimum = _wrapped(np.minimum)
+equal = _wrapped(np.equal)
+not_equal = _wrapped(np.not_equal)
+greater = _wrapped(np.greater)
+greater_equal = _wrapped(np.greater_equal)
+less = _wrapped(np.less)
+less_equal = _wrapped(np.less_equal)
+logical_and = _wrapped(np.logical_and)
+logical_or = _wrapped(np.logical_or)
+logical_not = _wrapped(np.logical_not)
+where = _wrapped(np.where)
+clip = _wrapped(lambda a, a_min, a_max: np.clip(a, a_min, a_max))
+matmul = _wrapped(np.matmul)
+inner = _wrapped(np.inner)
+outer = _wrapped(np.outer)
+tensordot = _wrapped(np.tensordot)
+einsum = _wrapped(np.einsum)
+addmm = _wrapped(lambda c, a, b, alpha=1.0, beta=1.0: alpha * (a @ b) + beta * c)
+
+
+def _reduction(fn: Callable) -> Callable:
+    def call(a, axis=None, keepdims=False, **kwargs):
+        if isinstance(axis, list):
+            axis = tuple(axis)
+        return _wrap(fn(a, axis=axis, keepdims=keepdims, **kwargs))
+    return call
+
+
+sum = _reduction(np.sum)
+mean = _reduction(np.mean)
+prod = _reduction(np.prod)
+max = _reduction(np.max)
+min = _reduction(np.min)
+all = _reduction(np.all)
+any = _reduction(np.any)
+var = _reduction(np.var)
+std = _reduction(np.std)
+argmax = _reduction(np.argmax)
+argmin = _reduction(np.argmin)
+
+
+def logsumexp(a, axis=None, keepdims=False):
+    peak = np.max(a, axis=axis, keepdims=True)
+    out = np.log(np.sum(np.exp(a - peak), axis=axis, keepdims=True)) + peak
+    return _wrap(out if keepdims else np.squeeze(out, axis=axis))
+
+
+def softmax(a, axis=-1, precise=False):
+    shifted = np.exp(a - np.max(a, axis=axis, keepdims=True))
+    return _wrap(shifted / np.sum(shifted, axis=axis, keepdims=True))
+
+
+cumsum = _wrapped(lambda a, axis=None, reverse=False, inclusive=True: np.cumsum(a, axis=axis))
+cumprod = _wrapped(lambda a, axis=None, reverse=False, inclusive=True: np.cumprod(a, axis=axis))
+sort = _wrapped(lambda a, axis=-1: np.sort(a, axis=axis))
+argsort = _wrapped(lambda a, axis=-1: np.argsort(a, axis=axis))
+
+
+def topk(a, k: int, axis: int = -1):
+    return _wrap(np.take(np.sort(a, axis=axis), np.arange(-k, 0), axis=axis))
+
+
+reshape = _wrapped(lambda a, shape: np.reshape(a, shape))
+transpose = _wrapped(lambda a, axes=None: np.transpose(a, axes))
+swapaxes = _wrapped(np.swapaxes)
+moveaxis = _wrapped(np.moveaxis)
+expand_dims = _wrapped(lambda a, axis: np.expand_dims(a, tuple(axis) if isinstance(axis, list) else axis))
+squeeze = _wrapped(lambda a, axis=None: np.squeeze(a, tuple(axis) if isinstance(axis, list) else axis))
+broadcast_to = _wrapped(np.broadcast_to)
+broadcast_arrays = _wrapped(np.broadcast_arrays)
+concatenate = _wrapped(lambda arrays, axis=0: np.concatenate(arrays, axis=axis))
+concat = concatenate
+stack = _wrapped(lambda arrays, axis=0: np.stack(arrays, axis=axis))
+repeat = _wrapped(lambda a, repeats, axis=None: np.repeat(a, repeats, axis=axis))
+tile = _wrapped(np.tile)
+take = _wrapped(lambda a, indices, axis=None: np.take(a, np.asarray(indices), axis=axis))
+take_along_axis = _wrapped(lambda a, indices, axis=None: np.take_along_axis(a, np.asarray(indices), axis))
+roll = _wrapped(np.roll)
+array_equal = np.array_equal
+allclose = np.allclose
+isclose = _wrapped(np.isclose)
+
+
+def split(a, indices_or_sections, axis: int = 0):
+    return [_wrap(part) for part in np.split(a, indices_or_sections, axis=axis)]
+
+
+def flatten(a, start_axis: int = 0, end_axis: int = -1):
+    a = np.asarray(a)
+    start = start_axis % builtins.max(a.ndim, 1)
+    end = end_axis % builtins.max(a.ndim, 1)
+    return _wrap(a.reshape(a.shape[:start] + (-1,) + a.shape[end + 1:]))
+
+
+def unflatten(a, axis: int, shape: Sequence[int]):
+    a = np.asarray(a)
+    axis = axis % a.ndim
+    return _wrap(a.reshape(a.shape[:axis] + tuple(shape) + a.shape[axis + 1:]))
+
+
+def pad(a, pad_width, mode: str = "constant", constant_values=0):
+    a = np.asarray(a)
+    if isinstance(pad_width, int):
+        pad_width = [(pad_width, pad_width)] * a.ndim
+    elif pad_width and isinstance(pad_width[0], int):
+        pad_width = [tuple(pad_width)] * a.ndim
+    if mode == "constant":
+        return _wrap(np.pad(a, pad_width, mode="constant", constant_values=constant_values))
+    return _wrap(np.pad(a, pad_width, mode=mode))
+
+
+def _conv(x, weight, stride, padding, dilation, groups):
+    """Channels-last N-d convolution; weight is (C_out, *kernel, C_in / groups)"""
+    x = np.asarray(x)
+    weight = np.asarray(weight)
+    spatial = weight.ndim - 2
+    stride, padding, dilation = ([v] * spatial if isinstance(v, int) else list(v) for v in (stride, padding, dilation))
+    x = np.pad(x, [(0, 0)] + [(p, p) for p in padding] + [(0, 0)])
+    kernel = weight.shape[1:-1]
+    span = [(k - 1) * d + 1 for k, d in zip(kernel, dilation)]
+    windows = np.lib.stride_tricks.sliding_window_view(x, span, axis=tuple(range(1, spatial + 1)))
+    windows = windows[(slice(None),) + tuple(slice(None, None, s) for s in stride)]
+    windows = windows[(Ellipsis,) + tuple(slice(None, None, d) for d in dilation)]
+    # windows: (N, *out, C_in, *kernel)
+    c_in = x.shape[-1] // groups
+    c_out = weight.shape[0] // groups
+    outputs = []
+    for g in range(groups):
+        part = np.take(windows, np.arange(g * c_in, (g + 1) * c_in), axis=spatial + 1)
+        w = np.moveaxis(weight[g * c_out:(g + 1) * c_out], -1, 1)  # (C_out, C_in, *kernel)
+        axes = list(range(spatial + 1, 2 * spatial + 2))
+        outputs.append(np.tensordot(part, w, axes=(axes, list(range(1, spatial + 2)))))
+    return _wrap(np.concatenate(outputs, axis=-1))
+
+
+def conv_general(input, weight, stride=1, padding=0, kernel_dilation=1, input_dilation=1, groups=1, flip=False):
+    if flip:
+        weight = np.flip(weight, axis=tuple(range(1, np.ndim(weight) - 1)))
+    if input_dilation != 1:
+        input = _dilate(input, input_dilation)
+    return _conv(input, weight, stride, padding, kernel_dilation, groups)
+
+
+def conv1d(input, weight, stride=1, padding=0, dilation=1, groups=1):
+    return _conv(input, weight, stride, padding, dilation, groups)
+
+
+def conv2d(input, weight, stride=1, padding=0, dilation=1, groups=1):
+    return _conv(input, weight, stride, padding, dilation, groups)
+
+
+def conv3d(input, weight, stride=1, padding=0, dilation=1, groups=1):
+    return _conv(input, weight, stride, padding, dilation, groups)
+
+
+def _dilate(x, factor):
+    x = np.asarray(x)
+    spatial = x.ndim - 2
+    factor = [factor] * spatial if isinstance(factor, int) else list(factor)
+    shape = [x.shape[0]] + [(n - 1) * f + 1 for n, f in zip(x.shape[1:-1], factor)] + [x.shape[-1]]
+    out = np.zeros(shape, x.dtype)
+    out[(slice(None),) + tuple(slice(None, None, f) for f in factor)] = x
+    return out
+
+
+def _conv_transpose(x, weight, stride, padding, dilation, output_padding, groups):
+    weight = np.asarray(weight)
+    spatial = weight.ndim - 2
+    stride, padding, dilation, output_padding = (
+        [v] * spatial if isinstance(v, int) else list(v) for v in (stride, padding, dilation, output_padding)
+    )
+    x = _dilate(x, stride)
+    kernel = weight.shape[1:-1]
+    pads = [((k - 1) * d - p, (k - 1) * d - p + op) for k, d, p, op in zip(kernel, dilation, padding, output_padding)]
+    x = np.pad(x, [(0, 0)] + pads + [(0, 0)])
+    flipped = np.flip(weight, axis=tuple(range(1, spatial + 1)))
+    return _conv(x, flipped, 1, 0, dilation, groups)
+
+
+def conv_transpose1d(input, weight, stride=1, padding=0, dilation=1, output_padding=0, groups=1):
+    return _conv_transpose(input, weight, stride, padding, dilation, output_padding, groups)
+
+
+def conv_transpose2d(input, weight, stride=1, padding=0, dilation=1, output_padding=0, groups=1):
+    return _conv_transpose(input, weight, stride, padding, dilation, output_padding, groups)
+
+
+def conv_transpose3d(input, weight, stride=1, padding=0, dilation=1, output_padding=0, groups=1):
+    return _conv_transpose(input, weight, stride, padding, dilation, output_padding, groups)
+
+
+def load(file: str, format: Optional[str] = None, return_metadata: bool = False) -> Union[array, Dict[str, array]]:
+    path = str(file)
+    if path.endswith(".npy"):
+        return _wrap(np.load(path))
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return {k: _wrap(data[k]) for k in data.files}
+    raise ShimUnsupported(f"mx.load of {path!r} is not emulated by the smoke-test shim")
+
+
+def save(file: str, arr):
+    np.save(file, np.asarray(arr))
+
+
+def savez(file: str, *args, **kwargs):
+    np.savez(file, *args, **kwargs)
+
+
+save_safetensors = _unsupported("save_safetensors")
+save_gguf = _unsupported("save_gguf")
+grad = _unsupported("grad")
+value_and_grad = _unsupported("value_and_grad")
+vjp = _unsupported("vjp")
+jvp = _unsupported("jvp")
+vmap = _unsupported("vmap")
+quantize = _unsupported("quantize")
+dequantize = _unsupported("dequantize")
+quantized_matmul = _unsupported("quantized_matmul")
+new_stream = _unsupported("new_stream")
+stream = _unsupported("stream")
+
+
+class _Namespace:
+    def __init__(self, name: str, **members):
+        self.__name__ = name
+        self.__dict__.update(members)
+
+    def __getattr__(self, name: str):
+        raise AttributeError(f"module '{self.__name__}' has no attribute '{name}'")
+
+
+class _Random(_Namespace):
+    def __init__(self):
+        super().__init__("mlx.core.random")
+        self._rng = np.random.default_rng(0)
+
+    def seed(self, seed: int):
+        self._rng = np.random.default_rng(seed)
+
+    def key(self, seed: int):
+        return array(np.array([0, seed], dtype=np.uint32))
+
+    def split(self, key, num: int = 2):
+        return array(self._rng.integers(0, 2 ** 31, size=(num, 2), dtype=np.uint32))
+
+    def normal(self, shape=(), dtype=float32, loc=0.0, scale=1.0, key=None):
+        return array(self._rng.normal(loc, scale, size=shape).astype(dtype))
+
+    def uniform(self, low=0.0, high=1.0, shape=(), dtype=float32, key=None):
+        return array(self._rng.uniform(low, high, size=shape).astype(dtype))
+
+    def randint(self, low, high, shape=(), dtype=int32, key=None):
+        return array(self._rng.integers(low, high, size=shape).astype(dtype))
+
+    def bernoulli(self, p=0.5, shape=None, key=None):
+        shape = shape if shape is not None else np.shape(p)
+        return array(self._rng.random(size=shape) < p)
+
+    def truncated_normal(self, lower, upper, shape=None, dtype=float32, key=None):
+        return array(np.clip(self._rng.normal(size=shape), lower, upper).astype(dtype))
+
+    def categorical(self, logits, axis=-1, shape=None, num_samples=None, key=None):
+        return array(np.argmax(np.asarray(logits) + self._rng.gumbel(size=np.shape(logits)), axis=axis))
+
+    def permutation(self, x, axis=0, key=None):
+        return array(self._rng.permutation(x))
+
+
+random = _Random()
+
+
+def _scaled_dot_product_attention(q, k, v, *, scale: float, mask=None, **kwargs):
+    q, k, v = (np.asarray(t) for t in (q, k, v))
+    if k.shape[1] != q.shape[1]:  # grouped-query attention
+        repeats = q.shape[1] // k.shape[1]
+        k, v = np.repeat(k, repeats, axis=1), np.repeat(v, repeats, axis=1)
+    scores = (q * scale) @ np.swapaxes(k, -1, -2)
+    if isinstance(mask, str) and mask == "causal":
+        L, S = scores.shape[-2:]
+        mask = np.tril(np.ones((L, S), bool), S - L)
+    if mask is not None:
+        mask = np.asarray(mask)
+        scores = np.where(mask, scores, -np.inf) if mask.dtype == np.bool_ else scores + mask
+    return _wrap(softmax(scores, axis=-1) @ v)
+
+
+def _rms_norm(x, weight, eps: float):
+    x = np.asarray(x)
+    out = x / np.sqrt(np.mean(np.square(x), axis=-1, keepdims=True) + eps)
+    return _wrap(out * weight if weight is not None else out)
+
+
+def _layer_norm(x, weight, bias, eps: float):
+    x = np.asarray(x)
+    out = (x - x.mean(axis=-1, keepdims=True)) / np.sqrt(x.var(axis=-1, keepdims=True) + eps)
+    if weight is not None:
+        out = out * weight
+    if bias is not None:
+        out = out + bias
+    return _wrap(out)
+
+
+def _rope(x, dims: int, *, traditional: bool, base: Optional[float], scale: float, offset: int, freqs=None):
+    x = np.asarray(x)
+    positions = (np.arange(x.shape[-2]) + offset) * scale
+    inv = 1.0 / (base ** (np.arange(0, dims, 2) / dims)) if freqs is None else 1.0 / np.asarray(freqs)
+    theta = positions[:, None] * inv[None, :]
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    rot, rest = x[..., :dims], x[..., dims:]
+    if traditional:
+        x1, x2 = rot[..., 0::2], rot[..., 1::2]
+        out = np.stack([x1 * cos_t - x2 * sin_t, x1 * sin_t + x2 * cos_t], axis=-1).reshape(rot.shape)
+    else:
+        x1, x2 = rot[..., :dims // 2], rot[..., dims // 2:]
+        out = np.concatenate([x1 * cos_t - x2 * sin_t, x1 * sin_t + x2 * cos_t], axis=-1)
+    return _wrap(np.concatenate([out, rest], axis=-1))
+
+
+fast = _Namespace(
+    "mlx.core.fast",
+    scaled_dot_product_attention=_scaled_dot_product_attention,
+    rms_norm=_rms_norm,
+    layer_norm=_layer_norm,
+    rope=_rope,
+    metal_kernel=_unsupported("fast.metal_kernel"),
+)
+
+linalg = _Namespace(
+    "mlx.core.linalg",
+    norm=_wrapped(lambda a, ord=None, axis=None, keepdims=False: np.linalg.norm(a, ord, axis, keepdims)),
+    inv=_wrapped(np.linalg.inv),
+    svd=_wrapped(np.linalg.svd),
+    qr=_wrapped(np.linalg.qr),
+    cholesky=_wrapped(np.linalg.cholesky),
+)
+
+metal = _Namespace(
+    "mlx.core.metal",
+    is_available=lambda: False,
+    device_info=lambda: {},
+    get_active_memory=lambda: 0,
+    get_peak_memory=lambda: 0,
+    get_cache_memory=lambda: 0,
+    set_memory_limit=lambda *args, **kwargs: 0,
+    set_cache_limit=lambda *args, **kwargs: 0,
+    clear_cache=lambda: None,
+)
+
+get_active_memory = metal.get_active_memory
+get_peak_memory = metal.get_peak_memory
+set_memory_limit = metal.set_memory_limit
+set_cache_limit = metal.set_cache_limit
+clear_cache = metal.clear_cache
+
+pi = math.pi
+e = math.e
+inf = math.inf
+nan = math.nan
+newaxis = None
@@ -0,0 +1,678 @@
+"""NumPy implementation of the commonly used `mlx.nn` surface."""
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import core as mx
+from .core import ShimUnsupported, _Namespace, _unsupported
+from .utils import tree_flatten, tree_unflatten
+
+
+def _is_param(value: Any) -> bool:
+    return isinstance(value, (np.ndarray, Module, list, tuple, dict))
+
+
+class Module(dict):
+    """`nn.Module`: a dict of parameters and submodules, also readable as attributes"""
+
+    def __init__(self):
+        super().__init__()
+        object.__setattr__(self, "_training", True)
+        object.__setattr__(self, "_no_grad", set())
+
+    def __getattr__(self, name: str):
+        if name in self:
+            return self[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def __setattr__(self, name: str, value: Any):
+        if _is_param(value):
+            self[name] = value
+            if name in self.__dict__:
+                del self.__dict__[name]
+        else:
+            self.pop(name, None)
+            object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str):
+        if name in self:
+            del self[name]
+        else:
+            object.__delattr__(self, name)
+
+    def __hash__(self):
+        return id(self)
+
+    def __eq__(self, other):
+        return self is other
+
+    @property
+    def training(self) -> bool:
+        return self._training
+
+    @property
+    def state(self) -> "Module":
+        return self
+
+    def train(self, mode: bool = True) -> "Module":
+        for module in self.modules():
+            object.__setattr__(module, "_training", mode)
+        return self
+
+    def eval(self) -> "Module":
+        return self.train(False)
+
+    def _tree(self, leaf: Callable[[Any], bool]) -> Dict[str, Any]:
+        def walk(value):
+            if isinstance(value, Module):
+                return {k: walk(v) for k, v in value.items() if not k.startswith("_")}
+            if isinstance(value, (list, tuple)):
+                return [walk(v) for v in value]
+            if isinstance(value, dict):
+                return {k: walk(v) for k, v in value.items()}
+            return value if leaf(value) else {}
+
+        def empty(value):
+            return isinstance(value, (dict, list)) and not value
+
+        def prune(value):
+            if isinstance(value, dict):
+                pruned = {k: prune(v) for k, v in value.items()}
+                return {k: v for k, v in pruned.items() if not empty(v)}
+            if isinstance(value, list):
+                items = [prune(v) for v in value]
+                return items if not all(empty(item) for item in items) else []
+            return value
+
+        return prune(walk(self))
+
+    def parameters(self) -> Dict[str, Any]:
+        return self._tree(lambda v: isinstance(v, np.ndarray))
+
+    def trainable_parameters(self) -> Dict[str, Any]:
+        return self.parameters()
+
+    def children(self) -> Dict[str, Any]:
+        return self._tree(lambda v: isinstance(v, Module))
+
+    def named_modules(self) -> List[Tuple[str, "Module"]]:
+        found = [("", self)]
+        for key, value in tree_flatten(dict(self), is_leaf=lambda v: isinstance(v, Module)):
+            if isinstance(value, Module):
+                found.extend((f"{key}.{name}".rstrip("."), m) for name, m in value.named_modules())
+        return found
+
+    def modules(self) -> List["Module"]:
+        return [module for _, module in self.named_modules()]
+
+    def leaf_modules(self) -> Dict[str, Any]:
+        return {name: m for name, m in self.named_modules() if not any(isinstance(v, Module) for v in m.values())}
+
+    def update(self, parameters: Dict[str, Any]) -> "Module":
+        def apply(target, values):
+            if isinstance(values, dict):
+                for key, value in values.items():
+                    current = target[key] if isinstance(target, dict) else getattr(target, key)
+                    if isinstance(value, np.ndarray):
+                        target[key] = mx.array(value)
+                    else:
+                        apply(current, value)
+            elif isinstance(values, list):
+                for index, value in enumerate(values):
+                    if isinstance(value, np.ndarray):
+                        target[index] = mx.array(value)
+                    else:
+                        apply(target[index], value)
+
+        apply(self, parameters)
+        return self
+
+    def load_weights(self, file_or_weights: Union[str, List[Tuple[str, Any]]], strict: bool = True) -> "Module":
+        weights = list(mx.load(file_or_weights).items()) if isinstance(file_or_weights, str) else list(file_or_weights)
+        if strict:
+            expected = dict(tree_flatten(self.parameters()))
+            provided = dict(weights)
+            extra = sorted(set(provided) - set(expected))
+            missing = sorted(set(expected) - set(provided))
+            if extra:
+                raise ValueError(f"Received parameters not in model: {', '.join(extra)}.")
+            if missing:
+                raise ValueError(f"Missing parameters: {', '.join(missing)}.")
+            for key, value in provided.items():
+                if np.shape(value) != np.shape(expected[key]):
+                    raise ValueError(
+                        f"Expected shape {np.shape(expected[key])} but received shape {np.shape(value)} for parameter {key}"
+                    )
+        return self.update(tree_unflatten(weights))
+
+    def save_weights(self, file: str):
+        np.savez(file, **dict(tree_flatten(self.parameters())))
+
+    def apply(self, map_fn: Callable, filter_fn: Optional[Callable] = None) -> "Module":
+        from .utils import tree_map
+
+        return self.update(tree_map(map_fn, self.parameters()))
+
+    def apply_to_modules(self, apply_fn: Callable[[str, "Module"], Any]) -> "Module":
+        for name, module in self.named_modules():
+            apply_fn(name, module)
+        return self
+
+    def freeze(self, *args, **kwargs) -> "Module":
+        return self
+
+    def unfreeze(self, *args, **kwargs) -> "Module":
+        return self
+
+    def set_dtype(self, dtype, predicate=None):
+        self.apply(lambda x: x.astype(dtype) if np.issubdtype(x.dtype, np.floating) else x)
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+def _uniform(scale: float, shape: Sequence[int]):
+    return mx.random.uniform(-scale, scale, shape)
+
+
+def _tuple(value, n: int) -> Tuple[int, ...]:
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,) * n
+
+
+# Activations
+
+
+def relu(x):
+    return np.maximum(x, 0)
+
+
+def relu6(x):
+    return np.minimum(np.maximum(x, 0), 6)
+
+
+def leaky_relu(x, negative_slope: float = 0.01):
+    return np.where(x > 0, x, negative_slope * x)
+
+
+def elu(x, alpha: float = 1.0):
+    return np.where(x > 0, x, alpha * (np.exp(x) - 1))
+
+
+def gelu(x):
+    return x * (1 + mx.erf(x / math.sqrt(2))) / 2
+
+
+def gelu_approx(x):
+    return 0.5 * x * (1 + np.tanh(math.sqrt(2 / math.pi) * (x + 0.044715 * x ** 3)))
+
+
+def gelu_fast_approx(x):
+    return x * mx.sigmoid(1.702 * x)
+
+
+def sigmoid(x):
+    return mx.sigmoid(x)
+
+
+def silu(x):
+    return x * mx.sigmoid(x)
+
+
+def tanh(x):
+    return np.tanh(x)
+
+
+def softplus(x):
+    return np.logaddexp(0, x)
+
+
+def mish(x):
+    return x * np.tanh(softplus(x))
+
+
+def hardswish(x):
+    return x * np.minimum(np.maximum(x + 3, 0), 6) / 6
+
+
+def softmax(x, axis: int = -1):
+    return mx.softmax(x, axis=axis)
+
+
+def log_softmax(x, axis: int = -1):
+    return x - mx.logsumexp(x, axis=axis, keepdims=True)
+
+
+def glu(x, axis: int = -1):
+    a, b = np.split(x, 2, axis=axis)
+    return a * mx.sigmoid(b)
+
+
+def _activation(name: str, fn: Callable, **defaults) -> type:
+    def __init__(self, *args, **kwargs):
+        Module.__init__(self)
+        self._kwargs = dict(defaults)
+        self._kwargs.update(zip(defaults, args))
+        self._kwargs.update(kwargs)
+
+    def __call__(self, x):
+        return fn(x, **self._kwargs)
+
+    return type(name, (Module,), {"__init__": __init__, "__call__": __call__})
+
+
+ReLU = _activation("ReLU", relu)
+ReLU6 = _activation("ReLU6", relu6)
+LeakyReLU = _activation("LeakyReLU", leaky_relu, negative_slope=0.01)
+ELU = _activation("ELU", elu, alpha=1.0)
+SiLU = _activation("SiLU", silu)
+Sigmoid = _activation("Sigmoid", sigmoid)
+Tanh = _activation("Tanh", tanh)
+Softplus = _activation("Softplus", softplus)
+Mish = _activation("Mish", mish)
+Hardswish = _activation("Hardswish", hardswish)
+Softmax = _activation("Softmax", softmax)
+LogSoftmax = _activation("LogSoftmax", log_softmax)
+GLU = _activation("GLU", glu, axis=-1)
+
+
+class GELU(Module):
+    def __init__(self, approx: str = "none"):
+        super().__init__()
+        self._fn = {"none": gelu, "precise": gelu_approx, "tanh": gelu_approx, "fast": gelu_fast_approx}[approx]
+
+    def __call__(self, x):
+        return self._fn(x)
+
+
+# Layers
+
+
+class Identity(Module):
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+
+    def __call__(self, x):
+        return x
+
+
+class Linear(Module):
+    def __init__(self, input_dims: int, output_dims: int, bias: bool = True):
+        super().__init__()
+        scale = math.sqrt(1.0 / input_dims)
+        self.weight = _uniform(scale, (output_dims, input_dims))
+        if bias:
+            self.bias = _uniform(scale, (output_dims,))
+
+    def __call__(self, x):
+        y = x @ self.weight.T
+        return y + self.bias if "bias" in self else y
+
+
+class Bilinear(Module):
+    def __init__(self, input1_dims: int, input2_dims: int, output_dims: int, bias: bool = True):
+        super().__init__()
+        scale = math.sqrt(1.0 / input1_dims)
+        self.weight = _uniform(scale, (output_dims, input2_dims, input1_dims))
+        if bias:
+            self.bias = _uniform(scale, (output_dims,))
+
+    def __call__(self, x1, x2):
+        y = np.einsum("...i,oji,...j->...o", x1, self.weight, x2)
+        return y + self.bias if "bias" in self else y
+
+
+class Embedding(Module):
+    def __init__(self, num_embeddings: int, dims: int):
+        super().__init__()
+        self.weight = mx.random.normal((num_embeddings, dims), scale=math.sqrt(1 / dims))
+
+    def __call__(self, x):
+        return self.weight[np.asarray(x)]
+
+    def as_linear(self, x):
+        return x @ self.weight.T
+
+
+class _ConvNd(Module):
+    spatial = 2
+
+    def __init__(self, in_channels: int, out_channels: int, kernel_size, stride=1, padding=0,
+                 dilation=1, groups: int = 1, bias: bool = True):
+        super().__init__()
+        if in_channels % groups or out_channels % groups:
+            raise ValueError(f"in_channels ({in_channels}) and out_channels ({out_channels}) "
+                             f"must be divisible by groups ({groups})")
+        kernel = _tuple(kernel_size, self.spatial)
+        scale = math.sqrt(1 / (in_channels * math.prod(kernel)))
+        self.weight = _uniform(scale, (out_channels, *kernel, in_channels // groups))
+        if bias:
+            self.bias = mx.zeros((out_channels,))
+        self.stride, self.padding, self.dilation, self.groups = stride, padding, dilation, groups
+
+    def __call__(self, x):
+        if np.ndim(x) != self.spatial + 2:
+            raise ValueError(f"{type(self).__name__} expects a {self.spatial + 2}-D channels-last input, "
+                             f"got shape {np.shape(x)}")
+        if np.shape(x)[-1] != self.weight.shape[-1] * self.groups:
+            raise ValueError(f"Expected {self.weight.shape[-1] * self.groups} input channels (channels-last), "
+                             f"got input shape {np.shape(x)}")
+        y = mx._conv(x, self.weight, self.stride, self.padding, self.dilation, self.groups)
+        return y + self.bias if "bias" in self else y
+
+
+class Conv1d(_ConvNd):
+    spatial = 1
+
+
+class Conv2d(_ConvNd):
+    spatial = 2
+
+
+class Conv3d(_ConvNd):
+    spatial = 3
+
+
+class _ConvTransposeNd(Module):
+    spatial = 2
+
+    def __init__(self, in_channels: int, out_channels: int, kernel_size, stride=1, padding=0,
+                 dilation=1, output_padding=0, bias: bool = True):
+        super().__init__()
+        kernel = _tuple(kernel_size, self.spatial)
+        scale = math.sqrt(1 / (in_channels * math.prod(kernel)))
+        self.weight = _uniform(scale, (out_channels, *kernel, in_channels))
+        if bias:
+            self.bias = mx.zeros((out_channels,))
+        self.stride, self.padding, self.dilation, self.output_padding = stride, padding, dilation, output_padding
+
+    def __call__(self, x):
+        if np.ndim(x) != self.spatial + 2 or np.shape(x)[-1] != self.weight.shape[-1]:
+            raise ValueError(f"{type(self).__name__} expects a channels-last input with "
+                             f"{self.weight.shape[-1]} channels, got shape {np.shape(x)}")
+        y = mx._conv_transpose(x, self.weight, self.stride, self.padding, self.dilation, self.output_padding, 1)
+        return y + self.bias if "bias" in self else y
+
+
+class ConvTranspose1d(_ConvTransposeNd):
+    spatial = 1
+
+
+class ConvTranspose2d(_ConvTransposeNd):
+    spatial = 2
+
+
+class ConvTranspose3d(_ConvTransposeNd):
+    spatial = 3
+
+
+class LayerNorm(Module):
+    def __init__(self, dims: int, eps: float = 1e-5, affine: bool = True, bias: bool = True):
+        super().__init__()
+        if affine:
+            self.weight = mx.ones((dims,))
+            if bias:
+                self.bias = mx.zeros((dims,))
+        self.eps = eps
+
+    def __call__(self, x):
+        return mx.fast.layer_norm(x, self.get("weight"), self.get("bias"), self.eps)
+
+
+class RMSNorm(Module):
+    def __init__(self, dims: int, eps: float = 1e-5):
+        super().__init__()
+        self.weight = mx.ones((dims,))
+        self.eps = eps
+
+    def __call__(self, x):
+        return mx.fast.rms_norm(x, self.weight, self.eps)
+
+
+class GroupNorm(Module):
+    def __init__(self, num_groups: int, dims: int, eps: float = 1e-5, affine: bool = True,
+                 pytorch_compatible: bool = False):
+        super().__init__()
+        if affine:
+            self.weight = mx.ones((dims,))
+            self.bias = mx.zeros((dims,))
+        self.num_groups, self.dims, self.eps = num_groups, dims, eps
+
+    def __call__(self, x):
+        x = np.asarray(x)
+        if x.shape[-1] != self.dims:
+            raise ValueError(f"GroupNorm expects {self.dims} channels (channels-last), got shape {x.shape}")
+        batch, channels = x.shape[0], x.shape[-1]
+        grouped = x.reshape(batch, -1, self.num_groups, channels // self.num_groups)
+        mean = grouped.mean(axis=(1, 3), keepdims=True)
+        var = grouped.var(axis=(1, 3), keepdims=True)
+        out = ((grouped - mean) / np.sqrt(var + self.eps)).reshape(x.shape)
+        if "weight" in self:
+            out = out * self.weight + self.bias
+        return mx.array(out)
+
+
+class InstanceNorm(Module):
+    def __init__(self, dims: int, eps: float = 1e-5, affine: bool = False):
+        super().__init__()
+        if affine:
+            self.weight = mx.ones((dims,))
+            self.bias = mx.zeros((dims,))
+        self.eps = eps
+
+    def __call__(self, x):
+        axes = tuple(range(1, np.ndim(x) - 1))
+        out = (x - np.mean(x, axis=axes, keepdims=True)) / np.sqrt(np.var(x, axis=axes, keepdims=True) + self.eps)
+        return out * self.weight + self.bias if "weight" in self else out
+
+
+class BatchNorm(Module):
+    def __init__(self, num_features: int, eps: float = 1e-5, momentum: float = 0.1, affine: bool = True,
+                 track_running_stats: bool = True):
+        super().__init__()
+        if affine:
+            self.weight = mx.ones((num_features,))
+            self.bias = mx.zeros((num_features,))
+        if track_running_stats:
+            self.running_mean = mx.zeros((num_features,))
+            self.running_var = mx.ones((num_features,))
+        self.eps = eps
+
+    def __call__(self, x):
+        if "running_mean" in self and not self.training:
+            mean, var = self.running_mean, self.running_var
+        else:
+            axes = tuple(range(np.ndim(x) - 1))
+            mean, var = np.mean(x, axis=axes), np.var(x, axis=axes)
+        out = (x - mean) / np.sqrt(var + self.eps)
+        return out * self.weight + self.bias if "weight" in self else out
+
+
+class Dropout(Module):
+    def __init__(self, p: float = 0.5):
+        super().__init__()
+        if not 0 <= p < 1:
+            raise ValueError(f"The dropout probability {p} is not in [0, 1)")
+        self.p = p
+
+    def __call__(self, x):
+        return x
+
+
+Dropout2d = Dropout
+Dropout3d = Dropout
+
+
+class Sequential(Module):
+    def __init__(self, *modules):
+        super().__init__()
+        self.layers = list(modules)
+
+    def __call__(self, x):
+        for layer in self.layers:
+            x = layer(x)
+        return x
+
+
+class Upsample(Module):
+    def __init__(self, scale_factor, mode: str = "nearest", align_corners: bool = False):
+        super().__init__()
+        self.scale_factor, self.mode = scale_factor, mode
+
+    def __call__(self, x):
+        spatial = np.ndim(x) - 2
+        factors = _tuple(self.scale_factor, spatial)
+        for axis, factor in enumerate(factors, 1):
+            if int(factor) != factor:
+                raise ShimUnsupported("non-integer Upsample factors are not emulated by the smoke-test shim")
+            x = np.repeat(x, int(factor), axis=axis)
+        return x
+
+
+class _Pool(Module):
+    spatial = 2
+    reduce = staticmethod(np.max)
+
+    def __init__(self, kernel_size, stride=None, padding=0):
+        super().__init__()
+        self.kernel = _tuple(kernel_size, self.spatial)
+        self.stride = _tuple(stride if stride is not None else kernel_size, self.spatial)
+        self.padding = _tuple(padding, self.spatial)
+
+    def __call__(self, x):
+        x = np.pad(np.asarray(x), [(0, 0)] + [(p, p) for p in self.padding] + [(0, 0)])
+        windows = np.lib.stride_tricks.sliding_window_view(x, self.kernel, axis=tuple(range(1, self.spatial + 1)))
+        windows = windows[(slice(None),) + tuple(slice(None, None, s) for s in self.stride)]
+        return mx.array(self.reduce(windows, axis=tuple(range(-self.spatial, 0))))
+
+
+class MaxPool1d(_Pool):
+    spatial = 1
+
+
+class MaxPool2d(_Pool):
+    spatial = 2
+
+
+class AvgPool1d(_Pool):
+    spatial = 1
+    reduce = staticmethod(np.mean)
+
+
+class AvgPool2d(_Pool):
+    spatial = 2
+    reduce = staticmethod(np.mean)
+
+
+class RoPE(Module):
+    def __init__(self, dims: int, traditional: bool = False, base: float = 10000, scale: float = 1.0):
+        super().__init__()
+        self.dims, self.traditional, self.base, self.scale = dims, traditional, base, scale
+
+    def __call__(self, x, offset: int = 0):
+        return mx.fast.rope(x, self.dims, traditional=self.traditional, base=self.base, scale=self.scale, offset=offset)
+
+
+class SinusoidalPositionalEncoding(Module):
+    def __init__(self, dims: int, min_freq: float = 0.0001, max_freq: float = 1, scale: Optional[float] = None,
+                 cos_first: bool = False, full_turns: bool = False):
+        super().__init__()
+        one_zero = 1 - np.arange(0, dims // 2) / (dims // 2 - 1 or 1)
+        self._sigmas = np.exp(one_zero * (math.log(max_freq) - math.log(min_freq)) + math.log(min_freq))
+        self.scale = scale or (2 / dims) ** 0.5
+        self.cos_first = cos_first
+
+    def __call__(self, x):
+        y = np.asarray(x)[..., None] * self._sigmas
+        parts = [np.cos(y), np.sin(y)] if self.cos_first else [np.sin(y), np.cos(y)]
+        return mx.array(np.concatenate(parts, axis=-1) * self.scale)
+
+
+class MultiHeadAttention(Module):
+    def __init__(self, dims: int, num_heads: int, query_input_dims: Optional[int] = None,
+                 key_input_dims: Optional[int] = None, value_input_dims: Optional[int] = None,
+                 value_dims: Optional[int] = None, value_output_dims: Optional[int] = None, bias: bool = False):
+        super().__init__()
+        if dims % num_heads:
+            raise ValueError(f"The input feature dimensions should be divisible by the number of heads "
+                             f"({dims} % {num_heads}) != 0")
+        query_input_dims = query_input_dims or dims
+        key_input_dims = key_input_dims or dims
+        value_input_dims = value_input_dims or key_input_dims
+        value_dims = value_dims or dims
+        value_output_dims = value_output_dims or dims
+        self.num_heads = num_heads
+        self.query_proj = Linear(query_input_dims, dims, bias=bias)
+        self.key_proj = Linear(key_input_dims, dims, bias=bias)
+        self.value_proj = Linear(value_input_dims, value_dims, bias=bias)
+        self.out_proj = Linear(value_dims, value_output_dims, bias=bias)
+
+    def __call__(self, queries, keys, values, mask=None):
+        queries, keys, values = self.query_proj(queries), self.key_proj(keys), self.value_proj(values)
+        B, L, D = queries.shape
+        _, S, _ = keys.shape
+        h = self.num_heads
+        queries = queries.reshape(B, L, h, -1).transpose(0, 2, 1, 3)
+        keys = keys.reshape(B, S, h, -1).transpose(0, 2, 1, 3)
+        values = values.reshape(B, S, h, -1).transpose(0, 2, 1, 3)
+        scale = math.sqrt(1 / queries.shape[-1])
+        out = mx.fast.scaled_dot_product_attention(queries, keys, values, scale=scale, mask=mask)
+        return self.out_proj(out.transpose(0, 2, 1, 3).reshape(B, L, -1))
+
+    @staticmethod
+    def create_additive_causal_mask(N: int, dtype=mx.float32):
+        indices = np.arange(N)
+        return mx.array((indices[:, None] < indices[None]) * -1e9, dtype=dtype)
+
+
+class TransformerEncoderLayer(Module):
+    def __init__(self, dims: int, num_heads: int, mlp_dims: Optional[int] = None, dropout: float = 0.0,
+                 activation: Callable = relu, norm_first: bool = True):
+        super().__init__()
+        mlp_dims = mlp_dims or dims * 4
+        self.attention = MultiHeadAttention(dims, num_heads)
+        self.ln1 = LayerNorm(dims)
+        self.ln2 = LayerNorm(dims)
+        self.linear1 = Linear(dims, mlp_dims)
+        self.linear2 = Linear(mlp_dims, dims)
+        self.activation = activation
+        self.norm_first = norm_first
+
+    def __call__(self, x, mask=None):
+        if self.norm_first:
+            y = self.ln1(x)
+            x = x + self.attention(y, y, y, mask)
+            return x + self.linear2(self.activation(self.linear1(self.ln2(x))))
+        x = self.ln1(x + self.attention(x, x, x, mask))
+        return self.ln2(x + self.linear2(self.activation(self.linear1(x))))
+
+
+class TransformerEncoder(Module):
+    def __init__(self, num_layers: int, dims: int, num_heads: int, mlp_dims: Optional[int] = None,
+                 dropout: float = 0.0, activation: Callable = relu, norm_first: bool = True, checkpoint: bool = False):
+        super().__init__()
+        self.layers = [TransformerEncoderLayer(dims, num_heads, mlp_dims, dropout, activation, norm_first)
+                       for _ in range(num_layers)]
+        self.ln = LayerNorm(dims)
+
+    def __call__(self, x, mask=None):
+        for layer in self.layers:
+            x = layer(x, mask)
+        return self.ln(x)
+
+
+init = _Namespace(
+    "mlx.nn.init",
+    constant=lambda value, dtype=mx.float32: (lambda a: mx.full(np.shape(a), value, dtype)),
+    normal=lambda mean=0.0, std=1.0, dtype=mx.float32: (lambda a: mx.random.normal(np.shape(a), dtype, mean, std)),
+    uniform=lambda low=0.0, high=1.0, dtype=mx.float32: (lambda a: mx.random.uniform(low, high, np.shape(a), dtype)),
+    identity=lambda dtype=mx.float32: (lambda a: mx.eye(np.shape(a)[0], dtype=dtype)),
+    glorot_normal=lambda dtype=mx.float32: (lambda a, gain=1.0: mx.random.normal(np.shape(a), dtype)),
+    glorot_uniform=lambda dtype=mx.float32: (lambda a, gain=1.0: mx.random.uniform(-1, 1, np.shape(a), dtype)),
+    he_normal=lambda dtype=mx.float32: (lambda a, mode="fan_in", gain=1.0: mx.random.normal(np.shape(a), dtype)),
+    he_uniform=lambda dtype=mx.float32: (lambda a, mode="fan_in", gain=1.0: mx.random.uniform(-1, 1, np.shape(a), dtype)),
+)
+
+value_and_grad = _unsupported("nn.value_and_grad")
+quantize = _unsupported("nn.quantize")
+QuantizedLinear = _unsupported("nn.QuantizedLinear")
@@ -0,0 +1,42 @@
+"""`mlx.utils` tree helpers."""
+from typing import Any, Callable, List, Optional, Tuple
+
+
+def tree_flatten(tree: Any, prefix: str = "", is_leaf: Optional[Callable[[Any], bool]] = None) -> List[Tuple[str, Any]]:
+    if is_leaf is None or not is_leaf(tree):
+        if isinstance(tree, (list, tuple)):
+            return [item for i, t in enumerate(tree) for item in tree_flatten(t, f"{prefix}.{i}", is_leaf)]
+        if isinstance(tree, dict):
+            return [item for k, t in tree.items() for item in tree_flatten(t, f"{prefix}.{k}", is_leaf)]
+    return [(prefix[1:], tree)]
+
+
+def tree_unflatten(tree: List[Tuple[str, Any]]) -> Any:
+    if len(tree) == 1 and tree[0][0] == "":
+        return tree[0][1]
+    children: dict = {}
+    for key, value in tree:
+        head, _, rest = key.partition(".")
+        children.setdefault(head, []).append((rest, value))
+    if all(k.isdigit() for k in children):
+        items: List[Any] = [{} for _ in range(max(int(k) for k in children) + 1)]
+        for k, v in children.items():
+            items[int(k)] = tree_unflatten(v)
+        return items
+    return {k: tree_unflatten(v) for k, v in children.items()}
+
+
+def tree_map(fn: Callable, tree: Any, *rest: Any, is_leaf: Optional[Callable[[Any], bool]] = None) -> Any:
+    if is_leaf is None or not is_leaf(tree):
+        if isinstance(tree, (list, tuple)):
+            return type(tree)(tree_map(fn, t, *(r[i] for r in rest), is_leaf=is_leaf) for i, t in enumerate(tree))
+        if isinstance(tree, dict):
+            return {k: tree_map(fn, t, *(r[k] for r in rest), is_leaf=is_leaf) for k, t in tree.items()}
+    return fn(tree, *rest)
+
+
+def tree_reduce(fn: Callable, tree: Any, initializer: Any = None) -> Any:
+    accumulator = initializer
+    for _, leaf in tree_flatten(tree):
+        accumulator = leaf if accumulator is None else fn(accumulator, leaf)
+    return accumulator
@@ -0,0 +1,272 @@
+"""Runs one generated candidate against the NumPy `mlx` shim; executed in a sandboxed subprocess.
+
+Usage (from `mlx_t2v_researcher.smoke`):
+    SMOKE_MEMORY_MB=2048 SMOKE_CPU_SECONDS=31 python -I smoke_child.py <candidate.py> <result.json>
+
+Applies the address-space and CPU-time limits from its environment before
+NumPy or the candidate is imported. Then executes the candidate as a module,
+builds every `nn.Module` subclass it defines with guessed constructor
+arguments, runs a forward pass on a small synthetic input shaped from the
+module's first layer, and writes the outcome as JSON.
+
+Conversion-side packages (torch, safetensors, transformers, ...) that are not
+installed are replaced by inert placeholders, so a candidate that imports
+them for weight conversion still gets its MLX code checked; calling into a
+placeholder raises `ShimUnsupported`.
+"""
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # not available on Windows; only the parent's timeout applies there
+    resource = None
+
+
+def _limit_resources():
+    if resource is None:
+        return
+    memory_mb = os.environ.get("SMOKE_MEMORY_MB")
+    cpu_seconds = os.environ.get("SMOKE_CPU_SECONDS")
+    if memory_mb:
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_seconds), int(cpu_seconds) + 1))
+
+
+_limit_resources()
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+import mlx.core as mx  # noqa: E402
+import mlx.nn as nn  # noqa: E402
+
+SMALL = 8
+
+PLACEHOLDER_PACKAGES = ("torch", "torchvision", "safetensors", "transformers", "diffusers", "huggingface_hub",
+                        "einops", "accelerate", "PIL", "cv2", "imageio", "tqdm")
+
+
+class Placeholder:
+    """Stands in for any attribute of a missing conversion-side package"""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Placeholder(f"{self._name}.{name}")
+
+    def __call__(self, *args, **kwargs):
+        raise mx.ShimUnsupported(f"{self._name} is not installed in the smoke-test sandbox")
+
+    def __mro_entries__(self, bases):
+        return (object,)
+
+
+class PlaceholderFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def __init__(self):
+        self.used = set()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname.split(".")[0] not in PLACEHOLDER_PACKAGES:
+            return None
+        if importlib.machinery.PathFinder.find_spec(fullname.split(".")[0]) is not None:
+            return None
+        return importlib.util.spec_from_loader(fullname, self, is_package=True)
+
+    def create_module(self, spec):
+        self.used.add(spec.name.split(".")[0])
+        module = Placeholder(spec.name)
+        module.__dict__.update(__name__=spec.name, __path__=[], __spec__=spec, __loader__=self)
+        return module
+
+    def exec_module(self, module):
+        pass
+
+
+_placeholders = PlaceholderFinder()
+sys.meta_path.append(_placeholders)
+
+_GUESSES = [
+    (("vocab", "num_embeddings", "num_tokens"), 32),
+    (("heads",), 2),
+    (("num_layers", "depth", "num_blocks", "n_layers", "layers", "num_res_blocks"), 1),
+    (("in_channels", "input_channels", "in_chans", "image_channels"), 3),
+    (("kernel",), 3),
+    (("stride", "scale_factor", "patch", "ratio", "mult", "factor", "groups"), 1),
+    (("eps", "epsilon"), 1e-5),
+    (("dropout", "drop", "prob"), 0.0),
+    (("theta", "base"), 10000.0),
+    (("max_len", "max_seq", "max_position", "seq_len", "frames", "length"), 16),
+]
+
+
+def _guess(name: str, annotation=inspect.Parameter.empty):
+    lowered = name.lower()
+    if annotation is bool:
+        return False
+    if annotation is str:
+        return ""
+    if lowered in ("config", "cfg", "args", "params", "model_config", "hparams"):
+        return AutoConfig()
+    for keys, value in _GUESSES:
+        if any(key in lowered for key in keys):
+            return value
+    if annotation is float:
+        return 1.0
+    return SMALL
+
+
+class AutoConfig(dict):
+    """Config object answering any attribute with a guessed small value"""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self.setdefault(name, _guess(name))
+
+    def __getitem__(self, name):
+        return self.setdefault(name, _guess(name))
+
+    def get(self, name, default=None):
+        return self.setdefault(name, _guess(name) if default is None else default)
+
+
+def _required(fn):
+    try:
+        params = list(inspect.signature(fn).parameters.values())
+    except (TypeError, ValueError):
+        return []
+    return [
+        p for p in params
+        if p.default is inspect.Parameter.empty and p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)
+    ]
+
+
+def _first_layer(module):
+    for _, child in module.named_modules()[1:]:
+        if isinstance(child, (nn.Linear, nn._ConvNd, nn._ConvTransposeNd, nn.Embedding, nn.MultiHeadAttention,
+                              nn.LayerNorm, nn.RMSNorm, nn.GroupNorm)):
+            return child
+    return None
+
+
+def _synthetic_input(module):
+    layer = _first_layer(module)
+    if isinstance(layer, (nn._ConvNd, nn._ConvTransposeNd)):
+        channels = layer.weight.shape[-1] * getattr(layer, "groups", 1)
+        return mx.random.normal((1,) + (SMALL,) * layer.spatial + (channels,))
+    if isinstance(layer, nn.Embedding):
+        return mx.random.randint(0, layer.weight.shape[0], (1, 4))
+    if isinstance(layer, nn.MultiHeadAttention):
+        return mx.random.normal((1, 4, layer.query_proj.weight.shape[1]))
+    if isinstance(layer, nn.GroupNorm):
+        return mx.random.normal((1, SMALL, SMALL, layer.dims))
+    if layer is not None:
+        return mx.random.normal((1, 4, layer.weight.shape[-1]))
+    return mx.random.normal((1, 4, SMALL))
+
+
+def _extra_argument(name: str, x):
+    lowered = name.lower()
+    if "mask" in lowered:
+        return None
+    if lowered in ("t", "timestep", "timesteps", "time", "sigma", "noise_level"):
+        return mx.array([0.5], dtype=mx.float32)
+    return x
+
+
+def _error(exc: BaseException, candidate: str) -> dict:
+    frames = [f for f in traceback.extract_tb(exc.__traceback__) if f.filename == candidate]
+    lines = [f'  line {f.lineno}, in {f.name}: {(f.line or "").strip()}' for f in frames[-5:]]
+    return {
+        "type": type(exc).__name__,
+        "message": str(exc)[:500],
+        "traceback": "\n".join(lines + [f"{type(exc).__name__}: {str(exc)[:500]}"]),
+        "unsupported": isinstance(exc, mx.ShimUnsupported),
+    }
+
+
+def _summarize(value):
+    if isinstance(value, np.ndarray):
+        return {"shape": list(value.shape), "finite": bool(np.all(np.isfinite(value)))
+                if np.issubdtype(value.dtype, np.number) else True}
+    if isinstance(value, (list, tuple)) and value:
+        return _summarize(value[0])
+    if isinstance(value, dict) and value:
+        return _summarize(next(iter(value.values())))
+    return {"shape": None, "finite": True}
+
+
+def check_module(cls, candidate: str) -> dict:
+    entry = {"name": cls.__name__, "status": "pass", "input_shape": None, "output_shape": None, "error": None}
+    try:
+        kwargs = {p.name: _guess(p.name, p.annotation) for p in _required(cls.__init__)[1:]}
+        module = cls(**kwargs)
+    except Exception as exc:  # noqa: BLE001 - every failure is reported
+        entry["error"] = _error(exc, candidate)
+        entry["status"] = "skipped" if entry["error"]["unsupported"] else "construct_failed"
+        return entry
+    if not callable(module):
+        entry["status"] = "skipped"
+        return entry
+    try:
+        module.eval()
+        x = _synthetic_input(module)
+        entry["input_shape"] = list(x.shape)
+        args = [x] + [_extra_argument(p.name, x) for p in _required(module.__call__)[1:]]
+        summary = _summarize(module(*args))
+        entry["output_shape"] = summary["shape"]
+        if not summary["finite"]:
+            entry["status"] = "forward_failed"
+            entry["error"] = {"type": "NonFinite", "message": "forward pass produced NaN or Inf",
+                              "traceback": "forward pass produced NaN or Inf", "unsupported": False}
+    except Exception as exc:  # noqa: BLE001
+        entry["error"] = _error(exc, candidate)
+        entry["status"] = "skipped" if entry["error"]["unsupported"] else "forward_failed"
+    return entry
+
+
+def run(candidate: str) -> dict:
+    result = {"executed": False, "error": None, "modules": []}
+    with open(candidate) as f:
+        source = f.read()
+    namespace = {"__name__": "candidate", "__file__": candidate}
+    start = time.perf_counter()
+    try:
+        exec(compile(source, candidate, "exec"), namespace)
+    except BaseException as exc:  # noqa: BLE001 - includes SystemExit from the candidate
+        result["error"] = _error(exc, candidate)
+        result["placeholders"] = sorted(_placeholders.used)
+        return result
+    result["executed"] = True
+    result["import_seconds"] = time.perf_counter() - start
+    classes = [
+        value for value in namespace.values()
+        if isinstance(value, type) and issubclass(value, nn.Module) and value.__module__ == "candidate"
+    ]
+    result["modules"] = [check_module(cls, candidate) for cls in classes]
+    result["placeholders"] = sorted(_placeholders.used)
+    return result
+
+
+def main():
+    candidate, output = sys.argv[1], sys.argv[2]
+    result = run(candidate)
+    with open(output, "w") as f:
+        json.dump(result, f)
+
+
+if __name__ == "__main__":
+    main()
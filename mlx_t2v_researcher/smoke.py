@@ -0,0 +1,172 @@
+"""Smoke-executes generated MLX code on CPU against the NumPy shim in `shim/`.
+
+Each candidate runs in its own `python -I` subprocess and session with a
+wall-clock timeout and address-space and CPU-time limits, so a hanging or
+memory-hungry candidate cannot take the generator down with it. The child
+(`shim/smoke_child.py`) applies the limits it is given in its environment
+before anything else. It then imports the candidate, builds every `nn.Module` it
+defines and runs a forward pass on a small synthetic input. Candidates run
+in parallel, bounded by `max_parallel`.
+"""
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .codeblocks import extract_code
+
+SHIM_PATH = Path(__file__).parent / "shim"
+CHILD_SCRIPT = SHIM_PATH / "smoke_child.py"
+
+
+@dataclass
+class ModuleCheck:
+    name: str
+    status: str
+    input_shape: Optional[List[int]] = None
+    output_shape: Optional[List[int]] = None
+    error: Optional[Dict[str, Any]] = None
+
+    @property
+    def passed(self) -> bool:
+        return self.status in ("pass", "skipped")
+
+
+@dataclass
+class SmokeResult:
+    """Outcome of one candidate: `status` is pass, fail, no_modules, timeout or crashed
+
+    `pass` needs at least one module whose forward pass ran; code that imports
+    cleanly but has nothing checkable is `no_modules`, which does not pass.
+    """
+    status: str
+    duration: float
+    error: Optional[Dict[str, Any]] = None
+    modules: List[ModuleCheck] = field(default_factory=list)
+    placeholders: List[str] = field(default_factory=list)
+    stderr: str = ""
+
+    @property
+    def passed(self) -> bool:
+        return self.status == "pass"
+
+    @property
+    def failures(self) -> List[ModuleCheck]:
+        return [m for m in self.modules if not m.passed]
+
+    def feedback(self) -> str:
+        """Plain-text summary for a refinement prompt"""
+        if self.status == "timeout":
+            return f"Smoke test timed out after {self.duration:.0f}s: importing or running the code does not finish."
+        if self.status == "crashed":
+            return f"Smoke test process crashed (likely out of memory):\n{self.stderr[-1000:]}"
+        lines = []
+        if self.error is not None:
+            lines.append(f"Importing the code failed:\n{self.error['traceback']}")
+            if self.error["type"] in ("ModuleNotFoundError", "AttributeError") and "mlx" in self.error["message"].lower():
+                lines.append("This API does not exist in MLX; use mlx.core (mx) and mlx.nn (nn.Module, nn.Linear, ...).")
+        for module in self.modules:
+            if module.status == "pass":
+                lines.append(f"{module.name}: forward pass OK {module.input_shape} -> {module.output_shape}")
+            elif module.status == "skipped":
+                reason = module.error["message"] if module.error else "not callable"
+                lines.append(f"{module.name}: not checked ({reason})")
+            else:
+                step = "construction" if module.status == "construct_failed" else f"forward pass on {module.input_shape}"
+                lines.append(f"{module.name}: {step} failed:\n{module.error['traceback']}")
+        if self.error is None and not self.modules:
+            lines.append("No nn.Module subclasses found to check.")
+        elif self.status == "no_modules":
+            lines.append("No module's forward pass could be checked, so the code is not counted as passing.")
+        if self.placeholders:
+            lines.append(f"Not installed in the sandbox, replaced by placeholders: {', '.join(self.placeholders)}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "passed": self.passed, "feedback": self.feedback()}
+
+
+class SmokeRunner:
+    def __init__(self, timeout: float = 30.0, memory_mb: int = 2048, max_parallel: Optional[int] = None):
+        """Runs candidates in sandboxed subprocesses
+
+        Args:
+            timeout: Wall-clock seconds per candidate before it is killed
+            memory_mb: Address-space limit of each child process
+            max_parallel: Most candidates run at once (default: CPU count)
+        """
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_parallel = max_parallel or os.cpu_count() or 1
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def run(self, code: str) -> SmokeResult:
+        """Smoke-test one candidate, given as source or as a markdown response with code blocks"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_parallel)
+        async with self._semaphore:
+            with tempfile.TemporaryDirectory(prefix="mlx-smoke-") as workdir:
+                return await self._execute(extract_code(code), Path(workdir))
+
+    async def run_many(self, codes: Sequence[str]) -> List[SmokeResult]:
+        return list(await asyncio.gather(*(self.run(code) for code in codes)))
+
+    async def _execute(self, source: str, workdir: Path) -> SmokeResult:
+        candidate = workdir / "candidate.py"
+        output = workdir / "result.json"
+        candidate.write_text(source)
+        env = {
+            "PATH": os.environ.get("PATH", ""),
+            "OPENBLAS_NUM_THREADS": "1",
+            "OMP_NUM_THREADS": "1",
+            "MKL_NUM_THREADS": "1",
+            # Applied by the child itself: preexec_fn is not safe in a threaded parent
+            "SMOKE_MEMORY_MB": str(self.memory_mb),
+            "SMOKE_CPU_SECONDS": str(int(self.timeout) + 1),
+        }
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-I", str(CHILD_SCRIPT), str(candidate), str(output),
+            cwd=workdir, env=env, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            start_new_session=os.name == "posix",
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            if os.name == "posix":
+                # The child leads its own session: this also kills anything the candidate spawned
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            else:
+                process.kill()
+            await process.wait()
+            return SmokeResult(status="timeout", duration=time.perf_counter() - start)
+        duration = time.perf_counter() - start
+        stderr_text = stderr.decode(errors="replace")
+        if not output.exists():
+            return SmokeResult(status="crashed", duration=duration, stderr=stderr_text)
+
+        data = json.loads(output.read_text())
+        modules = [ModuleCheck(**entry) for entry in data["modules"]]
+        if not data["executed"] or not all(module.passed for module in modules):
+            status = "fail"
+        elif not any(module.status == "pass" for module in modules):
+            status = "no_modules"
+        else:
+            status = "pass"
+        return SmokeResult(
+            status=status,
+            duration=duration,
+            error=data["error"],
+            modules=modules,
+            placeholders=data.get("placeholders", []),
+            stderr=stderr_text,
+        )
@@ -0,0 +1,622 @@
+"""Lazy checkpoint readers and a chunked numerical parity check between checkpoints.
+
+Safetensors files are memory-mapped straight from their header, so opening a
+multi-GB checkpoint reads only a few kilobytes and every tensor is a view
+that is paged in as it is compared. `.npy` files are memory-mapped too;
+`.npz` members are loaded one at a time, and `.pth`/`.pt`/`.bin` files need
+torch (loaded with `mmap=True` where supported), though `read_torch_specs`
+gets their tensor names, shapes and dtypes from the pickle without it.
+
+`check_parity` pairs each source tensor with its converted counterpart via a
+key map (plus an optional view transform, e.g. a transpose from PyTorch to
+MLX conv layout), streams both in fixed-size chunks and accumulates
+max-abs-diff, relative L2 error and cosine similarity, summing in float64.
+Large tensors are split into slabs so that the whole comparison spreads over
+a thread pool; NumPy releases the GIL in the chunk arithmetic.
+"""
+import json
+import os
+import pickle
+import struct
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+SAFETENSORS_DTYPES = {
+    "F64": np.float64, "F32": np.float32, "F16": np.float16, "BF16": np.uint16,
+    "I64": np.int64, "I32": np.int32, "I16": np.int16, "I8": np.int8,
+    "U64": np.uint64, "U32": np.uint32, "U16": np.uint16, "U8": np.uint8, "BOOL": np.bool_,
+}
+DTYPE_TAGS = {np.dtype(v).name: k for k, v in SAFETENSORS_DTYPES.items() if k != "BF16"}
+TORCH_SUFFIXES = (".pth", ".pt", ".bin")
+DEFAULT_CHUNK_ELEMENTS = 1 << 20
+
+Transform = Callable[[np.ndarray], np.ndarray]
+
+
+@dataclass
+class LazyTensor:
+    """A stored tensor: `array` is a (possibly memory-mapped) view of the raw values.
+
+    bfloat16 is stored as its uint16 bit pattern; `decode` widens any chunk of
+    `array` (or of a transposed/reshaped view of it) to a float array.
+    """
+    array: np.ndarray
+    dtype: str
+    file: str = ""
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(self.array.shape)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.array.nbytes)
+
+    def decode(self, chunk: np.ndarray) -> np.ndarray:
+        if self.dtype == "BF16":
+            return (chunk.astype(np.uint32) << 16).view(np.float32)
+        if chunk.dtype.kind == "f" and chunk.dtype.itemsize <= 4:
+            return chunk.astype(np.float32)
+        return chunk.astype(np.float64)
+
+
+def read_safetensors_header(path: Union[str, Path]) -> Tuple[Dict[str, Any], int]:
+    """The JSON header of a safetensors file and the byte offset where its data starts"""
+    with open(path, "rb") as f:
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    return header, 8 + length
+
+
+def open_safetensors(path: Union[str, Path]) -> Dict[str, LazyTensor]:
+    header, data_start = read_safetensors_header(path)
+    header.pop("__metadata__", None)
+    size = os.path.getsize(path)
+    if not header or size <= data_start:
+        return {name: LazyTensor(np.zeros(info["shape"], SAFETENSORS_DTYPES[info["dtype"]]), info["dtype"], str(path))
+                for name, info in header.items()}
+    buffer = np.memmap(path, dtype=np.uint8, mode="r", offset=data_start, shape=(size - data_start,))
+    tensors = {}
+    for name, info in header.items():
+        if info["dtype"] not in SAFETENSORS_DTYPES:
+            raise ValueError(f"{path}: unsupported safetensors dtype {info['dtype']} for {name}")
+        begin, end = info["data_offsets"]
+        array = buffer[begin:end].view(SAFETENSORS_DTYPES[info["dtype"]]).reshape(info["shape"])
+        tensors[name] = LazyTensor(array, info["dtype"], str(path))
+    return tensors
+
+
+def _unwrap_state(state: Any) -> Any:
+    for wrapper in ("state_dict", "model", "module"):
+        if isinstance(state, dict) and isinstance(state.get(wrapper), dict) and len(state) <= 3:
+            state = state[wrapper]
+    return state
+
+
+def _flatten_state_dict(state: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    for key, value in state.items():
+        if isinstance(value, dict):
+            yield from _flatten_state_dict(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def open_torch(path: Union[str, Path]) -> Dict[str, LazyTensor]:
+    try:
+        import torch
+    except ImportError as exc:
+        raise ImportError(f"Reading {path} needs torch; install it or convert the checkpoint to safetensors") from exc
+    try:
+        state = torch.load(path, map_location="cpu", weights_only=True, mmap=True)
+    except (TypeError, RuntimeError):  # older torch, or a legacy (non-zip) file that cannot be mapped
+        state = torch.load(path, map_location="cpu")
+    tensors = {}
+    for name, value in _flatten_state_dict(_unwrap_state(state)):
+        if not isinstance(value, torch.Tensor):
+            continue
+        if value.dtype == torch.bfloat16:
+            tensors[name] = LazyTensor(value.view(torch.int16).numpy().view(np.uint16), "BF16", str(path))
+        else:
+            array = value.numpy()
+            tensors[name] = LazyTensor(array, DTYPE_TAGS[array.dtype.name], str(path))
+    return tensors
+
+
+TORCH_STORAGE_DTYPES = {
+    "DoubleStorage": "F64", "FloatStorage": "F32", "HalfStorage": "F16", "BFloat16Storage": "BF16",
+    "LongStorage": "I64", "IntStorage": "I32", "ShortStorage": "I16", "CharStorage": "I8",
+    "ByteStorage": "U8", "BoolStorage": "BOOL",
+}
+
+
+@dataclass
+class _TensorSpec:
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class _Opaque:
+    """Stands in for any non-tensor object in a torch pickle"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __setstate__(self, state):
+        pass
+
+
+class _SpecUnpickler(pickle.Unpickler):
+    """Reads a torch zip checkpoint's pickle into `_TensorSpec`s without torch or the tensor data"""
+
+    def find_class(self, module: str, name: str):
+        if module == "torch._utils" and name in ("_rebuild_tensor", "_rebuild_tensor_v2"):
+            return lambda storage, offset, size, *args: _TensorSpec(tuple(size), storage)
+        if module == "torch._utils" and name == "_rebuild_parameter":
+            return lambda data, *args: data
+        if module == "torch" and name in TORCH_STORAGE_DTYPES:
+            return TORCH_STORAGE_DTYPES[name]
+        if module == "collections" and name == "OrderedDict":
+            return dict
+        return _Opaque
+
+    def persistent_load(self, pid):
+        # ("storage", storage type, key, location, numel): the storage type was resolved to a dtype tag
+        return pid[1] if isinstance(pid[1], str) else "U8"
+
+
+def read_torch_specs(path: Union[str, Path]) -> Dict[str, Tuple[Tuple[int, ...], str]]:
+    """Shape and dtype tag of every tensor in a zip-format torch checkpoint, read from its pickle alone
+
+    Unlike `open_torch` this needs neither torch nor reading any tensor data.
+    """
+    with zipfile.ZipFile(path) as archive:
+        member = next((n for n in archive.namelist() if n.endswith("data.pkl")), None)
+        if member is None:
+            raise ValueError(f"{path}: not a zip-format torch checkpoint")
+        with archive.open(member) as f:
+            state = _SpecUnpickler(f).load()
+    return {name: (value.shape, value.dtype) for name, value in _flatten_state_dict(_unwrap_state(state))
+            if isinstance(value, _TensorSpec)}
+
+
+def open_numpy(path: Union[str, Path]) -> Dict[str, LazyTensor]:
+    if str(path).endswith(".npy"):
+        array = np.load(path, mmap_mode="r")
+        return {Path(path).stem: LazyTensor(array, DTYPE_TAGS[array.dtype.name], str(path))}
+    with np.load(path) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    return {name: LazyTensor(array, DTYPE_TAGS[array.dtype.name], str(path)) for name, array in arrays.items()}
+
+
+def encode_bfloat16(values: np.ndarray) -> np.ndarray:
+    """Round float values to bfloat16 (nearest, ties to even) and return the uint16 bit patterns"""
+    bits = np.ascontiguousarray(values, dtype=np.float32).view(np.uint32)
+    rounded = bits + np.uint32(0x7FFF) + ((bits >> np.uint32(16)) & np.uint32(1))
+    return (rounded >> np.uint32(16)).astype(np.uint16)
+
+
+def save_safetensors(path: Union[str, Path], specs: List[Tuple[str, str, Tuple[int, ...]]],
+                     arrays: Iterable[np.ndarray], metadata: Optional[Dict[str, str]] = None) -> int:
+    """Write a safetensors file whose tensors are declared up front and produced one at a time.
+
+    `specs` holds (name, dtype tag, shape) in file order; `arrays` yields each
+    tensor's raw values in the same order (bfloat16 as uint16 bits), so only
+    one tensor needs to be in memory while writing. Returns the bytes written.
+    """
+    header: Dict[str, Any] = {"__metadata__": metadata} if metadata else {}
+    offset = 0
+    for name, dtype, shape in specs:
+        size = int(np.prod(shape, dtype=np.int64)) * np.dtype(SAFETENSORS_DTYPES[dtype]).itemsize
+        header[name] = {"dtype": dtype, "shape": list(shape), "data_offsets": [offset, offset + size]}
+        offset += size
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    encoded += b" " * (-len(encoded) % 8)  # keeps the data section 8-byte aligned
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for (name, dtype, shape), array in zip(specs, arrays):
+            expected = header[name]["data_offsets"][1] - header[name]["data_offsets"][0]
+            array = np.ascontiguousarray(array)
+            if array.nbytes != expected:
+                raise ValueError(f"{name}: got {array.nbytes} bytes for {dtype}{list(shape)}, expected {expected}")
+            f.write(memoryview(array.reshape(-1)).cast("B"))
+    return 8 + len(encoded) + offset
+
+
+class SafetensorsWriter:
+    """Writes a safetensors file whose final tensor list is only known once the data is written.
+
+    Room for the header is reserved up front for every tensor in `specs`;
+    tensors that are never written (e.g. duplicates stored elsewhere) are
+    left out, and the header is written last, padded with spaces to fill the
+    reserved room.
+    """
+
+    def __init__(self, path: Union[str, Path], specs: List[Tuple[str, str, Tuple[int, ...]]],
+                 metadata: Optional[Dict[str, str]] = None):
+        self.path = Path(path)
+        self._specs = {name: (dtype, tuple(shape)) for name, dtype, shape in specs}
+        self._header: Dict[str, Any] = {"__metadata__": metadata} if metadata else {}
+        total = sum(int(np.prod(shape, dtype=np.int64)) * np.dtype(SAFETENSORS_DTYPES[dtype]).itemsize
+                    for dtype, shape in self._specs.values())
+        # The longest header the specs could need: every tensor, every offset as long as the total size
+        worst = dict(self._header, **{name: {"dtype": dtype, "shape": list(shape), "data_offsets": [total, total]}
+                                      for name, (dtype, shape) in self._specs.items()})
+        length = len(json.dumps(worst, separators=(",", ":")).encode())
+        self._reserved = length + (-length % 8)
+        self._offset = 0
+        self._file = open(self.path, "wb")
+        self._file.seek(8 + self._reserved)
+
+    def write(self, name: str, array: np.ndarray):
+        dtype, shape = self._specs[name]
+        array = np.ascontiguousarray(array)
+        expected = int(np.prod(shape, dtype=np.int64)) * np.dtype(SAFETENSORS_DTYPES[dtype]).itemsize
+        if array.nbytes != expected:
+            raise ValueError(f"{name}: got {array.nbytes} bytes for {dtype}{list(shape)}, expected {expected}")
+        self._file.write(memoryview(array.reshape(-1)).cast("B"))
+        self._header[name] = {"dtype": dtype, "shape": list(shape),
+                              "data_offsets": [self._offset, self._offset + expected]}
+        self._offset += expected
+
+    def close(self) -> int:
+        """Write the header and close the file; returns the bytes written"""
+        encoded = json.dumps(self._header, separators=(",", ":")).encode()
+        self._file.seek(0)
+        self._file.write(struct.pack("<Q", self._reserved))
+        self._file.write(encoded.ljust(self._reserved))
+        self._file.close()
+        return 8 + self._reserved + self._offset
+
+    def __enter__(self) -> "SafetensorsWriter":
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+def read_aliases(path: Union[str, Path]) -> Dict[str, str]:
+    """Alias -> stored tensor name from the shard index of a converted checkpoint (file or directory)"""
+    path = Path(path)
+    indexes = sorted(path.glob("*.safetensors.index.json")) if path.is_dir() else \
+        [path.with_name(path.name + ".index.json")]
+    aliases: Dict[str, str] = {}
+    for index in indexes:
+        if index.exists():
+            aliases.update(json.loads(index.read_text()).get("aliases", {}))
+    return aliases
+
+
+class Checkpoint:
+    """All tensors of a checkpoint file, or of every weight file in a directory of shards
+
+    Aliases listed in a shard index resolve to the same `LazyTensor` as the tensor they alias.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.files = self._weight_files(self.path)
+        if not self.files:
+            raise FileNotFoundError(f"No weight files found at {self.path}")
+        self._tensors: Dict[str, LazyTensor] = {}
+        for file in self.files:
+            self._tensors.update(self._open(file))
+        self.aliases = {alias: name for alias, name in read_aliases(self.path).items() if name in self._tensors}
+        for alias, name in self.aliases.items():
+            self._tensors[alias] = self._tensors[name]
+
+    @classmethod
+    def from_tensors(cls, tensors: Dict[str, LazyTensor], path: Union[str, Path] = "") -> "Checkpoint":
+        """A checkpoint over tensors that are already open, e.g. the expected output of a conversion plan"""
+        checkpoint = cls.__new__(cls)
+        checkpoint.path = Path(path)
+        checkpoint.files = []
+        checkpoint._tensors = dict(tensors)
+        checkpoint.aliases = {}
+        return checkpoint
+
+    @staticmethod
+    def _weight_files(path: Path) -> List[Path]:
+        if path.is_file():
+            return [path]
+        files = sorted(path.glob("*.safetensors"))
+        if not files:
+            files = sorted(p for suffix in TORCH_SUFFIXES + (".npz", ".npy") for p in path.glob(f"*{suffix}"))
+        return files
+
+    @staticmethod
+    def _open(file: Path) -> Dict[str, LazyTensor]:
+        if file.suffix == ".safetensors":
+            return open_safetensors(file)
+        if file.suffix in (".npz", ".npy"):
+            return open_numpy(file)
+        if file.suffix in TORCH_SUFFIXES:
+            return open_torch(file)
+        raise ValueError(f"Unsupported weight file: {file}")
+
+    def keys(self) -> List[str]:
+        return list(self._tensors)
+
+    def specs(self) -> Dict[str, Tuple[Tuple[int, ...], str]]:
+        """Shape and dtype tag of every tensor"""
+        return {name: (tensor.shape, tensor.dtype) for name, tensor in self._tensors.items()}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._tensors
+
+    def __getitem__(self, key: str) -> LazyTensor:
+        return self._tensors[key]
+
+    def __len__(self) -> int:
+        return len(self._tensors)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the stored tensors, counting an aliased tensor once"""
+        return sum(t.nbytes for t in {id(t): t for t in self._tensors.values()}.values())
+
+
+def load_mlx_weights(path: Union[str, Path]) -> List[Tuple[str, Any]]:
+    """(name, mx.array) pairs of a converted checkpoint for `model.load_weights`
+
+    Every alias gets the very array of the tensor it aliases, so tied weights share one buffer.
+    """
+    import mlx.core as mx
+
+    arrays: Dict[str, Any] = {}
+    for file in Checkpoint._weight_files(Path(path)):
+        arrays.update(mx.load(str(file)))
+    for alias, name in read_aliases(path).items():
+        arrays[alias] = arrays[name]
+    return list(arrays.items())
+
+
+@dataclass
+class TensorMapping:
+    """How a source tensor maps onto a converted one; `transform` turns the source view into the target layout"""
+    source: str
+    target: str
+    transform: Optional[Transform] = None
+
+
+def mappings_from_dict(key_map: Dict[str, str], source_keys: Iterable[str],
+                       transforms: Optional[Dict[str, Transform]] = None) -> List[TensorMapping]:
+    """Mappings for every source key: renamed via `key_map`, else kept; a key mapped to "" is dropped"""
+    transforms = transforms or {}
+    mappings = []
+    for key in source_keys:
+        target = key_map.get(key, key)
+        if target:
+            mappings.append(TensorMapping(key, target, transforms.get(key)))
+    return mappings
+
+
+@dataclass
+class _Stats:
+    count: int = 0
+    max_abs_diff: float = 0.0
+    sum_sq_diff: float = 0.0
+    sum_sq_source: float = 0.0
+    sum_sq_target: float = 0.0
+    dot: float = 0.0
+    nonfinite_mismatches: int = 0
+
+    def add(self, a: np.ndarray, b: np.ndarray):
+        finite = np.isfinite(a) & np.isfinite(b)
+        if not finite.all():
+            # Matching NaNs or same-signed infinities are not a conversion error
+            same = (np.isnan(a) & np.isnan(b)) | (a == b)
+            self.nonfinite_mismatches += int(np.count_nonzero(~finite & ~same))
+            a, b = a[finite], b[finite]
+        if a.size == 0:
+            return
+        diff = a - b
+        self.count += a.size
+        self.max_abs_diff = max(self.max_abs_diff, float(np.max(np.abs(diff))))
+        # float32 products summed in float64: a float32 dot loses the digits a cosine near 1 depends on
+        self.sum_sq_diff += float(np.sum(np.square(diff), dtype=np.float64))
+        self.sum_sq_source += float(np.sum(np.square(a), dtype=np.float64))
+        self.sum_sq_target += float(np.sum(np.square(b), dtype=np.float64))
+        self.dot += float(np.sum(np.multiply(a, b), dtype=np.float64))
+
+    def merge(self, other: "_Stats"):
+        self.count += other.count
+        self.max_abs_diff = max(self.max_abs_diff, other.max_abs_diff)
+        self.sum_sq_diff += other.sum_sq_diff
+        self.sum_sq_source += other.sum_sq_source
+        self.sum_sq_target += other.sum_sq_target
+        self.dot += other.dot
+        self.nonfinite_mismatches += other.nonfinite_mismatches
+
+
+@dataclass
+class TensorParity:
+    source: str
+    target: str
+    shape: List[int]
+    max_abs_diff: float = 0.0
+    rel_error: float = 0.0
+    cosine: float = 1.0
+    nonfinite_mismatches: int = 0
+    ok: bool = True
+    problem: Optional[str] = None
+
+
+@dataclass
+class ParityReport:
+    tensors: List[TensorParity] = field(default_factory=list)
+    missing_in_target: List[str] = field(default_factory=list)
+    unexpected_in_target: List[str] = field(default_factory=list)
+    bytes_compared: int = 0
+    duration: float = 0.0
+
+    @property
+    def offenders(self) -> List[TensorParity]:
+        return sorted((t for t in self.tensors if not t.ok), key=lambda t: t.cosine)
+
+    @property
+    def passed(self) -> bool:
+        return not self.offenders and not self.missing_in_target
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "passed": self.passed,
+            "compared": len(self.tensors),
+            "offenders": [asdict(t) for t in self.offenders],
+            "missing_in_target": self.missing_in_target,
+            "unexpected_in_target": self.unexpected_in_target,
+            "worst_cosine": min((t.cosine for t in self.tensors), default=1.0),
+            "max_abs_diff": max((t.max_abs_diff for t in self.tensors), default=0.0),
+            "bytes_compared": self.bytes_compared,
+            "duration": self.duration,
+            "throughput_gb_s": self.bytes_compared / self.duration / 1e9 if self.duration else None,
+        }
+
+
+def _chunks(array: np.ndarray, limit: int) -> Iterator[np.ndarray]:
+    """Slices of `array` of at most `limit` elements along its leading axes.
+
+    Slicing depends only on the shape, never on the memory layout, so a
+    transposed source view and a contiguous target are cut identically.
+    """
+    if array.size <= limit:
+        yield array
+    elif array.ndim == 1:
+        for start in range(0, array.shape[0], limit):
+            yield array[start:start + limit]
+    else:
+        row = array[0].size
+        if row <= limit:
+            step = limit // row
+            for start in range(0, array.shape[0], step):
+                yield array[start:start + step]
+        else:
+            for index in range(array.shape[0]):
+                yield from _chunks(array[index], limit)
+
+
+def _slabs(length: int, parts: int) -> List[Tuple[int, int]]:
+    step = -(-length // parts)
+    return [(start, min(start + step, length)) for start in range(0, length, step)]
+
+
+class ParityChecker:
+    def __init__(self, rtol: float = 1e-2, min_cosine: float = 0.9999, atol: Optional[float] = None,
+                 chunk_elements: int = DEFAULT_CHUNK_ELEMENTS, max_workers: Optional[int] = None):
+        """Compares converted tensors with their source
+
+        Args:
+            rtol: Largest relative L2 error ||source - target|| / ||source|| accepted
+            min_cosine: Smallest cosine similarity accepted
+            atol: Largest element-wise absolute difference accepted (None skips this check)
+            chunk_elements: Elements per chunk; bounds memory at a few chunks per worker
+            max_workers: Threads comparing tensors (default: CPU count)
+        """
+        self.rtol = rtol
+        self.min_cosine = min_cosine
+        self.atol = atol
+        self.chunk_elements = chunk_elements
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def _compare_slab(self, source: LazyTensor, target: LazyTensor, source_view: np.ndarray,
+                      target_view: np.ndarray) -> _Stats:
+        stats = _Stats()
+        for a, b in zip(_chunks(source_view, self.chunk_elements), _chunks(target_view, self.chunk_elements)):
+            a, b = source.decode(a).reshape(-1), target.decode(b).reshape(-1)
+            if a.dtype != b.dtype:
+                a, b = a.astype(np.float64), b.astype(np.float64)
+            stats.add(a, b)
+        return stats
+
+    def _finish(self, result: TensorParity, stats: _Stats) -> TensorParity:
+        result.max_abs_diff = stats.max_abs_diff
+        result.nonfinite_mismatches = stats.nonfinite_mismatches
+        source_norm = np.sqrt(stats.sum_sq_source)
+        target_norm = np.sqrt(stats.sum_sq_target)
+        if source_norm == 0.0:
+            result.rel_error = float(np.sqrt(stats.sum_sq_diff))
+            result.cosine = 1.0 if target_norm == 0.0 else 0.0
+        else:
+            result.rel_error = float(np.sqrt(stats.sum_sq_diff) / source_norm)
+            result.cosine = float(stats.dot / (source_norm * target_norm)) if target_norm else 0.0
+        problems = []
+        if result.rel_error > self.rtol:
+            problems.append(f"relative error {result.rel_error:.2e} > {self.rtol:.0e}")
+        if result.cosine < self.min_cosine:
+            problems.append(f"cosine {result.cosine:.6f} < {self.min_cosine}")
+        if self.atol is not None and result.max_abs_diff > self.atol:
+            problems.append(f"max abs diff {result.max_abs_diff:.2e} > {self.atol:.0e}")
+        if result.nonfinite_mismatches:
+            problems.append(f"{result.nonfinite_mismatches} non-finite values differ")
+        result.ok = not problems
+        result.problem = "; ".join(problems) or None
+        return result
+
+    def check(self, source: Checkpoint, target: Checkpoint,
+              mappings: Optional[List[TensorMapping]] = None) -> ParityReport:
+        """Compare every mapped tensor; without `mappings`, tensors are matched by name"""
+        start = time.perf_counter()
+        mappings = mappings if mappings is not None else mappings_from_dict({}, source.keys())
+        report = ParityReport()
+        work: List[Tuple[TensorParity, LazyTensor, LazyTensor, np.ndarray, np.ndarray]] = []
+        for mapping in mappings:
+            if mapping.target not in target:
+                report.missing_in_target.append(mapping.target)
+                continue
+            src, tgt = source[mapping.source], target[mapping.target]
+            view = mapping.transform(src.array) if mapping.transform else src.array
+            result = TensorParity(mapping.source, mapping.target, list(tgt.shape))
+            report.tensors.append(result)
+            if tuple(view.shape) != tgt.shape:
+                if view.size != tgt.array.size:
+                    result.ok = False
+                    result.problem = f"shape {list(view.shape)} (after transform) vs {list(tgt.shape)}"
+                    continue
+                # Same element count: still an offender, but the values show whether only a reshape is missing
+                result.problem = f"shape {list(view.shape)} vs {list(tgt.shape)}"
+                view = view.reshape(tgt.shape)
+            work.append((result, src, tgt, view, tgt.array))
+            report.bytes_compared += src.nbytes + tgt.nbytes
+        report.unexpected_in_target = sorted(set(target.keys()) - {m.target for m in mappings})
+
+        # One task per slab: a large tensor is split along its first axis so it does not serialize the pool
+        slab_elements = self.chunk_elements * 4
+        tasks = []
+        for index, (result, src, tgt, view, tgt_view) in enumerate(work):
+            if view.ndim and view.size > slab_elements and view.shape[0] > 1:
+                parts = min(view.shape[0], -(-view.size // slab_elements), self.max_workers * 2)
+                for lo, hi in _slabs(view.shape[0], parts):
+                    tasks.append((index, src, tgt, view[lo:hi], tgt_view[lo:hi]))
+            else:
+                tasks.append((index, src, tgt, view, tgt_view))
+        totals = [_Stats() for _ in work]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [(index, pool.submit(self._compare_slab, *args)) for index, *args in tasks]
+            for index, future in futures:
+                totals[index].merge(future.result())
+        for (result, *_), stats in zip(work, totals):
+            shape_note = result.problem
+            self._finish(result, stats)
+            if shape_note:
+                result.ok = False
+                result.problem = "; ".join(filter(None, [shape_note, result.problem]))
+        report.duration = time.perf_counter() - start
+        return report
+
+
+def check_parity(source_path: Union[str, Path], target_path: Union[str, Path],
+                 key_map: Optional[Dict[str, str]] = None, transforms: Optional[Dict[str, Transform]] = None,
+                 **kwargs) -> ParityReport:
+    """Open both checkpoints and compare them; `kwargs` go to `ParityChecker`"""
+    source, target = Checkpoint(source_path), Checkpoint(target_path)
+    mappings = mappings_from_dict(key_map or {}, source.keys(), transforms)
+    return ParityChecker(**kwargs).check(source, target, mappings)
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from co_researchers.jobqueue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=0.05)
+    yield queue
+    queue.close()
+
+
+def test_claim_takes_the_highest_priority_first(queue):
+    low = queue.submit("fake", {"n": 1})
+    high = queue.submit("fake", {"n": 2}, priority=5)
+    assert queue.claim("w").id == high
+    assert queue.claim("w").id == low
+    assert queue.claim("w") is None
+
+
+def test_expired_lease_is_reclaimed_and_the_stale_claim_is_fenced_off(queue):
+    job_id = queue.submit("fake", {"n": 1})
+    stale = queue.claim("w1")
+    time.sleep(0.1)
+    fresh = queue.claim("w2")
+    assert fresh.id == job_id and fresh.attempts == 2 and fresh.lease != stale.lease
+
+    assert not queue.heartbeat(job_id, stale.lease)
+    assert not queue.complete(job_id, stale.lease, {"by": "w1"})
+    assert not queue.fail(job_id, stale.lease, "late")
+    assert queue.complete(job_id, fresh.lease, {"by": "w2"})
+    job = queue.get(job_id)
+    assert job.status == "done" and job.result == {"by": "w2"}
+
+
+def test_lease_expiry_on_the_last_attempt_fails_the_job(queue):
+    job_id = queue.submit("fake", {}, max_attempts=1)
+    queue.claim("w")
+    time.sleep(0.1)
+    assert queue.requeue_expired() == 1
+    job = queue.get(job_id)
+    assert job.status == "failed" and job.error == "lease expired"
+    assert queue.claim("w") is None
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    job_id = queue.submit("fake", {})
+    job = queue.claim("w")
+    for _ in range(3):
+        time.sleep(0.03)
+        assert queue.heartbeat(job_id, job.lease)
+    assert queue.requeue_expired() == 0
+    assert queue.get(job_id).status == "running"
+
+
+def test_unserializable_result_leaves_the_job_running(queue):
+    job_id = queue.submit("fake", {})
+    job = queue.claim("w")
+    with pytest.raises(TypeError):
+        queue.complete(job_id, job.lease, {"value": object()})
+    assert queue.get(job_id).status == "running"
+    assert queue.fail(job_id, job.lease, "bad result")
+    assert queue.get(job_id).status == "queued"
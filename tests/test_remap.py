@@ -0,0 +1,128 @@
+import json
+
+import numpy as np
+import pytest
+
+from mlx_t2v_researcher.remap import PRESETS, Rule, RuleSet, cast, concat, split, transpose
+from mlx_t2v_researcher.weights import (Checkpoint, LazyTensor, ParityChecker, encode_bfloat16, load_mlx_weights,
+                                        save_safetensors)
+
+
+def write_checkpoint(path, tensors):
+    """Save {name: (dtype tag, raw array)} as one safetensors file and open it"""
+    specs = [(name, dtype, array.shape) for name, (dtype, array) in tensors.items()]
+    save_safetensors(path, specs, [array for _, array in tensors.values()])
+    return Checkpoint(path)
+
+
+def convert(tmp_path, source, rules, **kwargs):
+    plan = rules.compile(source)
+    summary = plan.convert(source, tmp_path / "out", max_workers=2, **kwargs)
+    return plan, summary, Checkpoint(tmp_path / "out")
+
+
+def values(tensor: LazyTensor) -> np.ndarray:
+    return tensor.decode(tensor.array)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_split_and_transpose_round_trip(tmp_path, rng):
+    qkv = rng.standard_normal((12, 4, 3, 3)).astype(np.float32)
+    bias = rng.standard_normal(12).astype(np.float32)
+    source = write_checkpoint(tmp_path / "vae.safetensors", {
+        "mid.attn.to_qkv.weight": ("F32", qkv),
+        "mid.attn.to_qkv.bias": ("F32", bias),
+    })
+    plan, _, converted = convert(tmp_path, source, PRESETS["wan2.1-vae"])
+
+    for index, name in enumerate("qkv"):
+        expected = qkv[4 * index:4 * (index + 1)].transpose(0, 2, 3, 1)
+        np.testing.assert_array_equal(values(converted[f"mid.attn.to_{name}.weight"]), expected)
+        np.testing.assert_array_equal(values(converted[f"mid.attn.to_{name}.bias"]), bias[4 * index:4 * (index + 1)])
+    assert plan.verify(source, converted).passed
+
+
+def test_bfloat16_cast_round_trip_is_verified_lazily(tmp_path, rng):
+    weights = rng.standard_normal((64, 32)).astype(np.float32)
+    source = write_checkpoint(tmp_path / "t5.safetensors", {"encoder.block.0.weight": ("BF16", encode_bfloat16(weights))})
+    plan, _, converted = convert(tmp_path, source, PRESETS["wan2.1-t5"])
+
+    target = converted["encoder.block.layers.0.weight"]
+    assert target.dtype == "F16"
+    np.testing.assert_allclose(values(target), values(source["encoder.block.0.weight"]), rtol=1e-3)
+
+    # The expected tensor is the source's memory map, not a decoded copy
+    expected = plan.expected(source)["encoder.block.layers.0.weight"]
+    assert np.shares_memory(expected.array, source["encoder.block.0.weight"].array)
+    assert plan.verify(source, converted, ParityChecker(chunk_elements=256)).passed
+
+
+def test_verify_reports_a_corrupted_tensor(tmp_path, rng):
+    weights = rng.standard_normal((16, 8)).astype(np.float32)
+    source = write_checkpoint(tmp_path / "model.safetensors", {"proj.weight": ("F32", weights)})
+    rules = RuleSet([Rule(r"proj\.weight", "proj.weight", [transpose(1, 0), cast("float16")])])
+    plan = rules.compile(source)
+
+    corrupted = weights.T.astype(np.float16).copy()
+    corrupted[0] = -corrupted[0]
+    save_safetensors(tmp_path / "bad.safetensors", [("proj.weight", "F16", corrupted.shape)], [corrupted])
+    report = plan.verify(source, Checkpoint(tmp_path / "bad.safetensors"))
+    assert not report.passed
+    assert [t.target for t in report.offenders] == ["proj.weight"]
+
+
+def test_concat_is_verified_in_batches(tmp_path, rng):
+    parts = {f"layer.{part}.weight": rng.standard_normal((4, 6)).astype(np.float32) for part in ("a", "b")}
+    other = {f"other.{part}.weight": rng.standard_normal((4, 6)).astype(np.float32) for part in ("a", "b")}
+    source = write_checkpoint(tmp_path / "model.safetensors",
+                              {name: ("F32", array) for name, array in {**parts, **other}.items()})
+    rules = RuleSet([Rule(r"(layer|other)\.(?P<part>a|b)\.weight", r"\1.fused.weight", [concat(0, ("a", "b"))])])
+    plan, _, converted = convert(tmp_path, source, rules)
+
+    np.testing.assert_array_equal(values(converted["layer.fused.weight"]),
+                                  np.concatenate([parts["layer.a.weight"], parts["layer.b.weight"]]))
+    report = plan.verify(source, converted, max_bytes=1)
+    assert report.passed
+    assert sorted(t.target for t in report.tensors) == ["layer.fused.weight", "other.fused.weight"]
+
+
+def test_tied_and_identical_tensors_are_stored_once(tmp_path, rng):
+    embedding = rng.standard_normal((10, 4)).astype(np.float32)
+    norm = np.ones(4, np.float32)
+    source = write_checkpoint(tmp_path / "model.safetensors", {
+        "embed.weight": ("F32", embedding),
+        "norm_a.weight": ("F32", norm),
+        "norm_b.weight": ("F32", norm.copy()),
+    })
+    rules = RuleSet([Rule(r"embed\.weight", ["embed.weight", "lm_head.weight"])])
+    plan, summary, converted = convert(tmp_path, source, rules)
+
+    assert summary["aliases"] == 2
+    index = json.loads((tmp_path / "out" / "model.safetensors.index.json").read_text())
+    assert index["aliases"] == {"lm_head.weight": "embed.weight", "norm_b.weight": "norm_a.weight"}
+    assert set(index["weight_map"]) == {"embed.weight", "lm_head.weight", "norm_a.weight", "norm_b.weight"}
+    assert converted["lm_head.weight"] is converted["embed.weight"]
+    assert converted.nbytes == embedding.nbytes + norm.nbytes
+    assert plan.verify(source, converted).passed
+
+    _, undeduplicated, _ = convert(tmp_path / "plain", source, rules, dedup=False)
+    assert undeduplicated["aliases"] == 0
+
+
+def test_load_mlx_weights_shares_aliased_arrays(tmp_path, rng):
+    pytest.importorskip("mlx.core")
+    embedding = rng.standard_normal((10, 4)).astype(np.float32)
+    source = write_checkpoint(tmp_path / "model.safetensors", {"embed.weight": ("F32", embedding)})
+    convert(tmp_path, source, RuleSet([Rule(r"embed\.weight", ["embed.weight", "lm_head.weight"])]))
+    weights = dict(load_mlx_weights(tmp_path / "out"))
+    assert weights["lm_head.weight"] is weights["embed.weight"]
+
+
+def test_split_rejects_sections_that_do_not_fit(tmp_path):
+    source = write_checkpoint(tmp_path / "model.safetensors", {"qkv": ("F32", np.zeros((10, 2), np.float32))})
+    with pytest.raises(ValueError):
+        RuleSet([Rule("qkv", ["q", "k", "v"], [split(3)])]).compile(source)
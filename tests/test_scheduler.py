@@ -0,0 +1,130 @@
+import asyncio
+
+from co_researchers.scheduler import CallScheduler
+
+
+async def call(scheduler, order, job, priority="normal", hold=None):
+    async with scheduler.slot(job, priority):
+        order.append(job)
+        if hold is not None:
+            await hold.wait()
+        await asyncio.sleep(0)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_interactive_calls_go_ahead_of_batch():
+    async def main():
+        scheduler = CallScheduler(max_concurrent=1, promote_after=None)
+        order, hold = [], asyncio.Event()
+        holder = asyncio.ensure_future(call(scheduler, order, "holder", hold=hold))
+        await settle()
+        waiting = [asyncio.ensure_future(call(scheduler, order, f"batch-{i}", "batch")) for i in range(3)]
+        await settle()
+        waiting.append(asyncio.ensure_future(call(scheduler, order, "interactive", "interactive")))
+        await settle()
+        assert scheduler.stats()["queued"] == 4
+        hold.set()
+        await asyncio.gather(holder, *waiting)
+        return order
+
+    assert asyncio.run(main()) == ["holder", "interactive", "batch-0", "batch-1", "batch-2"]
+
+
+def test_job_with_one_call_is_not_stuck_behind_a_job_with_fifty():
+    async def main():
+        scheduler = CallScheduler(max_concurrent=1, promote_after=None)
+        order, hold = [], asyncio.Event()
+        holder = asyncio.ensure_future(call(scheduler, order, "holder", hold=hold))
+        await settle()
+        bulk = [asyncio.ensure_future(call(scheduler, order, "bulk")) for _ in range(50)]
+        await settle()
+        single = asyncio.ensure_future(call(scheduler, order, "single"))
+        await settle()
+        hold.set()
+        await asyncio.gather(holder, single, *bulk)
+        return order
+
+    order = asyncio.run(main())
+    assert order.count("bulk") == 50
+    # At most one of the bulk job's calls goes first
+    assert order.index("single") <= 2
+
+
+def test_per_job_cap_leaves_slots_for_other_jobs():
+    async def main():
+        scheduler = CallScheduler(max_concurrent=4, per_job=2, promote_after=None)
+        order, hold = [], asyncio.Event()
+        greedy = [asyncio.ensure_future(call(scheduler, order, "greedy", hold=hold)) for _ in range(5)]
+        await settle()
+        stats = scheduler.stats()
+        assert stats["jobs"]["greedy"] == {"in_flight": 2, "queued": 3}
+        assert stats["in_flight"] == 2
+        other = asyncio.ensure_future(call(scheduler, order, "other", hold=hold))
+        await settle()
+        assert scheduler.stats()["jobs"]["other"] == {"in_flight": 1, "queued": 0}
+        hold.set()
+        await asyncio.gather(other, *greedy)
+        return scheduler.stats()
+
+    stats = asyncio.run(main())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0 and stats["jobs"] == {}
+
+
+def test_long_waiting_call_is_promoted_past_higher_classes():
+    async def main():
+        scheduler = CallScheduler(max_concurrent=1, promote_after=0.05)
+        order, hold = [], asyncio.Event()
+        holder = asyncio.ensure_future(call(scheduler, order, "holder", hold=hold))
+        await settle()
+        batch = asyncio.ensure_future(call(scheduler, order, "batch", "batch"))
+        await asyncio.sleep(0.1)
+        interactive = asyncio.ensure_future(call(scheduler, order, "interactive", "interactive"))
+        await settle()
+        hold.set()
+        await asyncio.gather(holder, batch, interactive)
+        return order, scheduler.classes["batch"].promoted
+
+    order, promoted = asyncio.run(main())
+    assert order == ["holder", "batch", "interactive"]
+    assert promoted == 1
+
+
+def test_call_cancelled_as_it_is_granted_hands_its_slot_on():
+    async def main():
+        scheduler = CallScheduler(max_concurrent=1, promote_after=None)
+        await scheduler.acquire("holder")
+        first = asyncio.ensure_future(scheduler.acquire("first"))
+        second = asyncio.ensure_future(scheduler.acquire("second"))
+        await settle()
+        # Grants the slot to `first`, which is cancelled before it can resume
+        scheduler.release("holder")
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.wait_for(second, 1.0)
+        assert first.cancelled()
+        assert scheduler.stats()["jobs"] == {"second": {"in_flight": 1, "queued": 0}}
+        scheduler.release("second")
+        return scheduler.stats()
+
+    stats = asyncio.run(main())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+
+def test_call_cancelled_while_queued_leaves_the_queue():
+    async def main():
+        scheduler = CallScheduler(max_concurrent=1, promote_after=None)
+        await scheduler.acquire("holder")
+        waiter = asyncio.ensure_future(scheduler.acquire("waiter", "batch"))
+        await settle()
+        assert scheduler.classes["batch"].queued == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        scheduler.release("holder")
+        return scheduler.stats()
+
+    stats = asyncio.run(main())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0 and stats["jobs"] == {}
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+from co_researchers import service
+from co_researchers.httpserver import Request
+from co_researchers.service import ResearchService
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    """A fake coordinator that blocks until released and counts its runs"""
+    monkeypatch.setenv("CO_RESEARCHERS_TELEMETRY", "")
+    state = {"calls": [], "release": None}
+
+    async def run(params):
+        state["calls"].append(params)
+        await state["release"].wait()
+        return {"topic": params["topic"]}
+
+    monkeypatch.setitem(service.JOB_KINDS, "fake", run)
+    return state
+
+
+async def handle(svc, body):
+    raw = body if isinstance(body, bytes) else json.dumps(body).encode()
+    response = await svc.handle(Request("POST", "/jobs", {}, raw))
+    return response.status, json.loads(response.body)
+
+
+def test_identical_submits_share_one_execution(runner):
+    async def main():
+        runner["release"] = asyncio.Event()
+        svc = ResearchService()
+        first = svc.submit("fake", {"topic": "protein  folding"}, priority="batch")
+        second = svc.submit("fake", {"topic": " protein folding "}, priority="interactive")
+        other = svc.submit("fake", {"topic": "something else"})
+        await asyncio.sleep(0)
+        runner["release"].set()
+        await asyncio.gather(first.task, other.task)
+        return svc, first, second, other
+
+    svc, first, second, other = asyncio.run(main())
+    assert second is first and other is not first
+    assert first.requests == 2 and first.priority == "interactive"
+    assert len(runner["calls"]) == 2
+    assert first.status == "done" and first.result == {"topic": "protein  folding"}
+    assert svc.inflight == {}
+
+
+def test_submit_after_completion_starts_a_new_execution(runner):
+    async def main():
+        runner["release"] = asyncio.Event()
+        runner["release"].set()
+        svc = ResearchService()
+        first = svc.submit("fake", {"topic": "x"})
+        await first.task
+        second = svc.submit("fake", {"topic": "x"})
+        await second.task
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert second is not first and first.requests == second.requests == 1
+    assert len(runner["calls"]) == 2
+
+
+def test_post_jobs_reports_coalescing(runner):
+    async def main():
+        runner["release"] = asyncio.Event()
+        svc = ResearchService()
+        responses = [await handle(svc, {"coordinator": "fake", "params": {"topic": "x"}}) for _ in range(2)]
+        runner["release"].set()
+        await asyncio.gather(*(e.task for e in svc.executions.values()))
+        return responses
+
+    (status_a, first), (status_b, second) = asyncio.run(main())
+    assert status_a == status_b == 202
+    assert first["id"] == second["id"]
+    assert not first["coalesced"] and second["coalesced"]
+    assert len(runner["calls"]) == 1
+
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    [1, 2],
+    "fake",
+    {"params": {}},
+    {"coordinator": "fake", "params": [1]},
+    {"coordinator": ["fake"]},
+    {"coordinator": "fake", "priority": 3},
+    {"coordinator": "missing"},
+    {"coordinator": "fake", "priority": "urgent"},
+])
+def test_malformed_job_bodies_are_rejected(runner, body):
+    async def main():
+        svc = ResearchService()
+        status, _ = await handle(svc, body)
+        return status, svc.executions
+
+    status, executions = asyncio.run(main())
+    assert status == 400 and not executions